@@ -0,0 +1,206 @@
+"""
+Materialized aggregates over final days: per-day cohort totals, one summary
+row per game and the leaderboards on top of it.
+
+`record_day` folds a day in when it becomes final, i.e. in `finish_turn`,
+in the same transaction that issues its event. A final day is never reverted
+or replayed (the ledger's unique index allows one issue per day), so the
+totals, maxima and minima only ever grow by one day at a time and the reads
+below never touch `days`:
+
+    cohort_days      O(limit)  primary-key range on day_cohorts
+    game_summary     O(1)      primary-key lookup on game_summaries
+    leaderboard      O(K)      backward scan of a (value, game_id) index
+
+Leaderboards are weekly standings by default: only games with a day made
+final in the last `LEADERBOARD_WINDOW` seconds are ranked, so the scan also
+steps over the games idle since then.
+
+`rebuild` recomputes both tables from the day history (the schema migration
+that adds them uses it to backfill). The history has no times, so rebuilt
+games only rank again in a weekly standing once they play another day.
+"""
+
+import time
+from contextlib import nullcontext
+from typing import Optional
+
+from sqlalchemy import exists, select, text
+from sqlalchemy.orm import Session
+
+from . import history, init_db, models
+from .export import iter_chunks
+from .rules import STAT_FIELDS
+
+DayCohort, GameSummary = init_db.DayCohort, init_db.GameSummary
+
+LEADERBOARDS = ("reputation", "max_money", "final_day")
+# Span of the weekly standings, in seconds.
+LEADERBOARD_WINDOW = 7 * 24 * 3600
+
+_SUMS = tuple(f"sum_{field}" for field in STAT_FIELDS)
+
+
+# The upserts are plain SQL: SQLAlchemy does not cache compiled SQLite
+# ON CONFLICT inserts, and compiling them costs more than running them.
+
+def _upsert(table: str, columns: tuple[str, ...], key: str, updates: dict[str, str], where: str = ""):
+    return text(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(':' + c for c in columns)}) "
+        f"ON CONFLICT ({key}) DO UPDATE SET {', '.join(f'{c} = {e}' for c, e in updates.items())}"
+        + (f" WHERE {where}" if where else "")
+    )
+
+
+def _cohort_upsert():
+    columns = ("number_of_day", "players", *_SUMS)
+    return _upsert(
+        DayCohort.__tablename__, columns, "number_of_day",
+        {column: f"{column} + excluded.{column}" for column in columns[1:]},
+    )
+
+
+def _summary_upsert():
+    return _upsert(
+        GameSummary.__tablename__,
+        ("game_id", "final_day", "reputation", "money", "max_money", "min_health", "played_at"),
+        "game_id",
+        {
+            "final_day": "excluded.final_day",
+            "played_at": "excluded.played_at",
+            "reputation": "excluded.reputation",
+            "money": "excluded.money",
+            "max_money": "max(max_money, excluded.max_money)",
+            "min_health": "min(min_health, excluded.min_health)",
+        },
+        # Days arrive in order; an older one must not roll the summary back.
+        where="final_day < excluded.final_day",
+    )
+
+
+COHORT_UPSERT = _cohort_upsert()
+SUMMARY_UPSERT = _summary_upsert()
+
+
+def record_day(
+    db: Session, game_id: int, number_of_day: int, stats: models.Stats, played_at: Optional[float] = None
+) -> None:
+    """Folds a newly final day, made final at `played_at`, into the aggregates (not committed)."""
+    db.execute(COHORT_UPSERT, {
+        "number_of_day": number_of_day,
+        "players": 1,
+        **{column: getattr(stats, field) for column, field in zip(_SUMS, STAT_FIELDS)},
+    })
+    db.execute(SUMMARY_UPSERT, {
+        "game_id": game_id,
+        "final_day": number_of_day,
+        "reputation": stats.reputation,
+        "money": stats.money,
+        "max_money": stats.money,
+        "min_health": stats.health,
+        "played_at": played_at,
+    })
+
+
+def rebuild(db: Session) -> None:
+    """
+    Recomputes both tables from every final day (not committed). Turns
+    finished meanwhile would be counted twice, so run it while nothing is
+    playing, as the migration does.
+
+    Games from before the event ledger have no issued event at all, so
+    their current day never becomes final by being issued and is never
+    folded in by `finish_turn`. With nothing playing it cannot be reverted
+    either, so it is counted here as final.
+    """
+    db.query(DayCohort).delete()
+    db.query(GameSummary).delete()
+    for _, days, _ in iter_chunks(lambda: nullcontext(db)):
+        cohorts: dict[int, dict] = {}
+        summaries: dict[int, dict] = {}
+        for game_id, number, stats in days:
+            cohort = cohorts.setdefault(number, dict.fromkeys(("players", *_SUMS), 0))
+            cohort["players"] += 1
+            for column, field in zip(_SUMS, STAT_FIELDS):
+                cohort[column] += getattr(stats, field)
+            summary = summaries.get(game_id)
+            summaries[game_id] = {
+                "game_id": game_id,
+                "final_day": number,
+                "reputation": stats.reputation,
+                "money": stats.money,
+                "max_money": stats.money if summary is None else max(summary["max_money"], stats.money),
+                "min_health": stats.health if summary is None else min(summary["min_health"], stats.health),
+                "played_at": None,
+            }
+        if cohorts:
+            db.execute(COHORT_UPSERT, [{"number_of_day": number, **totals} for number, totals in cohorts.items()])
+            db.execute(SUMMARY_UPSERT, list(summaries.values()))
+
+    Game, IssuedEvent = init_db.Game, init_db.IssuedEvent
+    legacy = db.execute(select(Game.id).where(~exists().where(IssuedEvent.game_id == Game.id))).scalars().all()
+    for game_id in legacy:
+        game, stats = history.load_current_state(db, game_id)
+        if stats is not None:
+            record_day(db, game_id, game.current_day, stats)
+    db.flush()
+
+
+def cohort_days(db: Session, after: int, limit: int) -> tuple[list[models.DayCohortStats], Optional[int]]:
+    """Cohort stats of days after `after`, at most `limit`, and the next `after` (None at the end)."""
+    rows = (
+        db.query(DayCohort)
+        .filter(DayCohort.number_of_day > after)
+        .order_by(DayCohort.number_of_day)
+        .limit(limit + 1)
+        .all()
+    )
+    page = [
+        models.DayCohortStats(
+            day=row.number_of_day,
+            players=row.players,
+            mean={field: getattr(row, column) / row.players for column, field in zip(_SUMS, STAT_FIELDS)},
+        )
+        for row in rows[:limit]
+    ]
+    return page, page[-1].day if len(rows) > limit else None
+
+
+def game_summary(db: Session, game_id) -> Optional[models.GameSummary]:
+    row = db.get(GameSummary, game_id)
+    if row is None:
+        return None
+    return models.GameSummary(
+        game_id=str(row.game_id),
+        final_day=row.final_day,
+        reputation=row.reputation,
+        money=row.money,
+        max_money=row.max_money,
+        min_health=row.min_health,
+    )
+
+
+def leaderboard(db: Session, metric: str, k: int, since: Optional[float] = None) -> list[models.LeaderboardEntry]:
+    """
+    The top `k` games by `metric` (one of `LEADERBOARDS`); ties go to the
+    newer game. With `since`, only games played at or after it are ranked.
+    """
+    column = getattr(GameSummary, metric)
+    query = (
+        select(GameSummary.game_id, init_db.Game.character_name, column)
+        .join(init_db.Game, init_db.Game.id == GameSummary.game_id)
+        .order_by(column.desc(), GameSummary.game_id.desc())
+        .limit(k)
+    )
+    if since is not None:
+        query = query.where(GameSummary.played_at >= since)
+    rows = db.execute(query).all()
+    return [
+        models.LeaderboardEntry(rank=rank, game_id=str(game_id), character_name=name, value=value)
+        for rank, (game_id, name, value) in enumerate(rows, start=1)
+    ]
+
+
+def week_start() -> float:
+    """Start of the current weekly standings' window, for `leaderboard(since=...)`."""
+    return time.time() - LEADERBOARD_WINDOW
@@ -0,0 +1,241 @@
+"""
+Columnar export of all games and days for offline analysis.
+
+An export writes a run directory:
+
+    games-00000.npz, days-00000.npz, ...  one pair per chunk of games
+    watermark.npz                         the last exported day of every game
+    manifest.json                         files, row counts, timings
+
+Every .npz is a compressed NumPy archive of 1-D arrays, one per column
+(`numpy.load(path)["health"]`). Days hold the stats the API would serve for
+them, in either storage mode (see app/history.py).
+
+Exports are incremental when given the watermark of an earlier run: only
+games that moved on are read, and only their days after the watermark are
+written. A day is exported once it is final: a later day exists, or its
+event has been issued. Until then a failed generation may still revert it
+(see `main.revert_turn`).
+
+Each chunk is read in its own read transaction on the API's read engine,
+fetched in full and only then replayed and written, so a lock is held for
+the time SQLite takes to return one chunk, never for the whole export.
+
+Usage (from backend/):
+    python -m app.export exports/full
+    python -m app.export exports/next --since exports/full/watermark.npz
+"""
+
+import argparse
+import json
+import threading
+import time
+from contextlib import AbstractContextManager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+from sqlalchemy import Integer, exists, select
+from sqlalchemy.orm import Session
+
+from . import history, init_db, models
+from .rules import STAT_FIELDS
+from .settings import settings
+
+EXPORT_DIR = settings.export_dir
+EXPORT_CHUNK_GAMES = settings.export_chunk_games
+
+GAME_COLUMNS = ("id", "user_id", "age", "gender", "character_name", "work", "current_day")
+# Integer stats keep their column type; the rest are float64.
+_STAT_DTYPES = {
+    field: "int32" if isinstance(getattr(init_db.Day, field).type, Integer) else "float64"
+    for field in STAT_FIELDS
+}
+
+# One export at a time per process (see `export_run`).
+_running = threading.Lock()
+
+
+class ExportInProgress(Exception):
+    pass
+
+
+def export(
+    out_dir,
+    since: Optional[dict[int, int]] = None,
+    sessions: Optional[Callable[[], AbstractContextManager[Session]]] = None,
+    chunk_games: Optional[int] = None,
+) -> dict:
+    """
+    Exports every final day after `since` (game id -> last exported day;
+    everything if None) into `out_dir` and returns the manifest.
+
+    `sessions` opens a session as a context manager; defaults to the API's
+    read sessions.
+    """
+    import numpy as np
+
+    sessions = sessions or init_db.ReadSessionLocal
+    since = since or {}
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+
+    started = time.perf_counter()
+    watermark = dict(since)
+    files, games_written, days_written, longest_read = [], 0, 0, 0.0
+    for chunk, (games, rows, read_seconds) in enumerate(iter_chunks(sessions, since, chunk_games)):
+        names = (f"games-{chunk:05d}.npz", f"days-{chunk:05d}.npz")
+        np.savez_compressed(out / names[0], **_game_columns(np, games))
+        np.savez_compressed(out / names[1], **_day_columns(np, rows))
+        files.extend(names)
+        games_written += len(games)
+        days_written += len(rows)
+        longest_read = max(longest_read, read_seconds)
+        watermark.update((game[0], game[-1]) for game in games)
+
+    ids = sorted(watermark)
+    np.savez_compressed(
+        out / "watermark.npz",
+        game_id=np.array(ids, dtype="int64"),
+        day=np.array([watermark[game_id] for game_id in ids], dtype="int32"),
+    )
+    manifest = {
+        "files": files,
+        "games": games_written,
+        "days": days_written,
+        "seconds": round(time.perf_counter() - started, 3),
+        "longest_read_ms": round(longest_read * 1000, 1),
+    }
+    (out / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def iter_chunks(
+    sessions: Callable[[], AbstractContextManager[Session]],
+    since: Optional[dict[int, int]] = None,
+    chunk_games: Optional[int] = None,
+) -> Iterator[tuple[list[tuple], list[tuple[int, int, models.Stats]], float]]:
+    """
+    Yields, for each chunk of `chunk_games` games that has final days after
+    `since`, (games, days, read seconds). Games are rows of `GAME_COLUMNS`
+    followed by their last final day; days are (game_id, number_of_day,
+    stats) in that order. Each chunk is read in its own session and replayed
+    after the session is closed.
+    """
+    since = since or {}
+    chunk_games = chunk_games or EXPORT_CHUNK_GAMES
+    after_id = 0
+    while True:
+        read_start = time.perf_counter()
+        with sessions() as db:
+            games, scanned, days, deltas = _read_chunk(db, after_id, chunk_games, since)
+        read_seconds = time.perf_counter() - read_start
+        if not scanned:
+            return
+        after_id = scanned
+        if games:
+            final = {game[0]: game[-1] for game in games}
+            rows = [
+                (game_id, number, stats)
+                for game_id, number, stats in history.replay_timelines(days, deltas)
+                if since.get(game_id, 0) < number <= final[game_id]
+            ]
+            yield games, rows, read_seconds
+
+
+def _read_chunk(db: Session, after_id: int, chunk_games: int, since: dict[int, int]):
+    """
+    Reads the next `chunk_games` games after `after_id` and, for those with
+    new final days, the `Day`/`DayDelta` rows to rebuild them, fetched in
+    full. Returns (changed games, last game id scanned or None, days, deltas);
+    each game row ends with its last final day.
+    """
+    Game, IssuedEvent = init_db.Game, init_db.IssuedEvent
+    issued = exists().where(IssuedEvent.game_id == Game.id, IssuedEvent.number_of_day == Game.current_day)
+    scanned = db.execute(
+        select(*(getattr(Game, column) for column in GAME_COLUMNS), issued)
+        .where(Game.id > after_id)
+        .order_by(Game.id)
+        .limit(chunk_games)
+    ).all()
+    if not scanned:
+        return [], None, [], []
+
+    games = []
+    for *game, is_issued in scanned:
+        final = game[-1] if is_issued else game[-1] - 1
+        if final > since.get(game[0], 0):
+            games.append((*game, final))
+    if not games:
+        return [], scanned[-1][0], [], []
+
+    start = min(since.get(game[0], 0) for game in games) + 1
+    queries = history.timeline_queries(db, [game[0] for game in games], start, max(game[-1] for game in games))
+    days, deltas = (queries[0].all(), queries[1].all()) if queries else ([], [])
+    return games, scanned[-1][0], days, deltas
+
+
+def _game_columns(np, games: list[tuple]) -> dict:
+    columns = list(zip(*games))
+    arrays = {name: np.array(values) for name, values in zip(GAME_COLUMNS, columns)}
+    arrays["id"] = arrays["id"].astype("int64")
+    arrays["work"] = arrays["work"].astype(bool)
+    return arrays
+
+
+def _day_columns(np, rows: list[tuple]) -> dict:
+    arrays = {
+        "game_id": np.fromiter((row[0] for row in rows), dtype="int64", count=len(rows)),
+        "day": np.fromiter((row[1] for row in rows), dtype="int32", count=len(rows)),
+    }
+    for field, dtype in _STAT_DTYPES.items():
+        arrays[field] = np.fromiter((getattr(row[2], field) for row in rows), dtype=dtype, count=len(rows))
+    return arrays
+
+
+def load_watermark(path) -> dict[int, int]:
+    """The watermark of an earlier run, from its watermark.npz."""
+    import numpy as np
+
+    with np.load(path) as data:
+        return dict(zip(data["game_id"].tolist(), data["day"].tolist()))
+
+
+def export_run(
+    export_dir=None,
+    full: bool = False,
+    sessions: Optional[Callable[[], AbstractContextManager[Session]]] = None,
+) -> dict:
+    """
+    Exports into a new run directory under `export_dir`, named by its UTC
+    start time, incrementally from the latest complete run unless `full`.
+    Raises `ExportInProgress` while another run of this process is writing.
+    """
+    if not _running.acquire(blocking=False):
+        raise ExportInProgress()
+    try:
+        root = Path(export_dir or EXPORT_DIR)
+        previous = latest_run(root)
+        since = None if full or previous is None else load_watermark(root / previous / "watermark.npz")
+        name = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        manifest = export(root / name, since=since, sessions=sessions)
+        return {"run": name, "since": None if since is None else previous, **manifest}
+    finally:
+        _running.release()
+
+
+def latest_run(root: Path) -> Optional[str]:
+    """Name of the newest run under `root` that finished (has a manifest)."""
+    runs = sorted(path.parent.name for path in root.glob("*/manifest.json"))
+    return runs[-1] if runs else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export games and days as compressed NPZ columns.")
+    parser.add_argument("out_dir")
+    parser.add_argument("--since", help="watermark.npz of an earlier export; only newer days are written")
+    parser.add_argument("--chunk-games", type=int, default=EXPORT_CHUNK_GAMES)
+    args = parser.parse_args()
+
+    since = load_watermark(args.since) if args.since else None
+    print(json.dumps(export(args.out_dir, since=since, chunk_games=args.chunk_games), indent=2))
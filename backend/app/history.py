@@ -0,0 +1,234 @@
+"""
+Day history storage: full snapshots or checkpoint + delta encoding.
+
+In "snapshot" mode every day is a full `Day` row. In "delta" mode only every
+`DAY_CHECKPOINT_INTERVAL`-th day (and day 1) is a full `Day` row; the days in
+between are `DayDelta` rows holding the packed `Impact` that produced them.
+A day's stats are rebuilt by taking the latest checkpoint at or before it and
+replaying the impacts after it with `apply_impact`, which performs exactly
+the same arithmetic as the live turn, so reconstruction is bit-exact.
+
+Both layouts are read the same way, so a database can switch modes at any
+time.
+"""
+
+import struct
+from typing import Iterable, Iterator, Optional, Sequence
+
+from sqlalchemy import Row, func
+from sqlalchemy.orm import Query, Session
+
+from . import init_db, models, rules
+from .rules import apply_impact
+from .settings import settings
+
+DAY_STORAGE_MODE = settings.day_storage_mode
+DAY_CHECKPOINT_INTERVAL = settings.day_checkpoint_interval
+
+STAT_FIELDS = rules.STAT_FIELDS
+IMPACT_FIELDS = tuple(models.Impact.model_fields)
+DAY_COLUMNS = tuple(
+    getattr(init_db.Day, column) for column in ("game_id", "number_of_day", *STAT_FIELDS)
+)
+# health, happiness, stress, reputation, education as int32, the rest as float64.
+_IMPACT_STRUCT = struct.Struct("<5i4d")
+
+
+def pack_impact(impact: models.Impact) -> bytes:
+    return _IMPACT_STRUCT.pack(*(getattr(impact, field) for field in IMPACT_FIELDS))
+
+
+def unpack_impact(data: bytes) -> models.Impact:
+    return models.Impact.model_construct(**dict(zip(IMPACT_FIELDS, _IMPACT_STRUCT.unpack(data))))
+
+
+def stats_from_day(day: init_db.Day) -> models.Stats:
+    """
+    Reads the stat columns of a Day row (or any row with those attributes)
+    into a Stats model, clamped to the schema bounds (rows written before the
+    bounds were enforced may exceed them).
+    """
+    return rules.from_vector(rules.clamp([getattr(day, field) for field in STAT_FIELDS]))
+
+
+def is_checkpoint(number_of_day: int) -> bool:
+    """Whether a day is written as a full row under the current mode."""
+    if DAY_STORAGE_MODE != "delta" or DAY_CHECKPOINT_INTERVAL <= 1:
+        return True
+    return (number_of_day - 1) % DAY_CHECKPOINT_INTERVAL == 0
+
+
+def record_day(
+    db: Session,
+    game_id: int,
+    number_of_day: int,
+    stats: models.Stats,
+    impact: models.Impact,
+) -> None:
+    """Adds the row for a new day, reached by applying `impact` to the previous one."""
+    if is_checkpoint(number_of_day):
+        db.add(init_db.Day(game_id=game_id, number_of_day=number_of_day, **stats.model_dump()))
+    else:
+        db.add(init_db.DayDelta(game_id=game_id, number_of_day=number_of_day, impact=pack_impact(impact)))
+
+
+def delete_day(db: Session, game_id: int, number_of_day: int) -> None:
+    """Deletes the row of a day, whichever layout it was written in."""
+    for table in (init_db.Day, init_db.DayDelta):
+        db.query(table).filter(
+            table.game_id == game_id, table.number_of_day == number_of_day
+        ).delete(synchronize_session=False)
+
+
+def load_current_state(db: Session, game_id) -> Optional[tuple[init_db.Game, Optional[models.Stats]]]:
+    """
+    Returns the game and the stats of its current day, or None if the game
+    does not exist (stats are None if the game has no days).
+
+    When the current day is a full row this is a single joined read.
+    """
+    row = (
+        db.query(init_db.Game, init_db.Day)
+        .outerjoin(init_db.Day, (init_db.Day.game_id == init_db.Game.id)
+                   & (init_db.Day.number_of_day == init_db.Game.current_day))
+        .filter(init_db.Game.id == game_id)
+        .first()
+    )
+    if row is None:
+        return None
+    db_game, day = row
+    if day is not None:
+        return db_game, stats_from_day(day)
+    return db_game, stats_at(db, db_game.id, db_game.current_day)
+
+
+def stats_at(db: Session, game_id: int, number_of_day: int) -> Optional[models.Stats]:
+    """Reconstructs the stats of any day by checkpoint plus replay."""
+    for day, stats in iter_timeline(db, game_id, start=number_of_day, end=number_of_day):
+        return stats
+    return None
+
+
+def iter_timeline(
+    db: Session,
+    game_id: int,
+    start: int = 1,
+    end: Optional[int] = None,
+) -> Iterator[tuple[int, models.Stats]]:
+    """
+    Yields (number_of_day, stats) for every stored day in [start, end], in order.
+
+    Runs one query for the checkpoint rows and one for the deltas, both as
+    ordered range scans on (game_id, number_of_day), and replays in a single
+    forward pass.
+    """
+    queries = timeline_queries(db, [game_id], start, end)
+    if queries is None:
+        return
+    days, deltas = queries
+    for _, number, stats in replay_timelines(days.yield_per(500), deltas.yield_per(500)):
+        if number >= start:
+            yield number, stats
+
+
+def timeline_queries(
+    db: Session,
+    game_ids: Sequence[int],
+    start: int = 1,
+    end: Optional[int] = None,
+) -> Optional[tuple[Query, Query]]:
+    """
+    The `Day` and `DayDelta` queries that `replay_timelines` needs to rebuild
+    days [start, end] of several games, ordered by (game_id, number_of_day).
+    They start at the earliest checkpoint any of the games needs, so they may
+    also return some days before `start`. None if no game has a day.
+    """
+    checkpoints = (
+        db.query(func.max(init_db.Day.number_of_day))
+        .filter(init_db.Day.game_id.in_(game_ids), init_db.Day.number_of_day <= start)
+        .group_by(init_db.Day.game_id)
+        .all()
+    )
+    if not checkpoints:
+        return None
+    checkpoint = min(number for number, in checkpoints)
+
+    day_filter = [init_db.Day.game_id.in_(game_ids), init_db.Day.number_of_day >= checkpoint]
+    delta_filter = [init_db.DayDelta.game_id.in_(game_ids), init_db.DayDelta.number_of_day > checkpoint]
+    if end is not None:
+        day_filter.append(init_db.Day.number_of_day <= end)
+        delta_filter.append(init_db.DayDelta.number_of_day <= end)
+
+    # Plain rows rather than `Day` entities: same attributes, a fraction of the cost.
+    days = (
+        db.query(*DAY_COLUMNS).filter(*day_filter)
+        .order_by(init_db.Day.game_id, init_db.Day.number_of_day)
+    )
+    deltas = (
+        db.query(init_db.DayDelta.game_id, init_db.DayDelta.number_of_day, init_db.DayDelta.impact)
+        .filter(*delta_filter)
+        .order_by(init_db.DayDelta.game_id, init_db.DayDelta.number_of_day)
+    )
+    return days, deltas
+
+
+def replay_timelines(
+    days: Iterable[Row],
+    deltas: Iterable[tuple[int, int, bytes]],
+) -> Iterator[tuple[int, int, models.Stats]]:
+    """
+    Merges the rows of `timeline_queries` (as results or already fetched
+    lists; days are `DAY_COLUMNS` rows) into (game_id, number_of_day, stats), in the same order. Deltas
+    before a game's first checkpoint row have nothing to apply to and are
+    skipped.
+    """
+    days, deltas = iter(days), iter(deltas)
+    next_day = next(days, None)
+    next_delta = next(deltas, None)
+    game_id, stats = None, None
+    while next_day is not None or next_delta is not None:
+        if next_delta is None or (
+            next_day is not None
+            and (next_day.game_id, next_day.number_of_day) <= (next_delta[0], next_delta[1])
+        ):
+            game_id, number, stats = next_day.game_id, next_day.number_of_day, stats_from_day(next_day)
+            next_day = next(days, None)
+        else:
+            delta_game_id, number, packed = next_delta
+            next_delta = next(deltas, None)
+            if delta_game_id != game_id:
+                continue
+            stats = apply_impact(stats, unpack_impact(packed))
+        yield game_id, number, stats
+
+
+def timeline_page(db: Session, game_id: int, after: int, limit: int) -> list[tuple[int, models.Stats]]:
+    """
+    Returns (number_of_day, stats) for up to `limit` days after day `after`.
+
+    Days are numbered without gaps, so the page is the key range
+    (after, after + limit] and costs the same wherever it starts.
+    """
+    return list(iter_timeline(db, game_id, start=after + 1, end=after + limit))
+
+
+def timeline_row(number: int, stats: models.Stats) -> dict:
+    return {"day": number, **stats.model_dump()}
+
+
+def timeline_columns(rows: Iterable[tuple[int, models.Stats]]) -> dict[str, list]:
+    """
+    Turns (number_of_day, stats) pairs into columnar form:
+    {"day": [...], "health": [...], ..., "free_time": [...]}.
+    """
+    timeline: dict[str, list] = {"day": [], **{field: [] for field in STAT_FIELDS}}
+    for number, stats in rows:
+        timeline["day"].append(number)
+        for field in STAT_FIELDS:
+            timeline[field].append(getattr(stats, field))
+    return timeline
+
+
+def get_stat_timeline(db: Session, game_id: int) -> dict[str, list]:
+    """Returns a game's full stat history in columnar form (see `timeline_columns`)."""
+    return timeline_columns(iter_timeline(db, game_id))
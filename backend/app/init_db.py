@@ -1,27 +1,188 @@
 # models.py
+import threading
+
 from sqlalchemy import (
     create_engine,
+    event,
     Column,
     Integer,
     Float,
     String,
     Boolean,
     ForeignKey,
+    Index,
+    LargeBinary,
+    Text,
+    inspect,
 )
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import declarative_base, relationship, sessionmaker
+from sqlalchemy.pool import StaticPool
 
-DATABASE_URL = "sqlite:///./mydb.sqlite"
+from .settings import settings
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},  
-)
+DATABASE_URL = settings.database_url
+
+# ------------------- Storage profiles -------------------
+# PRAGMAs applied to every new SQLite connection. "production" uses WAL so
+# readers never block the writer, relaxes fsyncs to once per checkpoint and
+# waits on a busy database instead of failing with "database is locked".
+# "default" keeps SQLite's own settings (rollback journal, synchronous=FULL).
+SQLITE_PROFILES = {
+    "default": {},
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,           # ms
+        "cache_size": -64000,           # negative = KiB, i.e. ~64 MB
+        "mmap_size": 256 * 1024 * 1024,  # bytes
+        "temp_store": "MEMORY",
+    },
+}
+
+DB_PROFILE = settings.db_profile
+DB_POOL_SIZE = settings.db_pool_size
+DB_MAX_OVERFLOW = settings.db_max_overflow
+# Separate query-only pool for GET endpoints. An in-memory database only
+# exists on the write engine's connection, so it is always read through that.
+DB_READ_POOL = settings.db_read_pool
+
+
+def create_db_engine(url: str = DATABASE_URL, profile: str = DB_PROFILE, read_only: bool = False):
+    """
+    Creates an engine for `url` with the PRAGMAs of `profile` applied on
+    connect. With `read_only=True` the connections refuse writes.
+    """
+    pragmas = _pragmas(profile, read_only)
+    new_engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        **_pool_args(url),
+    )
+    _apply_pragmas(new_engine, pragmas)
+    return new_engine
+
+
+def create_async_db_engine(url: str = DATABASE_URL, profile: str = DB_PROFILE, read_only: bool = False):
+    """
+    Async counterpart of `create_db_engine`: an `AsyncEngine` over aiosqlite
+    for the same database, with the same pool sizes and PRAGMAs.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    pragmas = _pragmas(profile, read_only)
+    url = make_url(url)
+    if url.drivername == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    new_engine = create_async_engine(url, **_pool_args(url))
+    # Connect events fire on the sync facade; its DBAPI connection is aiosqlite's adapter.
+    _apply_pragmas(new_engine.sync_engine, pragmas)
+    return new_engine
+
+
+def _is_in_memory(url) -> bool:
+    """Whether `url` names an in-memory SQLite database (`sqlite://` included)."""
+    url = make_url(url)
+    return url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+
+
+def _pool_args(url) -> dict:
+    if _is_in_memory(url):
+        # In-memory databases only exist on a single connection.
+        return {"poolclass": StaticPool}
+    return {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW}
+
+
+def _pragmas(profile: str, read_only: bool) -> dict:
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE {profile!r}, expected one of {sorted(SQLITE_PROFILES)}")
+
+    pragmas = dict(SQLITE_PROFILES[profile])
+    if read_only:
+        # The journal mode is a property of the file; leave it to the writer.
+        pragmas.pop("journal_mode", None)
+        pragmas["query_only"] = "ON"
+    return pragmas
+
+
+def _apply_pragmas(new_engine, pragmas: dict) -> None:
+    @event.listens_for(new_engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+
+# The app's engines and session factories are created on first access, so
+# importing this module (e.g. for the models) opens nothing.
+_ENGINE_ATTRIBUTES = ("engine", "SessionLocal", "read_engine", "ReadSessionLocal")
+_engines_lock = threading.Lock()
+
+
+def _create_engines() -> None:
+    global engine, SessionLocal, read_engine, ReadSessionLocal
+    with _engines_lock:
+        if "engine" in globals():
+            return
+        rw_engine = create_db_engine()
+        SessionLocal = sessionmaker(
+            autocommit=False,
+            autoflush=False,
+            bind=rw_engine,
+        )
+
+        if DB_READ_POOL and not _is_in_memory(DATABASE_URL):
+            read_engine = create_db_engine(read_only=True)
+            ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+        else:
+            read_engine = rw_engine
+            ReadSessionLocal = SessionLocal
+        # Set last: its presence marks the engines as created.
+        engine = rw_engine
+
+
+# The async engines (see create_async_db_engine) are created separately, on
+# first use, so aiosqlite and SQLAlchemy's asyncio extension are only loaded
+# by processes that serve the /async endpoints.
+_ASYNC_ENGINE_ATTRIBUTES = ("async_engine", "AsyncSessionLocal", "async_read_engine", "AsyncReadSessionLocal")
+
+
+def _create_async_engines() -> None:
+    global async_engine, AsyncSessionLocal, async_read_engine, AsyncReadSessionLocal
+    with _engines_lock:
+        if "async_engine" in globals():
+            return
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        rw_engine = create_async_db_engine()
+        AsyncSessionLocal = async_sessionmaker(autoflush=False, bind=rw_engine)
+        if DB_READ_POOL and not _is_in_memory(DATABASE_URL):
+            async_read_engine = create_async_db_engine(read_only=True)
+            AsyncReadSessionLocal = async_sessionmaker(autoflush=False, bind=async_read_engine)
+        else:
+            async_read_engine = rw_engine
+            AsyncReadSessionLocal = AsyncSessionLocal
+        async_engine = rw_engine
+
+
+def get_engine():
+    """The app's read-write engine."""
+    if "engine" not in globals():
+        _create_engines()
+    return engine
+
+
+def __getattr__(name: str):
+    if name in _ENGINE_ATTRIBUTES:
+        _create_engines()
+        return globals()[name]
+    if name in _ASYNC_ENGINE_ATTRIBUTES:
+        _create_async_engines()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-SessionLocal = sessionmaker(
-    autocommit=False,
-    autoflush=False,
-    bind=engine,
-)
 
 Base = declarative_base()
 
@@ -44,6 +205,10 @@ class Game(Base):
 
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
 
+    # Number of the latest Day, so the current state is a single index probe
+    # on (game_id, number_of_day) instead of a sort over all days.
+    current_day = Column(Integer, nullable=False, default=1)
+
     user = relationship("User", back_populates="games")
 
     days = relationship(
@@ -72,11 +237,192 @@ class Day(Base):
 
     game = relationship("Game", back_populates="days")
 
+    __table_args__ = (
+        Index("ix_days_game_id_number_of_day", "game_id", "number_of_day", unique=True),
+    )
+
+
+class DayDelta(Base):
+    """
+    A day stored as the impact applied to the previous day, used by the
+    "delta" storage mode between full `Day` checkpoints (see app/history.py).
+    """
+    __tablename__ = "day_deltas"
+
+    game_id = Column(Integer, ForeignKey("games.id"), primary_key=True)
+    number_of_day = Column(Integer, primary_key=True)
+    impact = Column(LargeBinary, nullable=False)
+
+    # Clustered on the primary key: no separate rowid b-tree.
+    __table_args__ = {"sqlite_with_rowid": False}
+
+
+class IssuedEvent(Base):
+    """
+    An event served to a game for one day (see app/ledger.py). Its id is the
+    `event_id` clients send back together with the chosen option index.
+    """
+    __tablename__ = "issued_events"
+
+    id = Column(Integer, primary_key=True)
+
+    game_id = Column(Integer, ForeignKey("games.id"), nullable=False)
+    number_of_day = Column(Integer, nullable=False)
+    # The event's description and options as compact JSON.
+    payload = Column(Text, nullable=False)
+    # Index of the option the player chose; NULL until the day is played.
+    chosen_option = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("ix_issued_events_game_id_number_of_day", "game_id", "number_of_day", unique=True),
+    )
+
+
+class DayCohort(Base):
+    """
+    Running totals over every game's final day N (see app/aggregates.py):
+    the number of games that reached it and the sum of each stat.
+    """
+    __tablename__ = "day_cohorts"
+
+    number_of_day = Column(Integer, primary_key=True)
+    players = Column(Integer, nullable=False)
+
+    sum_health = Column(Float, nullable=False)
+    sum_happiness = Column(Float, nullable=False)
+    sum_stress = Column(Float, nullable=False)
+    sum_reputation = Column(Float, nullable=False)
+    sum_education = Column(Float, nullable=False)
+    sum_money = Column(Float, nullable=False)
+    sum_weekly_income = Column(Float, nullable=False)
+    sum_weekly_expense = Column(Float, nullable=False)
+    sum_free_time = Column(Float, nullable=False)
+
+
+class GameSummary(Base):
+    """
+    One row per game, as of its latest final day (see app/aggregates.py).
+    The (value, game_id) indexes serve the leaderboards as backward scans.
+    `played_at` is when that day became final (epoch seconds); it is NULL for
+    rows rebuilt from the day history, which records no times.
+    """
+    __tablename__ = "game_summaries"
+
+    game_id = Column(Integer, ForeignKey("games.id"), primary_key=True)
+    final_day = Column(Integer, nullable=False)
+    reputation = Column(Integer, nullable=False)
+    money = Column(Float, nullable=False)
+    max_money = Column(Float, nullable=False)
+    min_health = Column(Integer, nullable=False)
+    played_at = Column(Float, nullable=True)
+
+    __table_args__ = (
+        Index("ix_game_summaries_reputation", "reputation", "game_id"),
+        Index("ix_game_summaries_max_money", "max_money", "game_id"),
+        Index("ix_game_summaries_final_day", "final_day", "game_id"),
+        Index("ix_game_summaries_played_at", "played_at"),
+    )
+
+
+# ------------------- Schema migrations -------------------
+# The schema version is stored in SQLite's `PRAGMA user_version`. Fresh
+# databases are created at SCHEMA_VERSION directly; existing ones are brought
+# up to date by running every migration newer than their version, in order.
+
+def _migrate_v1_days_index_and_current_day(conn):
+    conn.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_days_game_id_number_of_day "
+        "ON days (game_id, number_of_day)"
+    )
+    conn.exec_driver_sql(
+        "ALTER TABLE games ADD COLUMN current_day INTEGER NOT NULL DEFAULT 1"
+    )
+    conn.exec_driver_sql(
+        "UPDATE games SET current_day = "
+        "(SELECT MAX(number_of_day) FROM days WHERE days.game_id = games.id) "
+        "WHERE EXISTS (SELECT 1 FROM days WHERE days.game_id = games.id)"
+    )
+
+
+def _migrate_v2_day_deltas(conn):
+    DayDelta.__table__.create(bind=conn, checkfirst=True)
+
+
+def _migrate_v3_issued_events(conn):
+    IssuedEvent.__table__.create(bind=conn, checkfirst=True)
+
+
+def _migrate_v4_aggregates(conn):
+    from sqlalchemy.orm import Session
+
+    from . import aggregates
+
+    DayCohort.__table__.create(bind=conn, checkfirst=True)
+    GameSummary.__table__.create(bind=conn, checkfirst=True)
+    with Session(bind=conn) as db:
+        aggregates.rebuild(db)
+
+
+def _migrate_v5_summary_played_at(conn):
+    # Tables created by v4 already have the column; only older v4 ones lack it.
+    columns = {column["name"] for column in inspect(conn).get_columns("game_summaries")}
+    if "played_at" not in columns:
+        conn.exec_driver_sql("ALTER TABLE game_summaries ADD COLUMN played_at FLOAT")
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_game_summaries_played_at ON game_summaries (played_at)"
+    )
+
+
+MIGRATIONS = [
+    (1, _migrate_v1_days_index_and_current_day),
+    (2, _migrate_v2_day_deltas),
+    (3, _migrate_v3_issued_events),
+    (4, _migrate_v4_aggregates),
+    (5, _migrate_v5_summary_played_at),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def init_db(bind=None):
+    """Creates the tables, or migrates an existing database to SCHEMA_VERSION."""
+    with (bind or get_engine()).begin() as conn:
+        version = conn.exec_driver_sql("PRAGMA user_version").scalar()
+        if version == 0 and not inspect(conn).has_table("games"):
+            version = SCHEMA_VERSION
+        else:
+            for target, migration in MIGRATIONS:
+                if version < target:
+                    migration(conn)
+                    version = target
+        Base.metadata.create_all(bind=conn)
+        conn.exec_driver_sql(f"PRAGMA user_version = {version}")
+
+
+def schema_version(bind=None) -> int:
+    """The schema version of the database (0 for a fresh one)."""
+    with (bind or get_engine()).connect() as conn:
+        return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def ensure_schema(bind=None) -> bool:
+    """
+    Creates or migrates the schema unless it is already at SCHEMA_VERSION.
+    Returns True if anything was done.
 
-def init_db():
-    Base.metadata.create_all(bind=engine)
+    Safe to run from several worker processes at once: a worker that loses
+    the race to migrate re-checks the version instead of failing.
+    """
+    bind = bind or get_engine()
+    if schema_version(bind) == SCHEMA_VERSION:
+        return False
+    try:
+        init_db(bind)
+    except OperationalError:
+        if schema_version(bind) != SCHEMA_VERSION:
+            raise
+    return True
 
 
 if __name__ == "__main__":
     init_db()
-    print("Tables are created in mydb.sqlite")
\ No newline at end of file
+    print(f"Tables are created in {make_url(DATABASE_URL).database or DATABASE_URL}")
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""
+Ledger of the events served to each game.
+
+Every event handed to a client is stored as an `IssuedEvent` row in the same
+transaction as the day it belongs to, and its row id becomes the event's
+`event_id`. A choice can then be submitted as `(event_id, option_index)`: the
+impact is looked up by primary key instead of being trusted from the client,
+and a repeated submission of an already played event is answered from the
+ledger rather than playing the day twice.
+"""
+
+import json
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from . import init_db, models
+
+
+def issue_event(db: Session, game_id: int, number_of_day: int, event: dict) -> dict:
+    """
+    Adds `event` to the ledger as the event of `number_of_day` (flushed, not
+    committed) and returns a copy carrying its ledger `event_id`.
+    """
+    issued = init_db.IssuedEvent(
+        game_id=game_id,
+        number_of_day=number_of_day,
+        payload=json.dumps(
+            {"description": event["description"], "options": event["options"]},
+            separators=(",", ":"),
+        ),
+    )
+    db.add(issued)
+    db.flush()
+    return {**event, "event_id": issued.id}
+
+
+def get_issued(db: Session, game_id, event_id: int) -> Optional[init_db.IssuedEvent]:
+    """The ledger entry for `event_id` if it was issued to `game_id`."""
+    issued = db.get(init_db.IssuedEvent, event_id)
+    if issued is None or str(issued.game_id) != str(game_id):
+        return None
+    return issued
+
+
+def get_issued_for_day(db: Session, game_id: int, number_of_day: int) -> Optional[init_db.IssuedEvent]:
+    return (
+        db.query(init_db.IssuedEvent)
+        .filter(
+            init_db.IssuedEvent.game_id == game_id,
+            init_db.IssuedEvent.number_of_day == number_of_day,
+        )
+        .first()
+    )
+
+
+def event_of(issued: init_db.IssuedEvent) -> dict:
+    """The served event, as returned to the client."""
+    return {"event_id": issued.id, **json.loads(issued.payload)}
+
+
+def option_impact(issued: init_db.IssuedEvent, option_index: int) -> Optional[models.Impact]:
+    """The impact of option `option_index`, or None if there is no such option."""
+    options = json.loads(issued.payload)["options"]
+    if not 0 <= option_index < len(options):
+        return None
+    return models.Impact(**options[option_index]["impact"])
@@ -2,7 +2,12 @@
 LLM module for event generation and parameter calculation.
 """
 
-from .gemini_client import generate_response
-from .event_generator import generate_event
+from .gemini_client import generate_response, generate_response_async
+from .event_generator import generate_event, generate_event_async
 
-__all__ = ["generate_response", "generate_event"]
+__all__ = [
+    "generate_response",
+    "generate_response_async",
+    "generate_event",
+    "generate_event_async",
+]
@@ -0,0 +1,144 @@
+"""
+Micro-batching of live event generation across games.
+
+Generation requests arriving within a short window (`LLM_BATCH_WINDOW_MS`)
+are packed into one prompt (`build_batch_prompt`) that asks for a JSON
+array with one event per game state; the array is validated element by
+element and fanned back out to the waiting callers. A full batch
+(`LLM_BATCH_MAX_SIZE`) is sent without waiting for the window. If the whole
+call fails, or single elements are missing or invalid, the affected callers
+fall back to a regular single-event generation, so batching never fails a
+request that would have succeeded on its own.
+
+Batching trades up to one window of extra latency for fewer LLM requests
+(one static prompt prefix and one rate-limit slot per batch).
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+from ..models import Game
+from ..settings import settings
+from .gemini_client import generate_response_async
+from .prompts import build_batch_prompt, build_event_prompt
+from .validation import EventValidationError, generate_valid_event, validate_event
+
+LLM_BATCH_ENABLED = settings.llm_batch
+
+
+async def generate_single_event(game_state: Game) -> dict:
+    """One validated event from one LLM call (with retries)."""
+    prompt = build_event_prompt(game_state)
+    return await generate_valid_event(lambda: generate_response_async(prompt))
+
+
+class BatchScheduler:
+    """
+    Collects generation requests and sends them to the LLM in batches.
+
+    Args:
+        generate: Coroutine function sending a prompt and returning the parsed reply.
+        window: Seconds to wait for more requests after the first one.
+        max_size: Requests per batch; a full batch is sent immediately.
+        single: Coroutine function used for batches of one and for fallbacks.
+    """
+
+    def __init__(
+        self,
+        generate: Callable[[str], Awaitable[object]] = generate_response_async,
+        window: float = 0.03,
+        max_size: int = 8,
+        single: Callable[[Game], Awaitable[dict]] = generate_single_event,
+    ):
+        self._generate = generate
+        self.window = window
+        self.max_size = max_size
+        self._single = single
+        self._pending: list[tuple[Game, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._loop = None
+        self._tasks: set[asyncio.Task] = set()
+        self.batches = 0
+        self.batched_requests = 0
+        self.batched_events = 0
+        self.fallbacks = 0
+
+    async def submit(self, game_state: Game) -> dict:
+        """Generate an event for `game_state` as part of the next batch."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Tests run several event loops; never carry work across them.
+            self._loop, self._pending, self._timer = loop, [], None
+
+        future = loop.create_future()
+        self._pending.append((game_state, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = self._loop.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[Game, asyncio.Future]]) -> None:
+        if len(batch) == 1:
+            await self._resolve_single(*batch[0])
+            return
+
+        self.batches += 1
+        self.batched_requests += len(batch)
+        try:
+            reply = await self._generate(build_batch_prompt([state for state, _ in batch]))
+        except Exception:
+            reply = None
+        if isinstance(reply, dict):
+            reply = reply.get("events")
+        events = reply if isinstance(reply, list) else []
+
+        retry = []
+        for i, (state, future) in enumerate(batch):
+            try:
+                event = validate_event(events[i]).model_dump()
+            except (IndexError, EventValidationError):
+                retry.append((state, future))
+                continue
+            self.batched_events += 1
+            if not future.done():
+                future.set_result(event)
+
+        self.fallbacks += len(retry)
+        await asyncio.gather(*(self._resolve_single(state, future) for state, future in retry))
+
+    async def _resolve_single(self, game_state: Game, future: asyncio.Future) -> None:
+        try:
+            event = await self._single(game_state)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(event)
+
+    def stats(self) -> dict:
+        """Batch sizes and fallbacks for monitoring."""
+        return {
+            "batches": self.batches,
+            "batched_events": self.batched_events,
+            "mean_batch_size": self.batched_requests / self.batches if self.batches else 0.0,
+            "fallbacks": self.fallbacks,
+            "pending": len(self._pending),
+        }
+
+
+batch_scheduler = BatchScheduler(
+    window=settings.llm_batch_window_ms / 1000,
+    max_size=settings.llm_batch_max_size,
+)
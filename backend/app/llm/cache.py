@@ -0,0 +1,158 @@
+"""
+Response cache and single-flight coalescing for event generation.
+
+`build_event_prompt` renders the same prompt for the same day and stats, apart
+from the embedded `event_id` timestamp, so every new game (day 1, default
+`Stats`) sends a byte-identical request. The cache keys generated events by a
+fingerprint of the prompt with the `event_id` normalized away, evicts by LRU
+and TTL, and can be backed by a `StateStore` (see app/state.py) so entries
+survive restarts and are shared between worker processes. Concurrent requests
+for the same key share a single in-flight LLM call.
+"""
+
+import asyncio
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from ..settings import settings
+from ..state import STATE_BACKEND, SQLiteStore, StateStore, get_shared_store
+
+LLM_CACHE_ENABLED = settings.llm_cache
+
+_EVENT_ID = re.compile(r'"event_id": \d+')
+
+
+def prompt_fingerprint(prompt: str) -> str:
+    """Stable cache key for a prompt, ignoring its event_id."""
+    normalized = _EVENT_ID.sub('"event_id": 0', prompt)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """
+    LRU + TTL cache of generated events with single-flight coalescing.
+
+    Args:
+        max_entries: Entries kept in memory before the least recently used is evicted.
+        ttl: Seconds an entry stays valid.
+        path: Optional SQLite file used as a second, persistent tier.
+        store: Optional shared store used as the second tier instead of `path`.
+        store_factory: Called on first use to create `store` instead.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl: float = 3600.0,
+        path: Optional[str] = None,
+        store: Optional[StateStore] = None,
+        store_factory: Optional[Callable[[], StateStore]] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (expires_at, serialized event)
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._bytes = 0
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._resolved_store = SQLiteStore(path) if path else store
+        self._store_factory = store_factory
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @property
+    def _store(self) -> Optional[StateStore]:
+        if self._resolved_store is None and self._store_factory is not None:
+            self._resolved_store = self._store_factory()
+        return self._resolved_store
+
+    async def get(self, key: str) -> Optional[dict]:
+        """Return the cached event for `key`, or None."""
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self._entries.move_to_end(key)
+                return json.loads(entry[1])
+            self._evict(key)
+
+        if self._store is not None:
+            value = await self._store.get_async("cache:" + key)
+            if value is not None:
+                self._remember(key, value, now + self.ttl)
+                return json.loads(value)
+        return None
+
+    async def put(self, key: str, event: dict) -> None:
+        value = json.dumps(event, separators=(",", ":"))
+        expires_at = time.time() + self.ttl
+        self._remember(key, value, expires_at)
+        if self._store is not None:
+            await self._store.set_async("cache:" + key, value, self.ttl)
+
+    async def get_or_generate(self, key: str, generate: Callable[[], Awaitable[dict]]) -> dict:
+        """
+        Return the cached event for `key`, joining an identical in-flight call
+        if there is one and starting `generate` otherwise.
+
+        The generation runs in its own task, so a cancelled caller (e.g. a
+        dropped prefetch branch) does not cancel it for the others.
+        """
+        event = await self.get(key)
+        if event is not None:
+            self.hits += 1
+            return event
+
+        task = self._inflight.get(key)
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.create_task(self._generate_and_store(key, generate))
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _generate_and_store(self, key: str, generate: Callable[[], Awaitable[dict]]) -> dict:
+        try:
+            event = await generate()
+            await self.put(key, event)
+            return event
+        finally:
+            self._inflight.pop(key, None)
+
+    def _remember(self, key: str, value: str, expires_at: float) -> None:
+        self._evict(key)
+        self._entries[key] = (expires_at, value)
+        self._bytes += len(value)
+        while len(self._entries) > self.max_entries:
+            self._evict(next(iter(self._entries)))
+
+    def _evict(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+
+    def stats(self) -> dict:
+        """Hit ratio and memory footprint for monitoring."""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+        }
+
+
+response_cache = GenerationCache(
+    max_entries=settings.llm_cache_max_entries,
+    ttl=settings.llm_cache_ttl_s,
+    path=settings.llm_cache_path,
+    # The in-memory tier already covers the single-process "memory" backend.
+    store_factory=get_shared_store if STATE_BACKEND != "memory" else None,
+)
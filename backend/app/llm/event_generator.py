@@ -4,8 +4,16 @@ Generates day-based events with choices and parameter impacts.
 """
 
 from ..models import Game
-from .gemini_client import generate_response
+from ..settings import settings
+from .cache import LLM_CACHE_ENABLED, prompt_fingerprint, response_cache
+from .event_pool import EVENT_POOL_ENABLED, event_pool, generate_live_event
+from .gemini_client import _get_mock_event, generate_response, generate_response_async, llm_gateway
 from .prompts import build_event_prompt
+from .validation import generate_valid_event, validate_event
+
+# Serve cached, pooled or mock events while the LLM gateway is unavailable
+# (instead of answering 503).
+LLM_DEGRADE_ENABLED = settings.llm_degrade
 
 
 def generate_event(game_state: Game) -> dict:
@@ -20,3 +28,68 @@ def generate_event(game_state: Game) -> dict:
     """
     prompt = build_event_prompt(game_state)
     return generate_response(prompt)
+
+
+async def generate_event_async(game_state: Game, speculative: bool = False) -> dict:
+    """
+    Async variant of `generate_event` for use inside the API endpoints.
+
+    Draws from the pre-generated event pool first and only calls the LLM
+    (through the response cache) on a miss; live events are added to the pool
+    for reuse by other games.
+
+    Args:
+        game_state: Current Game object with all stats and properties
+        speculative: The event may never be served (a prefetch branch), so
+            it is not marked as seen by the game; the caller marks it with
+            `event_pool.mark_served` if it is.
+
+    Returns:
+        dict: Event with description and options, each with impacts
+    """
+    if not EVENT_POOL_ENABLED:
+        return await generate_cached_event(game_state)
+
+    event = await event_pool.draw(game_state, mark=not speculative)
+    if event is None:
+        event = await generate_cached_event(game_state)
+        event_pool.add(game_state, event)
+        if not speculative and game_state.game_id:
+            await event_pool.mark_served(game_state.game_id, event)
+    return event
+
+
+async def generate_cached_event(game_state: Game) -> dict:
+    """
+    Live generation through the response cache: identical prompts (same day
+    and stats) are served from the cache or share one in-flight LLM call.
+    """
+    if not LLM_CACHE_ENABLED:
+        return await generate_live_event(game_state)
+
+    prompt = build_event_prompt(game_state)
+    return await response_cache.get_or_generate(
+        prompt_fingerprint(prompt),
+        lambda: generate_valid_event(lambda: generate_response_async(prompt)),
+    )
+
+
+async def degraded_event(game_state: Game) -> dict:
+    """
+    An event for `game_state` served without the LLM, for when the gateway
+    is unavailable (circuit open, load shed or out of retries).
+
+    Tries, in order: the response cache for this exact prompt, an unseen
+    pooled event of the game's bucket, any pooled event of that bucket (a
+    repeat beats an error), and finally the mock event.
+    """
+    event = await response_cache.get(prompt_fingerprint(build_event_prompt(game_state)))
+    source = "cache"
+    if event is None:
+        event = await event_pool.draw(game_state) or event_pool.any_event(game_state)
+        source = "pool"
+    if event is None:
+        event = validate_event(_get_mock_event()).model_dump()
+        source = "mock"
+    llm_gateway.degraded[source] += 1
+    return event
@@ -0,0 +1,256 @@
+"""
+Pre-generated event pool indexed by quantized stat-space buckets.
+
+Many game states are close to each other (every game starts from the default
+`Stats` on day 1), so an event generated for one of them fits the others just
+as well. The pool stores validated events per bucket of
+(day band, health, happiness, stress, money band, work flag), serves them
+without an LLM round-trip and never repeats an event within the same game.
+A background filler keeps every bucket that has seen demand above a
+low-water mark.
+
+The pooled events are per process, but the record of what each game has
+seen lives in a `StateStore`, so no-repeat holds across worker processes.
+"""
+
+import asyncio
+import bisect
+import random
+from typing import Awaitable, Callable, Optional
+
+from pydantic import ValidationError
+
+from ..models import Event, Finances, Game, StaticProperties, Stats
+from ..settings import settings
+from ..state import MemoryStore, StateStore, get_shared_store
+from .batching import LLM_BATCH_ENABLED, batch_scheduler, generate_single_event
+
+EVENT_POOL_ENABLED = settings.event_pool
+
+# Upper edges of the day and money bands; the last band is open-ended.
+DAY_BANDS = (1, 7, 30)
+MONEY_BANDS = (0.0, 100.0, 500.0, 2000.0)
+# Width of the health/happiness/stress buckets (0-100 scale).
+STAT_STEP = 25
+# Seconds a game's record of served events is kept after its last update.
+SERVED_TTL = 7 * 24 * 3600
+
+BucketKey = tuple[int, int, int, int, int, bool]
+
+
+async def generate_live_event(game_state: Game) -> dict:
+    """
+    Generate a validated event with the LLM, bypassing the pool; batched
+    with other games' requests when `LLM_BATCH` is on.
+    """
+    if LLM_BATCH_ENABLED:
+        return await batch_scheduler.submit(game_state)
+    return await generate_single_event(game_state)
+
+
+def bucket_for(game_state: Game) -> BucketKey:
+    """Quantize a game state into its pool bucket."""
+    stats = game_state.stats
+    return (
+        bisect.bisect_left(DAY_BANDS, game_state.day),
+        min(stats.health, 99) // STAT_STEP,
+        min(stats.happiness, 99) // STAT_STEP,
+        min(stats.stress, 99) // STAT_STEP,
+        bisect.bisect_left(MONEY_BANDS, stats.money),
+        game_state.static_properties.work,
+    )
+
+
+class EventPool:
+    """
+    In-memory event library keyed by `bucket_for`.
+
+    Args:
+        generate: Coroutine function used by the filler to create events.
+        low_water: Events each demanded bucket should hold at least.
+        capacity: Maximum events kept per bucket.
+        fill_batch: Maximum generations started per filler pass.
+        max_games: Games whose served events are remembered for no-repeat
+            (when no `store` is given).
+        store: Where the served events of each game are recorded.
+        store_factory: Called on first use to create `store` instead.
+    """
+
+    def __init__(
+        self,
+        generate: Callable[[Game], Awaitable[dict]] = generate_live_event,
+        low_water: int = 4,
+        capacity: int = 32,
+        fill_batch: int = 8,
+        max_games: int = 10000,
+        store: Optional[StateStore] = None,
+        store_factory: Optional[Callable[[], StateStore]] = None,
+    ):
+        self._generate = generate
+        self.low_water = low_water
+        self.capacity = capacity
+        self.fill_batch = fill_batch
+        if store is None and store_factory is None:
+            store = MemoryStore(max_entries=max_games)
+        self._resolved_store = store
+        self._store_factory = store_factory
+        self._buckets: dict[BucketKey, list[Event]] = {}
+        # A representative state per bucket, used as the filler's prompt input.
+        self._exemplars: dict[BucketKey, Game] = {}
+        # Extra events requested for buckets a game has exhausted.
+        self._wanted: dict[BucketKey, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def _store(self) -> StateStore:
+        if self._resolved_store is None:
+            self._resolved_store = self._store_factory()
+        return self._resolved_store
+
+    async def draw(self, game_state: Game, mark: bool = True) -> Optional[dict]:
+        """
+        Return an unseen pooled event for this game's bucket, or None.
+
+        The event is marked as seen by the game unless `mark` is False, for
+        speculative draws that may never be served; mark those with
+        `mark_served` once they are. Either way the game's record is checked
+        with one store call.
+        """
+        key = bucket_for(game_state)
+        self._exemplars.setdefault(key, game_state)
+        # Buckets only grow, but take a copy across the store call anyway.
+        bucket = {event.description: event for event in self._buckets.get(key, ())}
+        game_id = game_state.game_id
+        description = None
+        if not bucket or not game_id:
+            # A game without an id yet (about to be created) has seen nothing.
+            description = next(iter(bucket), None)
+        elif mark:
+            description = await self._store.sadd_first_async(self._served_key(game_id), list(bucket), SERVED_TTL)
+        else:
+            seen = await self._store.smembers_async(self._served_key(game_id))
+            description = next((d for d in bucket if d not in seen), None)
+
+        if description is not None:
+            self.hits += 1
+            return bucket[description].model_dump()
+        self.misses += 1
+        if len(bucket) >= self.low_water:
+            self._wanted[key] = self._wanted.get(key, 0) + 1
+        return None
+
+    def any_event(self, game_state: Game) -> Optional[dict]:
+        """Any pooled event of this game's bucket, seen or not, or None."""
+        bucket = self._buckets.get(bucket_for(game_state))
+        return random.choice(bucket).model_dump() if bucket else None
+
+    def add(self, game_state: Game, event: dict) -> bool:
+        """
+        Validate and store an event in the bucket of `game_state`; a game it
+        is served to is marked with `mark_served`. Returns False if the event
+        is invalid or the bucket is full.
+        """
+        try:
+            validated = Event.model_validate(event)
+        except ValidationError:
+            return False
+
+        key = bucket_for(game_state)
+        self._exemplars.setdefault(key, game_state)
+        bucket = self._buckets.setdefault(key, [])
+        if len(bucket) >= self.capacity:
+            return False
+        if any(existing.description == validated.description for existing in bucket):
+            return False
+        bucket.append(validated)
+        return True
+
+    async def mark_served(self, game_id: str, event: dict) -> None:
+        """
+        Record that a game has seen an event (a live one, one served before
+        the game had an id, or one drawn speculatively).
+        """
+        await self._store.sadd_async(self._served_key(game_id), event["description"], SERVED_TTL)
+
+    def seed(self, game_state: Game) -> None:
+        """Register a bucket as demanded so the filler keeps it stocked."""
+        self._exemplars.setdefault(bucket_for(game_state), game_state)
+
+    def deficits(self) -> dict[BucketKey, int]:
+        """Number of events each demanded bucket is missing."""
+        result = {}
+        for key in self._exemplars:
+            size = len(self._buckets.get(key, ()))
+            target = min(self.capacity, max(self.low_water, size + self._wanted.get(key, 0)))
+            if size < target:
+                result[key] = target - size
+        return result
+
+    async def fill_once(self) -> int:
+        """Generate events for under-stocked buckets; returns events added."""
+        jobs = []
+        for key, missing in self.deficits().items():
+            jobs.extend([key] * missing)
+        jobs = jobs[:self.fill_batch]
+        if not jobs:
+            return 0
+
+        results = await asyncio.gather(
+            *(self._generate(self._exemplars[key]) for key in jobs),
+            return_exceptions=True,
+        )
+        added = 0
+        for key, result in zip(jobs, results):
+            if isinstance(result, BaseException):
+                continue
+            if self.add(self._exemplars[key], result):
+                added += 1
+                self._wanted[key] = max(0, self._wanted.get(key, 0) - 1)
+        return added
+
+    async def run_filler(self, interval: float = 1.0) -> None:
+        """Keep buckets topped up until cancelled."""
+        while True:
+            added = await self.fill_once()
+            if not added:
+                await asyncio.sleep(interval)
+
+    @staticmethod
+    def _served_key(game_id: str) -> str:
+        return f"served:{game_id}"
+
+    def stats(self) -> dict:
+        """Hit-rate and size metrics for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "buckets": len(self._buckets),
+            "events": sum(len(bucket) for bucket in self._buckets.values()),
+            "buckets_below_low_water": len(self.deficits()),
+        }
+
+
+def default_start_state(work: bool) -> Game:
+    """The state every new game starts from, used to seed the pool."""
+    return Game(
+        user_id=0,
+        game_id="",
+        day=1,
+        static_properties=StaticProperties(
+            character_name="", gender="", age=16, work=work
+        ),
+        stats=Stats(),
+        finances=Finances(),
+    )
+
+
+event_pool = EventPool(
+    low_water=settings.event_pool_low_water,
+    capacity=settings.event_pool_capacity,
+    store_factory=get_shared_store,
+)
+for _work in (False, True):
+    event_pool.seed(default_start_state(_work))
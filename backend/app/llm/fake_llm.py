@@ -0,0 +1,195 @@
+"""
+Deterministic fake LLM for benchmarks, load tests and the test suite.
+
+Plugs into the mock mode of `app.llm.gemini_client` via `set_mock_backend`
+and answers every prompt after a seeded, log-normally distributed delay.
+A configurable share of replies fails the way the real API does:
+
+- error: the call raises (upstream 5xx),
+- throttle: the call raises a 429 (quota exceeded),
+- invalid: the reply is not JSON (retried by `generate_valid_event`),
+- repair: the reply uses the legacy `choices`/`text` shape with unknown
+  impact keys, so it takes the repair path of `validate_event`.
+
+Batch prompts get an array of events; failures apply to the whole call.
+
+`serve_fake_llm` exposes a `FakeLLM` as a local HTTP server speaking the
+Gemini REST API, so the real client (USE_MOCK_LLM=false with
+GEMINI_BASE_URL pointing at it) can be run against injected latency and
+429/5xx answers:
+
+    python -m app.llm.fake_llm --port 9000 --latency-ms 200 --error-rate 0.1 --throttle-rate 0.1
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+
+from .gemini_client import _BATCH_SIZE, _get_mock_event
+
+
+class FakeLLMError(RuntimeError):
+    """An injected upstream failure, with the HTTP status the API would answer."""
+
+    def __init__(self, message: str, code: int = 503):
+        super().__init__(message)
+        self.code = code
+
+
+class FakeLLM:
+    """
+    Args:
+        latency_ms: Median reply latency.
+        latency_sigma: Sigma of the log-normal latency (0 = fixed latency).
+        error_rate: Share of calls that raise `FakeLLMError` (503).
+        throttle_rate: Share of calls that raise `FakeLLMError` (429).
+        invalid_rate: Share of calls that return unparseable JSON.
+        repair_rate: Share of calls that need repair to validate.
+        seed: Seed of the latency and failure sequence.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 50.0,
+        latency_sigma: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        invalid_rate: float = 0.0,
+        repair_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.invalid_rate = invalid_rate
+        self.repair_rate = repair_rate
+        self._rng = random.Random(seed)
+        self.calls = 0
+        self.seconds: list[float] = []
+
+    async def __call__(self, prompt: str):
+        self.calls += 1
+        start = time.perf_counter()
+        latency = self.latency_ms * math.exp(self._rng.gauss(0.0, self.latency_sigma)) if self.latency_sigma else self.latency_ms
+        roll = self._rng.random()
+        try:
+            await asyncio.sleep(latency / 1000)
+            if roll < self.error_rate:
+                raise FakeLLMError("injected upstream failure")
+            roll -= self.error_rate
+            if roll < self.throttle_rate:
+                raise FakeLLMError("injected quota exhaustion", code=429)
+            roll -= self.throttle_rate
+            if roll < self.invalid_rate:
+                raise json.JSONDecodeError("injected invalid JSON", "{", 1)
+            roll -= self.invalid_rate
+
+            batch = _BATCH_SIZE.search(prompt)
+            events = [self._event(roll < self.repair_rate) for _ in range(int(batch.group(1)) if batch else 1)]
+            return events if batch else events[0]
+        finally:
+            self.seconds.append(time.perf_counter() - start)
+
+    def _event(self, needs_repair: bool) -> dict:
+        event = _get_mock_event()
+        event["description"] = f"{event['description']} (#{self.calls})"
+        if needs_repair:
+            event["choices"] = [
+                {"text": option["description"], "impact": {**option["impact"], "energy": 5}}
+                for option in event.pop("options")
+            ]
+        return event
+
+
+_STATUS_TEXT = {200: "OK", 400: "Bad Request", 429: "Too Many Requests", 503: "Service Unavailable"}
+
+
+async def serve_fake_llm(fake: FakeLLM, host: str = "127.0.0.1", port: int = 0) -> asyncio.AbstractServer:
+    """
+    Serve `fake` over HTTP in the shape of the Gemini `generateContent` and
+    `streamGenerateContent` endpoints. Injected errors are answered with
+    their status code; invalid replies are sent as broken JSON text.
+    """
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                path = request_line.split()[1].decode()
+                length = 0
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode().partition(":")
+                    if name.strip().lower() == "content-length":
+                        length = int(value)
+                body = json.loads(await reader.readexactly(length) or b"{}")
+                status, payload = await _answer(fake, body)
+                stream = ":streamGenerateContent" in path
+                text = f"data: {payload}\r\n\r\n" if stream and status == 200 else payload
+                data = text.encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {_STATUS_TEXT.get(status, 'Error')}\r\n"
+                    f"Content-Type: {'text/event-stream' if stream and status == 200 else 'application/json'}\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+async def _answer(fake: FakeLLM, body: dict) -> tuple[int, str]:
+    try:
+        prompt = body["contents"][0]["parts"][0]["text"]
+    except (KeyError, IndexError, TypeError):
+        return 400, json.dumps({"error": {"code": 400, "message": "no prompt", "status": "INVALID_ARGUMENT"}})
+    try:
+        text = json.dumps(await fake(prompt))
+    except FakeLLMError as e:
+        status = "RESOURCE_EXHAUSTED" if e.code == 429 else "UNAVAILABLE"
+        return e.code, json.dumps({"error": {"code": e.code, "message": str(e), "status": status}})
+    except json.JSONDecodeError:
+        text = "{"
+    return 200, json.dumps({
+        "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}],
+        "usageMetadata": {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": len(text) // 4},
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Gemini server with latency and error injection.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--invalid-rate", type=float, default=0.0)
+    parser.add_argument("--repair-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    async def main():
+        fake = FakeLLM(
+            latency_ms=args.latency_ms,
+            latency_sigma=args.latency_sigma,
+            error_rate=args.error_rate,
+            throttle_rate=args.throttle_rate,
+            invalid_rate=args.invalid_rate,
+            repair_rate=args.repair_rate,
+            seed=args.seed,
+        )
+        server = await serve_fake_llm(fake, args.host, args.port)
+        print(f"fake Gemini API on http://{args.host}:{args.port}")
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(main())
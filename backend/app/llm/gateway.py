@@ -0,0 +1,357 @@
+"""
+Admission control in front of the LLM upstream.
+
+Every LLM call goes through an `LLMGateway`, which applies, in order:
+
+1. Circuit breaker: after `failure_threshold` consecutive upstream failures
+   the breaker opens. While it is open, calls are rejected immediately.
+   After `reset_timeout` seconds a single probe call is let through
+   (half-open). The breaker closes again when the probe succeeds.
+2. Queue limit: calls beyond `max_queue` waiting callers are shed.
+3. Token bucket: calls are paced to the configured request quota. The rate
+   is halved when the upstream answers 429 and recovers step by step on
+   success (AIMD). A call that could only start after its deadline is shed
+   right away, instead of waiting in the queue.
+4. Concurrency limit: the `limiter` semaphore caps in-flight calls.
+5. Deadline and retries: each call has an overall deadline. Timeouts, 429s,
+   5xx and connection errors are retried with full-jitter exponential
+   backoff (or the upstream's Retry-After), as long as time remains.
+
+Rejected, shed and exhausted calls raise `LLMUnavailableError`, so callers
+can degrade (cached, pooled or mock events) or answer 503.
+"""
+
+import asyncio
+import random
+import sys
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying: the upstream is throttling or unhealthy.
+RETRYABLE_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class LLMUnavailableError(RuntimeError):
+    """The LLM upstream cannot take this call right now (breaker open, shed or out of time)."""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def status_of(exc: BaseException) -> Optional[int]:
+    """HTTP status carried by an upstream error (google-genai, httpx or fakes), if any."""
+    for attr in ("code", "status_code"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    return getattr(getattr(exc, "response", None), "status_code", None)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """True for errors that say the upstream is slow, throttling or failing."""
+    status = status_of(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # An httpx error can only occur once httpx is loaded; don't import it for the check.
+    httpx = sys.modules.get("httpx")
+    transport_errors = (httpx.TransportError,) if httpx is not None else ()
+    return isinstance(exc, (TimeoutError, ConnectionError, *transport_errors))
+
+
+def retry_after_of(exc: BaseException) -> Optional[float]:
+    """Seconds from a Retry-After header on the error's response, if any."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    try:
+        return float(headers.get("retry-after")) if headers else None
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Paces calls to `rate` per second with bursts of up to `burst`.
+
+    Callers reserve a token up front, so waiting callers are served in
+    arrival order. `throttle`/`relax` adapt the rate to upstream 429s.
+
+    Args:
+        rate: Tokens added per second; 0 disables the limit.
+        burst: Bucket size.
+        min_rate: Floor for the adaptive rate.
+        clock: Monotonic time source.
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0, min_rate: float = None, clock=time.monotonic):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.min_rate = min_rate if min_rate is not None else rate / 16
+        self._clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+
+    def reserve(self, latest_start: float) -> float:
+        """
+        Take a token; returns the seconds to wait before using it.
+
+        Raises LLMUnavailableError without taking one if the wait would end
+        after `latest_start` (a `clock` time).
+        """
+        if not self.rate:
+            return 0.0
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        wait = max(0.0, (1 - self._tokens) / self.rate)
+        if now + wait > latest_start:
+            raise LLMUnavailableError("LLM rate limit: no slot before the deadline", retry_after=wait)
+        self._tokens -= 1
+        return wait
+
+    def throttle(self) -> None:
+        """Multiplicative decrease after the upstream throttled us."""
+        if self.rate:
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def relax(self) -> None:
+        """Additive increase back towards the configured rate."""
+        if self.rate:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 16)
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker with a single half-open probe.
+
+    Args:
+        failure_threshold: Consecutive failures that open the breaker.
+        reset_timeout: Seconds the breaker stays open before a probe.
+        clock: Monotonic time source.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now; claims the probe when half-open."""
+        if self.state == self.OPEN and self._clock() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def retry_after(self) -> float:
+        """Seconds until the next probe may be attempted."""
+        return max(0.0, self.reset_timeout - (self._clock() - self.opened_at))
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.opens += 1
+            self.state = self.OPEN
+            self.opened_at = self._clock()
+        self._probing = False
+
+    def release(self) -> None:
+        """Give back a probe that ended without an upstream verdict."""
+        self._probing = False
+
+
+class LLMGateway:
+    """
+    Deadline, retry, rate-limit and breaker policy for upstream LLM calls.
+
+    Args:
+        limiter: Returns the semaphore capping in-flight calls (per event loop).
+        deadline: Seconds a call may take in total, including queueing and retries.
+        max_retries: Retries after the first attempt.
+        backoff_base: First backoff ceiling in seconds (doubled per retry).
+        backoff_max: Largest backoff ceiling in seconds.
+        max_queue: Callers allowed to wait for a slot; more are shed.
+        bucket: Request pacing; None for no rate limit.
+        breaker: Circuit breaker; None for a default one.
+        clock: Monotonic time source.
+    """
+
+    def __init__(
+        self,
+        limiter: Callable[[], asyncio.Semaphore],
+        deadline: float = 20.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.25,
+        backoff_max: float = 4.0,
+        max_queue: int = 256,
+        bucket: Optional[TokenBucket] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        clock=time.monotonic,
+    ):
+        self._limiter = limiter
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_queue = max_queue
+        self.bucket = bucket or TokenBucket(0)
+        self.breaker = breaker or CircuitBreaker(clock=clock)
+        self._clock = clock
+        self.waiting = 0
+        self.in_flight = 0
+        self.calls = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.rejected = 0
+        self.shed = 0
+        # Events served instead of a live generation, by source (see event_generator).
+        self.degraded = dict.fromkeys(("cache", "pool", "mock"), 0)
+
+    async def call(self, attempt: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run `attempt()` under the gateway's policy and return its result.
+
+        Non-retryable errors (e.g. a 400, or an unparseable reply) are raised
+        as they are. Retryable ones are retried until the deadline and then
+        raised as LLMUnavailableError.
+        """
+        self.calls += 1
+        deadline = self._clock() + self.deadline
+        for retry in range(self.max_retries + 1):
+            async with self._admit(deadline):
+                try:
+                    result = await asyncio.wait_for(attempt(), max(0.0, deadline - self._clock()))
+                except asyncio.TimeoutError as e:
+                    self.timeouts += 1
+                    error = e
+                except Exception as e:
+                    if not is_retryable(e):
+                        self.breaker.release()
+                        raise
+                    error = e
+                except BaseException:
+                    self.breaker.release()
+                    raise
+                else:
+                    self.breaker.record_success()
+                    self.bucket.relax()
+                    return result
+
+            self.failures += 1
+            self.breaker.record_failure()
+            if status_of(error) == 429:
+                self.bucket.throttle()
+            backoff = retry_after_of(error)
+            if backoff is None:
+                backoff = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** retry))
+            if retry == self.max_retries or self._clock() + backoff >= deadline:
+                break
+            self.retries += 1
+            await asyncio.sleep(backoff)
+        raise LLMUnavailableError(f"LLM upstream failed: {error!r}") from error
+
+    async def stream(self, open_stream: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """
+        Admit a streaming call and pass its chunks through.
+
+        Streams are not retried (chunks may already be out), and the deadline
+        applies to admission only.
+        """
+        self.calls += 1
+        async with self._admit(self._clock() + self.deadline):
+            try:
+                async for chunk in open_stream():
+                    yield chunk
+            except Exception as e:
+                if not is_retryable(e):
+                    self.breaker.release()
+                    raise
+                self.failures += 1
+                self.breaker.record_failure()
+                raise LLMUnavailableError(f"LLM upstream failed: {e!r}") from e
+            except BaseException:
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+
+    @asynccontextmanager
+    async def _admit(self, deadline: float):
+        """Breaker, queue, rate and concurrency checks; holds a slot while the call runs."""
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise LLMUnavailableError("LLM circuit breaker is open", retry_after=self.breaker.retry_after())
+        if self.waiting >= self.max_queue:
+            self.shed += 1
+            self.breaker.release()
+            raise LLMUnavailableError("LLM queue is full")
+        try:
+            wait = self.bucket.reserve(deadline)
+        except LLMUnavailableError:
+            self.shed += 1
+            self.breaker.release()
+            raise
+
+        limiter = self._limiter()
+        self.waiting += 1
+        try:
+            if wait:
+                await asyncio.sleep(wait)
+            if limiter.locked():
+                # Waiting for a slot is our own queueing, not the upstream's
+                # fault: past the deadline the call is shed, not a failure.
+                await asyncio.wait_for(limiter.acquire(), max(0.0, deadline - self._clock()))
+            else:
+                await limiter.acquire()
+        except asyncio.TimeoutError:
+            self.shed += 1
+            self.breaker.release()
+            raise LLMUnavailableError("LLM queue wait exceeded the deadline") from None
+        except BaseException:
+            self.breaker.release()
+            raise
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            limiter.release()
+
+    def stats(self) -> dict:
+        """Queue depth, breaker state and outcome counts for monitoring."""
+        return {
+            "queue_depth": self.waiting,
+            "in_flight": self.in_flight,
+            "breaker_state": self.breaker.state,
+            "breaker_open": int(self.breaker.state != CircuitBreaker.CLOSED),
+            "breaker_opens": self.breaker.opens,
+            "rate_limit_per_s": self.bucket.rate,
+            "calls": self.calls,
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "shed": self.shed,
+            **{f"degraded_{source}": count for source, count in self.degraded.items()},
+        }
@@ -1,72 +1,177 @@
 """
 Gemini API client with mock/production mode support.
+
+Three entry points are provided:
+
+- ``generate_response``: blocking call, kept for scripts and the sync code path.
+- ``generate_response_async``: non-blocking call used by the API endpoints.
+  It goes through ``client.aio`` on a single shared, connection-pooled client
+  (created lazily by ``get_client``) and is gated by a semaphore so at most
+  ``LLM_MAX_CONCURRENCY`` requests are in flight at once.
+- ``stream_response_async``: like ``generate_response_async`` but yields the
+  raw JSON text chunk by chunk as the model produces it.
+
+Both async entry points go through ``llm_gateway`` (see ``gateway.py``), which
+enforces per-call deadlines, retries with jittered backoff, paces calls to the
+request quota and trips a circuit breaker when the upstream is unhealthy.
 """
 
-import os
+import asyncio
 import json
-from dotenv import load_dotenv
+import re
+import threading
+import time
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from .. import metrics
+from ..settings import settings
+from .gateway import CircuitBreaker, LLMGateway, TokenBucket
+
+USE_MOCK = settings.use_mock_llm
+
+MODEL_NAME = settings.gemini_model
+
+# Upper bound on concurrent in-flight LLM calls (also the HTTP pool size).
+MAX_CONCURRENCY = settings.llm_max_concurrency
+
+# Optional override so the client can be pointed at a local fake LLM server.
+BASE_URL = settings.gemini_base_url
+
+# Artificial latency for mock mode, handy for load testing without the API.
+MOCK_LATENCY_MS = settings.mock_llm_latency_ms
+# Characters per chunk when the mock streams its event.
+MOCK_STREAM_CHUNK = 16
+
+# Serves async mock-mode calls instead of the fixed mock event when set
+# (e.g. the fake LLM of the benchmarks, with latency and failure injection).
+_mock_backend: Optional[Callable[[str], Awaitable[dict]]] = None
+
+if not USE_MOCK and not settings.gemini_api_key:
+    print("Warning: GEMINI_API_KEY not found. Falling back to mock mode.")
+    USE_MOCK = True
+
+# The google-genai SDK takes seconds to import, so the client is built on
+# first use (or by `warm_up` in the background right after startup).
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The shared, connection-pooled Gemini client, created on first call."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            import httpx
+            from google import genai
+            from google.genai import types
+
+            pool_limits = httpx.Limits(
+                max_connections=MAX_CONCURRENCY,
+                max_keepalive_connections=MAX_CONCURRENCY,
+            )
+            _client = genai.Client(
+                api_key=settings.gemini_api_key,
+                http_options=types.HttpOptions(
+                    base_url=BASE_URL,
+                    async_client_args={"limits": pool_limits},
+                ),
+            )
+    return _client
+
 
-load_dotenv()
+async def _get_client_async():
+    """`get_client` without blocking the event loop on the SDK import."""
+    return _client if _client is not None else await asyncio.to_thread(get_client)
 
-USE_MOCK = os.getenv("USE_MOCK_LLM", "true").lower() == "true"
 
-if not USE_MOCK:
-    from google import genai
+async def warm_up() -> None:
+    """Load the SDK and build the client ahead of the first request (no-op in mock mode)."""
+    if not USE_MOCK:
+        await _get_client_async()
 
-    api_key = os.getenv("GEMINI_API_KEY")
-    if api_key:
-        os.environ["GOOGLE_API_KEY"] = api_key
-        client = genai.Client(api_key=api_key)
-    else:
-        print("Warning: GEMINI_API_KEY not found. Falling back to mock mode.")
-        USE_MOCK = True
+# One semaphore per running event loop (tests spin up several loops).
+_semaphores: dict[int, asyncio.Semaphore] = {}
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    """Return the concurrency limiter bound to the current event loop."""
+    loop_id = id(asyncio.get_running_loop())
+    semaphore = _semaphores.get(loop_id)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+        _semaphores.clear()
+        _semaphores[loop_id] = semaphore
+    return semaphore
+
+
+llm_gateway = LLMGateway(
+    limiter=_get_semaphore,
+    deadline=settings.llm_deadline_s,
+    max_retries=settings.llm_retries,
+    max_queue=settings.llm_max_queue,
+    bucket=TokenBucket(settings.llm_rate_limit_rpm / 60, burst=settings.llm_rate_burst),
+    breaker=CircuitBreaker(settings.llm_breaker_failures, settings.llm_breaker_reset_s),
+)
+
+
+# Batch prompts (see prompts.build_batch_prompt) state how many events they want.
+_BATCH_SIZE = re.compile(r"^Number of events: (\d+)$", re.MULTILINE)
+
+
+def _get_mock_reply(prompt: str):
+    """The mock event, or a list of them for a batch prompt."""
+    batch = _BATCH_SIZE.search(prompt)
+    if batch is None:
+        return _get_mock_event()
+    return [_get_mock_event() for _ in range(int(batch.group(1)))]
 
 
 def _get_mock_event() -> dict:
     """Return a mock event for testing."""
     return {
+        "event_id": int(time.time()),
         "description": "You wake up feeling refreshed after a good night's sleep.",
-        "choices": [
+        "options": [
             {
-                "id": 1,
-                "text": "Go for a morning jog in the park",
+                "description": "Go for a morning jog in the park",
                 "impact": {
                     "health": 5,
                     "happiness": 3,
-                    "money": 0,
-                    "energy": -2,
-                    "social": 0,
-                    "career": 0
+                    "stress": -2,
+                    "free_time": -1,
                 }
             },
             {
-                "id": 2,
-                "text": "Have a hearty breakfast and head to work early",
+                "description": "Have a hearty breakfast and head to work early",
                 "impact": {
                     "health": 2,
                     "happiness": 1,
-                    "money": 0,
-                    "energy": 3,
-                    "social": 0,
-                    "career": 4
+                    "education": 2,
+                    "money": -5,
                 }
             },
             {
-                "id": 3,
-                "text": "Sleep in for another hour",
+                "description": "Sleep in for another hour",
                 "impact": {
                     "health": 1,
                     "happiness": 4,
-                    "money": 0,
-                    "energy": 5,
-                    "social": 0,
-                    "career": -3
+                    "stress": -3,
+                    "reputation": -1,
                 }
             }
         ]
     }
 
 
+def set_mock_backend(backend: Optional[Callable[[str], Awaitable[dict]]]) -> None:
+    """
+    Route async mock-mode calls to `backend(prompt)`; None restores the
+    built-in mock event.
+    """
+    global _mock_backend
+    _mock_backend = backend
+
+
 def generate_response(prompt: str) -> dict:
     """
     Generate event using Gemini API or mock data.
@@ -75,16 +180,107 @@ def generate_response(prompt: str) -> dict:
         prompt: The prompt to send to the LLM
 
     Returns:
-        dict: Event data with description and choices
+        dict: Event data with description and options
     """
     if USE_MOCK:
-        return _get_mock_event()
+        if MOCK_LATENCY_MS:
+            time.sleep(MOCK_LATENCY_MS / 1000)
+        return _get_mock_reply(prompt)
 
-    response = client.models.generate_content(
-        model="gemini-2.0-flash-exp",
+    response = get_client().models.generate_content(
+        model=MODEL_NAME,
         contents=prompt,
         config={"response_mime_type": "application/json"}
     )
 
     result = json.loads(response.text)
     return result
+
+
+async def generate_response_async(prompt: str) -> dict:
+    """
+    Async variant of `generate_response` that does not block the event loop.
+
+    Args:
+        prompt: The prompt to send to the LLM
+
+    Returns:
+        dict: Event data with description and options
+
+    Raises:
+        LLMUnavailableError: The gateway rejected the call or it ran out of
+            retries or time.
+    """
+    metrics.inc("llm_calls_total")
+    return await llm_gateway.call(lambda: _call_async(prompt))
+
+
+async def _call_async(prompt: str) -> dict:
+    """One upstream attempt (inside a gateway slot)."""
+    with metrics.span("llm.call"):
+        if USE_MOCK:
+            if _mock_backend is not None:
+                result = await _mock_backend(prompt)
+            else:
+                if MOCK_LATENCY_MS:
+                    await asyncio.sleep(MOCK_LATENCY_MS / 1000)
+                result = _get_mock_reply(prompt)
+            if metrics.METRICS_ENABLED:
+                _count_tokens(len(prompt) // 4, len(json.dumps(result)) // 4)
+            return result
+
+        client = await _get_client_async()
+        response = await client.aio.models.generate_content(
+            model=MODEL_NAME,
+            contents=prompt,
+            config={"response_mime_type": "application/json"}
+        )
+
+    usage = response.usage_metadata
+    if usage is not None:
+        _count_tokens(usage.prompt_token_count or 0, usage.candidates_token_count or 0)
+    return json.loads(response.text)
+
+
+def _count_tokens(prompt_tokens: int, output_tokens: int) -> None:
+    metrics.inc("llm_prompt_tokens_total", prompt_tokens)
+    metrics.inc("llm_output_tokens_total", output_tokens)
+
+
+async def stream_response_async(prompt: str) -> AsyncIterator[str]:
+    """
+    Stream the raw JSON text of an event as the model produces it.
+
+    In mock mode the mock event is emitted in small chunks, with the mock
+    latency spread across them.
+
+    Args:
+        prompt: The prompt to send to the LLM
+
+    Yields:
+        str: Consecutive pieces of the JSON reply
+    """
+    metrics.inc("llm_calls_total")
+    async for chunk in llm_gateway.stream(lambda: _stream_async(prompt)):
+        yield chunk
+
+
+async def _stream_async(prompt: str) -> AsyncIterator[str]:
+    if USE_MOCK:
+        text = json.dumps(_get_mock_event())
+        chunks = [text[i:i + MOCK_STREAM_CHUNK] for i in range(0, len(text), MOCK_STREAM_CHUNK)]
+        for chunk in chunks:
+            if MOCK_LATENCY_MS:
+                await asyncio.sleep(MOCK_LATENCY_MS / 1000 / len(chunks))
+            yield chunk
+        return
+
+    client = await _get_client_async()
+    stream = await client.aio.models.generate_content_stream(
+        model=MODEL_NAME,
+        contents=prompt,
+        config={"response_mime_type": "application/json"}
+    )
+    async for chunk in stream:
+        if chunk.text:
+            yield chunk.text
@@ -0,0 +1,136 @@
+"""
+Speculative prefetch of the next event for every option of a served event.
+
+Each `EventOption` carries its exact `Impact`, so the stats the player will
+have after choosing it are known as soon as the event is served. The
+prefetcher starts generating the follow-up event for each option in the
+background; when the choice arrives the matching branch is handed over and
+the losing branches are cancelled.
+
+Branches are generated speculatively: their events are not marked as seen
+by the game, so the caller marks the event of the branch it serves.
+"""
+
+import asyncio
+import functools
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+from ..models import Event, Game, Impact
+from ..rules import apply_impact
+from .event_generator import generate_event_async
+
+
+@dataclass
+class _Branches:
+    """Prefetch tasks for one served event, keyed by option impact."""
+    day: int
+    tasks: dict[tuple, asyncio.Task] = field(default_factory=dict)
+
+
+def _impact_key(impact: Impact) -> tuple:
+    return tuple(impact.model_dump().values())
+
+
+def _discard_result(task: asyncio.Task) -> None:
+    # Retrieve the exception so dropped branches don't log "never retrieved".
+    if not task.cancelled():
+        task.exception()
+
+
+class EventPrefetcher:
+    """
+    Keeps the in-flight next-event generations per game.
+
+    Args:
+        generate: Coroutine function producing an event for a game state.
+        max_games: Games tracked at once; the oldest are dropped beyond this.
+    """
+
+    def __init__(
+        self,
+        generate: Callable[[Game], Awaitable[dict]] = functools.partial(generate_event_async, speculative=True),
+        max_games: int = 1000,
+    ):
+        self._generate = generate
+        self._max_games = max_games
+        self._pending: OrderedDict[str, _Branches] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.cancelled = 0
+
+    def schedule(self, game_state: Game, event: dict) -> None:
+        """Start generating the follow-up event for each option of `event`."""
+        self.discard(game_state.game_id)
+        try:
+            options = Event.model_validate(event).options
+        except ValueError:
+            return
+
+        branches = _Branches(day=game_state.day)
+        for option in options:
+            key = _impact_key(option.impact)
+            if key in branches.tasks:
+                continue
+            next_state = game_state.model_copy(update={
+                "day": game_state.day + 1,
+                "stats": apply_impact(game_state.stats, option.impact),
+            })
+            task = asyncio.create_task(self._generate(next_state))
+            task.add_done_callback(_discard_result)
+            branches.tasks[key] = task
+
+        self._pending[game_state.game_id] = branches
+        while len(self._pending) > self._max_games:
+            _, dropped = self._pending.popitem(last=False)
+            self._cancel(dropped)
+
+    def take(self, game_id: str, day: int, impact: Impact) -> Optional[asyncio.Task]:
+        """
+        Hand over the prefetched event for the option chosen on `day`.
+
+        Returns the generation task for the chosen branch (cancelling the
+        others), or None on a miss.
+        """
+        branches = self._pending.pop(game_id, None)
+        task = None
+        if branches is not None and branches.day == day:
+            task = branches.tasks.pop(_impact_key(impact), None)
+        if branches is not None:
+            self._cancel(branches)
+
+        if task is None or task.cancelled():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return task
+
+    def discard(self, game_id: str) -> None:
+        """Cancel any outstanding prefetches for a game."""
+        branches = self._pending.pop(game_id, None)
+        if branches is not None:
+            self._cancel(branches)
+
+    def clear(self) -> None:
+        """Cancel every outstanding prefetch, e.g. on shutdown."""
+        while self._pending:
+            _, branches = self._pending.popitem()
+            self._cancel(branches)
+
+    def _cancel(self, branches: _Branches) -> None:
+        for task in branches.tasks.values():
+            if not task.done():
+                task.cancel()
+                self.cancelled += 1
+
+    def stats(self) -> dict:
+        """Hit-rate metrics for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "cancelled": self.cancelled,
+            "games_in_flight": len(self._pending),
+        }
@@ -1,46 +1,32 @@
 """
 Prompt templates for LLM event generation.
+
+The prompt is split into a static prefix (instructions, JSON structure,
+scenario strategy and example) and a small per-turn dynamic section (event
+id, day, static properties, stats). The prefix is rendered once and only
+re-rendered when the strategy file changes on disk; each turn just appends
+the dynamic section with a compact stats encoding.
 """
+import json
 import os
 import time
+from .. import metrics
 from ..models import Game
+from ..settings import settings
 
+STRATEGY_PATH = settings.scenario_strategy_path
 
-def load_scenario_strategy() -> str:
-    """Load scenario strategy from markdown file."""
-    strategy_path = os.path.join(os.path.dirname(__file__), "scenario_strategy.md")
-    try:
-        with open(strategy_path, 'r', encoding='utf-8') as f:
-            return f.read()
-    except FileNotFoundError:
-        return "Scenario strategy file not found."
-
-
-def build_event_prompt(game_state: Game) -> str:
-    """
-    Builds the prompt for the LLM to generate a game event based on the current
-    game state.
-
-    Args:
-        game_state: The current Pydantic Game model instance.
+# Rough average for English text; good enough to track prompt cost trends.
+CHARS_PER_TOKEN = 4
 
-    Returns:
-        A formatted string to be used as a prompt for the LLM.
-    """
-    # The event_id is generated here to ensure it's a valid timestamp,
-    # and the LLM is instructed to use it.
-    current_timestamp = int(time.time())
-
-    # The main instruction block for the LLM.
-    # Note: Double curly braces `{{` and `}}` are used to escape the JSON
-    # structure within the f-string.
-    strategy_content = load_scenario_strategy()
-    prompt_template = f"""You are generating a game event for a solo-player financial literacy simulation aimed at teenagers aged 15-18. The game connects everyday choices like studying, gigs, hobbies, socializing, and managing subscriptions/jobs with changes in player stats such as health, happiness, stress, reputation, education, money, weekly income, weekly expense, and free time.
+# Note: Double curly braces `{{` and `}}` are used to escape the JSON
+# structure for str.format.
+_STATIC_TEMPLATE = """You are generating a game event for a solo-player financial literacy simulation aimed at teenagers aged 15-18. The game connects everyday choices like studying, gigs, hobbies, socializing, and managing subscriptions/jobs with changes in player stats such as health, happiness, stress, reputation, education, money, weekly income, weekly expense, and free time.
 
 Please create ONE event described as a JSON object following this structure strictly:
 
 {{
-  "event_id": {current_timestamp},
+  "event_id": <the event_id given at the end of this prompt>,
   "description": "<A concise, engaging event narrative that introduces a financial or life scenario>",
   "options": [
     {{
@@ -69,7 +55,7 @@ Please create ONE event described as a JSON object following this structure stri
 }}
 
 Constraints and guidelines for the event:
-{strategy_content}
+{strategy}
 - The event should be realistic and relatable to a teen managing personal finances.
 - Include social pressure, impulsive purchase dilemmas, subscription decisions, job or study choices, or budgeting challenges.
 - Keep impacts balanced: avoid overly large positive or negative values; typical impact ranges should be between -20 to 20, except money and financial values which can be larger but reasonable.
@@ -118,15 +104,150 @@ Example output:
 
 ---"""
 
-    # Add dynamic context from the current game state to help the LLM tailor the event.
-    current_stats = game_state.stats.model_dump_json(indent=2)
+
+class PromptStats:
+    """Size and estimated token counts of the prompts built so far."""
+
+    def __init__(self):
+        self.prompts = 0
+        self.chars = 0
+        self.last_chars = 0
+        self.static_chars = 0
+        self.prefix_renders = 0
+
+    def record(self, chars: int) -> None:
+        self.prompts += 1
+        self.chars += chars
+        self.last_chars = chars
+
+    def as_dict(self) -> dict:
+        return {
+            "prompts": self.prompts,
+            "last_chars": self.last_chars,
+            "last_tokens_estimate": estimate_tokens_for(self.last_chars),
+            "mean_tokens_estimate": estimate_tokens_for(self.chars / self.prompts) if self.prompts else 0,
+            "static_prefix_tokens_estimate": estimate_tokens_for(self.static_chars),
+            "prefix_renders": self.prefix_renders,
+        }
+
+
+prompt_stats = PromptStats()
+
+# (mtime of the strategy file, rendered static prefix)
+_prefix_cache: tuple = (None, "")
+
+
+def estimate_tokens_for(chars: float) -> int:
+    return round(chars / CHARS_PER_TOKEN)
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate number of input tokens for a prompt."""
+    return estimate_tokens_for(len(text))
+
+
+def _strategy_mtime():
+    try:
+        return os.stat(STRATEGY_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def load_scenario_strategy() -> str:
+    """Load scenario strategy from markdown file."""
+    try:
+        with open(STRATEGY_PATH, 'r', encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        return "Scenario strategy file not found."
+
+
+def static_prefix() -> str:
+    """
+    The static part of the prompt, rendered once and re-rendered only when
+    the strategy file's mtime changes (one stat() call per prompt).
+    """
+    global _prefix_cache
+    mtime = _strategy_mtime()
+    cached_mtime, prefix = _prefix_cache
+    if prefix and mtime == cached_mtime:
+        return prefix
+
+    prefix = _STATIC_TEMPLATE.format(strategy=load_scenario_strategy())
+    prompt_stats.prefix_renders += 1
+    prompt_stats.static_chars = len(prefix)
+    _prefix_cache = (mtime, prefix)
+    return prefix
+
+
+def compact_stats(game_state: Game) -> str:
+    """Stats as single-line JSON without whitespace, to save prompt tokens."""
+    return json.dumps(game_state.stats.model_dump(), separators=(",", ":"))
+
+
+@metrics.timed("prompt")
+def build_event_prompt(game_state: Game) -> str:
+    """
+    Builds the prompt for the LLM to generate a game event based on the current
+    game state.
+
+    Args:
+        game_state: The current Pydantic Game model instance.
+
+    Returns:
+        A formatted string to be used as a prompt for the LLM.
+    """
+    # The event_id is generated here to ensure it's a valid timestamp,
+    # and the LLM is instructed to use it.
+    current_timestamp = int(time.time())
 
     final_prompt = (
-        f"{prompt_template}\n"
+        f"{static_prefix()}\n"
+        f'Use "event_id": {current_timestamp} for this event.\n'
         "Here is the current state of the player to help you tailor the event:\n"
-        f"Day: {game_state.day}\n"
-        f"Current Stats: {current_stats}\n\n"
+        f"{player_context(game_state)}\n"
         "Please generate one such JSON event now."
     )
 
+    prompt_stats.record(len(final_prompt))
+    return final_prompt
+
+
+def player_context(game_state: Game) -> str:
+    """
+    The dynamic part of a prompt: day, player and stats.
+
+    The character name is left out on purpose: it does not change the
+    scenario and keeping it out lets identical states share cached events.
+    """
+    props = game_state.static_properties
+    return (
+        f"Day: {game_state.day}\n"
+        f"Player: age {props.age}, {props.gender}, {'has a job' if props.work else 'no job'}\n"
+        f"Current Stats: {compact_stats(game_state)}\n"
+    )
+
+
+@metrics.timed("prompt")
+def build_batch_prompt(game_states: list[Game]) -> str:
+    """
+    Builds one prompt asking for an event for each of several players, to be
+    answered with a JSON array in the same order. The static prefix is sent
+    once for the whole batch.
+    """
+    count = len(game_states)
+    players = "\n".join(
+        f"Player {i}:\n{player_context(state)}" for i, state in enumerate(game_states, 1)
+    )
+    final_prompt = (
+        f"{static_prefix()}\n"
+        f"This request covers {count} different players. Instead of a single object, reply "
+        f"with a JSON array of exactly {count} event objects, one per player, in the order "
+        'below. Use "event_id": <player number> for each event.\n'
+        f"Number of events: {count}\n\n"
+        f"{players}\n"
+        "Please generate the JSON array of events now."
+    )
+
+    prompt_stats.record(len(final_prompt))
     return final_prompt
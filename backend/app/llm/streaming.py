@@ -0,0 +1,162 @@
+"""
+Incremental delivery of a generated event.
+
+`EventStreamParser` is fed the raw JSON text as the model streams it and
+reports the top-level `description` character by character and each entry of
+`options` as soon as its object is complete, without waiting for the whole
+reply. `stream_event` wraps it around the streaming LLM call and always ends
+with one validated event.
+"""
+
+import json
+from typing import AsyncIterator, Union
+
+from ..models import Game
+from .event_pool import generate_live_event
+from .gemini_client import stream_response_async
+from .prompts import build_event_prompt
+from .validation import EventValidationError, validate_event
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+Frame = tuple[str, Union[str, dict]]
+
+
+class EventStreamParser:
+    """
+    Streaming scanner for the event JSON object.
+
+    `feed` returns the frames completed by the new chunk, in order:
+    ("description", text delta) and ("option", option dict).
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._depth = 0
+        self._in_string = False
+        self._escape = None  # None, "" right after a backslash, or \\u hex digits
+        self._high_surrogate = None
+        self._string_role = None  # "key", "description" or None
+        self._key = []
+        self._last_key = None
+        self._expect_key = False
+        self._in_options = False
+        self._option_start = None
+
+    def feed(self, chunk: str) -> list[Frame]:
+        frames: list[Frame] = []
+        delta: list[str] = []
+        start = len(self._buffer)
+        self._buffer += chunk
+
+        for i in range(start, len(self._buffer)):
+            c = self._buffer[i]
+            if self._in_string:
+                char = self._string_char(c)
+                if char is not None:
+                    if self._string_role == "description":
+                        delta.append(char)
+                    elif self._string_role == "key":
+                        self._key.append(char)
+                continue
+
+            if c == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect_key:
+                    self._string_role = "key"
+                    self._key = []
+                elif self._depth == 1 and self._last_key == "description":
+                    self._string_role = "description"
+                else:
+                    self._string_role = None
+            elif c in "{[":
+                self._depth += 1
+                if c == "{" and self._depth == 1:
+                    self._expect_key = True
+                elif c == "[" and self._depth == 2 and self._last_key == "options":
+                    self._in_options = True
+                elif c == "{" and self._depth == 3 and self._in_options:
+                    self._option_start = i
+            elif c in "}]":
+                if c == "}" and self._depth == 3 and self._option_start is not None:
+                    if delta:
+                        frames.append(("description", "".join(delta)))
+                        delta = []
+                    try:
+                        frames.append(("option", json.loads(self._buffer[self._option_start:i + 1])))
+                    except ValueError:
+                        pass
+                    self._option_start = None
+                elif c == "]" and self._depth == 2:
+                    self._in_options = False
+                self._depth -= 1
+            elif self._depth == 1 and c == ":":
+                self._expect_key = False
+            elif self._depth == 1 and c == ",":
+                self._expect_key = True
+
+        if delta:
+            frames.append(("description", "".join(delta)))
+        return frames
+
+    def _string_char(self, c: str):
+        """Consume one character inside a string; return the decoded char, if any."""
+        if self._escape is None:
+            if c == "\\":
+                self._escape = ""
+                return None
+            if c == '"':
+                self._in_string = False
+                if self._string_role == "key":
+                    self._last_key = "".join(self._key)
+                return None
+            return c
+
+        if self._escape == "":
+            if c != "u":
+                self._escape = None
+                return _ESCAPES.get(c, c)
+            self._escape = "u"
+            return None
+
+        self._escape += c
+        if len(self._escape) < 5:
+            return None
+        code = int(self._escape[1:], 16)
+        self._escape = None
+        if 0xD800 <= code < 0xDC00:
+            self._high_surrogate = code
+            return None
+        if 0xDC00 <= code < 0xE000 and self._high_surrogate is not None:
+            code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+            self._high_surrogate = None
+        return chr(code)
+
+    def result(self):
+        """The complete reply parsed as JSON (ignoring text around the object)."""
+        start = self._buffer.find("{")
+        end = self._buffer.rfind("}")
+        if start < 0 or end < start:
+            raise ValueError("no JSON object in the reply")
+        return json.loads(self._buffer[start:end + 1])
+
+
+async def stream_event(game_state: Game) -> AsyncIterator[Frame]:
+    """
+    Streams an event for `game_state` as ("description", delta) and
+    ("option", dict) frames, ending with one ("event", dict) frame holding the
+    validated event.
+
+    If the streamed reply does not validate, a regular (validated, retried)
+    generation runs and its result is sent as the final frame, superseding
+    the partial frames. Raises EventValidationError if that fails too.
+    """
+    parser = EventStreamParser()
+    try:
+        async for chunk in stream_response_async(build_event_prompt(game_state)):
+            for frame in parser.feed(chunk):
+                yield frame
+        event = validate_event(parser.result()).model_dump()
+    except (EventValidationError, ValueError):
+        event = await generate_live_event(game_state)
+    yield "event", event
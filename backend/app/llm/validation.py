@@ -0,0 +1,180 @@
+"""
+Validation and cheap repair of LLM event output.
+
+Every generated event goes through `validate_event` before it is served or
+anything is written to the database. Well-formed replies take the fast path
+(a single prebuilt `TypeAdapter` pass plus range checks). Anything else is
+repaired where that is cheap and unambiguous: the legacy `choices`/`text`
+shape is mapped, unknown impact keys (`energy`, `social`, ...) are dropped,
+impacts are clamped to the ranges the prompt asks for, and extra options are
+cut. Replies that cannot be repaired raise `EventValidationError`;
+`generate_valid_event` retries those a bounded number of times.
+"""
+
+import json
+import math
+import time
+from typing import Awaitable, Callable
+
+from pydantic import TypeAdapter, ValidationError
+
+from .. import metrics
+from ..models import Event, Impact
+from ..settings import settings
+
+EVENT_ADAPTER = TypeAdapter(Event)
+
+MIN_OPTIONS = 2
+MAX_OPTIONS = 3
+MAX_ATTEMPTS = settings.llm_max_attempts
+
+INT_IMPACT_FIELDS = {
+    name for name, field in Impact.model_fields.items() if field.annotation is int
+}
+# Largest absolute change a single option may apply, per impact field.
+IMPACT_LIMITS = {
+    "health": 100,
+    "happiness": 100,
+    "stress": 100,
+    "reputation": 100,
+    "education": 100,
+    "money": 5000.0,
+    "weekly_income": 1000.0,
+    "weekly_expense": 1000.0,
+    "free_time": 40.0,
+}
+
+
+class EventValidationError(ValueError):
+    """Raised when an LLM reply cannot be turned into a valid Event."""
+
+
+class ValidationStats:
+    """Counters for validation outcomes and cost."""
+
+    def __init__(self):
+        self.valid = 0
+        self.repaired = 0
+        self.failed = 0
+        self.retries = 0
+        self.seconds = 0.0
+
+    def as_dict(self) -> dict:
+        total = self.valid + self.repaired + self.failed
+        return {
+            "valid": self.valid,
+            "repaired": self.repaired,
+            "failed": self.failed,
+            "retries": self.retries,
+            "failure_rate": self.failed / total if total else 0.0,
+            "mean_validation_us": self.seconds / total * 1e6 if total else 0.0,
+        }
+
+
+validation_stats = ValidationStats()
+
+
+def _within_limits(event: Event) -> bool:
+    if not MIN_OPTIONS <= len(event.options) <= MAX_OPTIONS:
+        return False
+    for option in event.options:
+        for name, limit in IMPACT_LIMITS.items():
+            value = getattr(option.impact, name)
+            # NaN compares False with everything, so check it explicitly.
+            if not math.isfinite(value) or abs(value) > limit:
+                return False
+    return True
+
+
+def _repair_impact(raw) -> dict:
+    if not isinstance(raw, dict):
+        raise EventValidationError("option impact is not an object")
+    impact = {}
+    for name, limit in IMPACT_LIMITS.items():
+        value = raw.get(name, 0)
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise EventValidationError(f"impact {name!r} is not a number")
+        if not math.isfinite(value):
+            raise EventValidationError(f"impact {name!r} is not finite")
+        value = max(-limit, min(limit, value))
+        impact[name] = round(value) if name in INT_IMPACT_FIELDS else value
+    return impact
+
+
+def repair_event(raw) -> dict:
+    """Returns a repaired copy of a raw LLM reply, or raises EventValidationError."""
+    if not isinstance(raw, dict):
+        raise EventValidationError("reply is not a JSON object")
+
+    description = raw.get("description")
+    if not isinstance(description, str) or not description.strip():
+        raise EventValidationError("event has no description")
+
+    event_id = raw.get("event_id")
+    if not isinstance(event_id, int) or isinstance(event_id, bool):
+        event_id = int(time.time())
+
+    options = []
+    raw_options = raw.get("options", raw.get("choices"))
+    for option in raw_options if isinstance(raw_options, list) else []:
+        if not isinstance(option, dict):
+            continue
+        text = option.get("description", option.get("text"))
+        if not isinstance(text, str) or not text.strip() or "impact" not in option:
+            continue
+        options.append({"description": text, "impact": _repair_impact(option["impact"])})
+        if len(options) == MAX_OPTIONS:
+            break
+    if len(options) < MIN_OPTIONS:
+        raise EventValidationError(f"event has fewer than {MIN_OPTIONS} usable options")
+
+    return {"event_id": event_id, "description": description, "options": options}
+
+
+@metrics.timed("validate")
+def validate_event(raw) -> Event:
+    """Validates a raw LLM reply, repairing it if needed."""
+    start = time.perf_counter()
+    try:
+        try:
+            event = EVENT_ADAPTER.validate_python(raw)
+            if _within_limits(event):
+                validation_stats.valid += 1
+                return event
+        except ValidationError:
+            pass
+
+        try:
+            event = EVENT_ADAPTER.validate_python(repair_event(raw))
+        except (EventValidationError, ValidationError) as e:
+            validation_stats.failed += 1
+            raise EventValidationError(str(e)) from e
+        validation_stats.repaired += 1
+        return event
+    finally:
+        validation_stats.seconds += time.perf_counter() - start
+
+
+async def generate_valid_event(
+    generate: Callable[[], Awaitable[dict]],
+    attempts: int = MAX_ATTEMPTS,
+) -> dict:
+    """
+    Calls `generate` until it returns a reply that validates (after repair),
+    at most `attempts` times. Returns the validated event as a dict.
+    """
+    error = None
+    for attempt in range(attempts):
+        if attempt:
+            validation_stats.retries += 1
+            metrics.inc("llm_retries_total")
+        try:
+            return validate_event(await generate()).model_dump()
+        except EventValidationError as e:
+            error = e
+        except json.JSONDecodeError as e:
+            validation_stats.failed += 1
+            error = e
+    raise EventValidationError(f"no valid event after {attempts} attempts: {error}")
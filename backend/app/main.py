@@ -1,16 +1,90 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Header, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-import random
+from contextlib import asynccontextmanager, contextmanager
+from functools import partial
+from typing import Awaitable, Callable, Literal, Optional, TypeVar, Union
+import asyncio
+import json
+import math
+import secrets
+import time
 
 from . import models
+from . import aggregates
+from . import export
+from . import history
 from . import init_db
-from .llm.event_generator import generate_event
+from . import ledger
+from . import metrics
+from .llm.batching import batch_scheduler
+from .llm.cache import response_cache
+from .llm.event_generator import LLM_DEGRADE_ENABLED, degraded_event, generate_event_async
+from .llm.event_pool import EVENT_POOL_ENABLED, event_pool
+from .llm.gateway import LLMUnavailableError
+from .llm.gemini_client import llm_gateway, warm_up
+from .llm.prefetch import EventPrefetcher
+from .llm.prompts import prompt_stats
+from .llm.streaming import stream_event
+from .llm.validation import EventValidationError, validation_stats
+from .rules import apply_impact
+from .settings import settings
 
-# TODO: Add to a database or other persistent store
-games: dict[str, models.Game] = {}
+T = TypeVar("T")
 
-app = FastAPI()
+# Speculatively generate the next event for every option of a served event.
+PREFETCH_ENABLED = settings.llm_prefetch
+prefetcher = EventPrefetcher()
+
+# Seconds the event pool filler idles when every bucket is stocked.
+EVENT_POOL_FILL_INTERVAL = settings.event_pool_fill_interval_s
+# Create or migrate the database schema on startup.
+DB_INIT_ON_STARTUP = settings.db_init_on_startup
+# Load the LLM SDK in the background right after startup.
+LLM_WARMUP = settings.llm_warmup
+# Most days per history page, and per read of the NDJSON history.
+HISTORY_PAGE_MAX = 1000
+# Token for the /admin endpoints; they answer 404 while it is unset.
+ADMIN_TOKEN = settings.admin_token
+background_tasks: set[asyncio.Task] = set()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup and shutdown work. Everything that touches the database or the
+    LLM SDK happens here rather than at import, so importing `app.main`
+    (workers, tests, tooling) stays cheap.
+    """
+    # 1. Bring the schema up to date and count the SQL statements of the app's engines.
+    if DB_INIT_ON_STARTUP:
+        await run_in_threadpool(init_db.ensure_schema)
+    metrics.count_queries(init_db.engine)
+    if init_db.read_engine is not init_db.engine:
+        metrics.count_queries(init_db.read_engine)
+
+    # 2. Background work: keep the event pool stocked, load the LLM SDK.
+    if EVENT_POOL_ENABLED:
+        background_tasks.add(
+            asyncio.create_task(event_pool.run_filler(EVENT_POOL_FILL_INTERVAL))
+        )
+    if LLM_WARMUP:
+        background_tasks.add(asyncio.create_task(warm_up()))
+
+    yield
+
+    # 3. Drop speculative work and stop the background tasks.
+    prefetcher.clear()
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS settings
 app.add_middleware(
@@ -21,6 +95,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-endpoint latency and SQL statement counts, exported at /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Dependency to get the database session
 def get_db():
     db = init_db.SessionLocal()
@@ -29,154 +106,818 @@ def get_db():
     finally:
         db.close()
 
+# Dependency to get a read-only database session for GET endpoints
+def get_read_db():
+    db = init_db.ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Dependencies to get an async session (see the /async endpoints). The async
+# engines are created on first use, with their statements counted like the
+# sync ones.
+async def get_async_db():
+    async with async_sessions()() as db:
+        yield db
+
+async def get_async_read_db():
+    async with async_sessions(read_only=True)() as db:
+        yield db
+
+def async_sessions(read_only: bool = False):
+    if read_only:
+        engine, sessions = init_db.async_read_engine, init_db.AsyncReadSessionLocal
+    else:
+        engine, sessions = init_db.async_engine, init_db.AsyncSessionLocal
+    metrics.count_queries(engine.sync_engine)
+    return sessions
+
+def db_runner(db):
+    """
+    Returns `run`, where `await run(fn, *args)` calls `fn(session, *args)` on
+    the request's session: in the threadpool for a `Session`, and on the
+    event loop through `AsyncSession.run_sync` for an async one (aiosqlite
+    does the I/O). The turn logic below is written once for both.
+    """
+    if isinstance(db, Session):
+        return lambda fn, *args: run_in_threadpool(fn, db, *args)
+    return lambda fn, *args: db.run_sync(fn, *args)
+
+@contextmanager
+def db_session(read_only: bool = False):
+    """
+    A `get_db` (or `get_read_db`) session for work that outlives the request
+    handler (e.g. the body of a streaming response), honouring dependency
+    overrides.
+    """
+    dependency = get_read_db if read_only else get_db
+    sessions = app.dependency_overrides.get(dependency, dependency)()
+    try:
+        yield next(sessions)
+    finally:
+        sessions.close()
+
+def in_session(fn: Callable[..., T], *args) -> T:
+    """Calls `fn(session, *args)` in a `db_session` of its own (threadpool use)."""
+    with db_session() as db:
+        return fn(db, *args)
+
 @app.get("/")
 def read_root():
     return {"Hello": "World"}
 
+@app.get("/prefetch/stats")
+def prefetch_stats():
+    """Hit-rate metrics of the next-event prefetcher."""
+    return prefetcher.stats()
+
+@app.get("/pool/stats")
+def pool_stats():
+    """Hit-rate and fill metrics of the pre-generated event pool."""
+    return event_pool.stats()
+
+@app.get("/batch/stats")
+def batch_stats():
+    """Batch sizes and single-call fallbacks of the generation micro-batcher."""
+    return batch_scheduler.stats()
+
+@app.get("/gateway/stats")
+def gateway_stats():
+    """Queue depth, circuit breaker state and retry/shed counts of the LLM gateway."""
+    return llm_gateway.stats()
+
+@app.get("/cache/stats")
+def cache_stats():
+    """Hit ratio and size of the generation response cache."""
+    return response_cache.stats()
+
+@app.get("/prompt/stats")
+def llm_prompt_stats():
+    """Prompt size and estimated input tokens per call."""
+    return prompt_stats.as_dict()
+
+@app.get("/validation/stats")
+def llm_validation_stats():
+    """Outcome counts and cost of validating LLM event output."""
+    return validation_stats.as_dict()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    """Stage latencies, LLM and DB counters and the stats above, in Prometheus text format."""
+    return PlainTextResponse(
+        metrics.render({
+            "prefetch": prefetcher.stats(),
+            "pool": event_pool.stats(),
+            "cache": response_cache.stats(),
+            "batch": batch_scheduler.stats(),
+            "gateway": llm_gateway.stats(),
+            "prompt": prompt_stats.as_dict(),
+            "validation": validation_stats.as_dict(),
+        }),
+        media_type="text/plain; version=0.0.4",
+    )
+
+@app.get("/game/{game_id}", response_model=models.Game)
+def read_game(game_id: str, db: Session = Depends(get_read_db)):
+    """Returns the current state of a game."""
+    return load_game(db, game_id)
+
+
+def load_game(db: Session, game_id: str) -> models.Game:
+    db_game = db.query(init_db.Game).filter(init_db.Game.id == game_id).first()
+    if not db_game:
+        raise HTTPException(status_code=404, detail="Game not found")
+    with metrics.span("db.read_game"):
+        return get_full_game(db, db_game)
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@app.post("/admin/export", dependencies=[Depends(require_admin)])
+async def run_export(full: bool = False):
+    """
+    Exports games and days into a new run under `EXPORT_DIR` (see
+    app/export.py), incrementally since the latest run unless `full`, and
+    returns its manifest. Chunks are read on the read pool in short
+    transactions, so turns keep committing meanwhile.
+    """
+    try:
+        return await run_in_threadpool(export.export_run, None, full, partial(db_session, read_only=True))
+    except export.ExportInProgress:
+        raise HTTPException(status_code=409, detail="An export is already running.")
+
+
+@app.get(
+    "/game/{game_id}/history",
+    response_model=Union[models.GameHistory, models.GameHistoryColumns],
+)
+def read_history(
+    game_id: str,
+    after: int = Query(0, ge=0, description="Return the days after this one."),
+    limit: int = Query(100, ge=1, le=HISTORY_PAGE_MAX),
+    format: Literal["rows", "columns", "ndjson"] = "rows",
+    db: Session = Depends(get_read_db),
+):
+    """
+    Returns the stats of a game's past days, oldest first, a page at a time.
+
+    - `rows`: a `GameHistory`, one object per day.
+    - `columns`: a `GameHistoryColumns`, one array per stat.
+    - `ndjson`: every day after `after` as one JSON object per line,
+      read `HISTORY_PAGE_MAX` days at a time; `limit` does not apply.
+
+    Pages are key ranges on (game_id, number_of_day), so a page deep into a
+    long game costs the same as the first one.
+    """
+    db_game = db.query(init_db.Game).filter(init_db.Game.id == game_id).first()
+    if not db_game:
+        raise HTTPException(status_code=404, detail="Game not found")
+    if format == "ndjson":
+        return StreamingResponse(stream_history(db_game.id, after), media_type="application/x-ndjson")
+
+    with metrics.span("db.read_history"):
+        page = history.timeline_page(db, db_game.id, after, limit)
+    next_after = page[-1][0] if page and page[-1][0] < db_game.current_day else None
+    if format == "columns":
+        return models.GameHistoryColumns(
+            game_id=game_id, columns=history.timeline_columns(page), next_after=next_after
+        )
+    return models.GameHistory(
+        game_id=game_id,
+        days=[history.timeline_row(number, stats) for number, stats in page],
+        next_after=next_after,
+    )
+
+
+async def stream_history(game_id: int, after: int):
+    """
+    Body of the NDJSON history. Each page is read in its own short session,
+    so no connection is held while the client reads, and memory stays at one
+    page however long the game is.
+    """
+    while True:
+        page = await run_in_threadpool(read_history_page, game_id, after)
+        if not page:
+            return
+        yield "".join(
+            json.dumps(history.timeline_row(number, stats), separators=(",", ":")) + "\n"
+            for number, stats in page
+        )
+        if len(page) < HISTORY_PAGE_MAX:
+            return
+        after = page[-1][0]
+
+
+def read_history_page(game_id: int, after: int) -> list[tuple[int, models.Stats]]:
+    with db_session(read_only=True) as db, metrics.span("db.read_history"):
+        return history.timeline_page(db, game_id, after, HISTORY_PAGE_MAX)
+
+
+@app.get("/game/{game_id}/summary", response_model=models.GameSummary)
+def read_summary(game_id: str, db: Session = Depends(get_read_db)):
+    """A game's latest final day, max money and min health so far (one row lookup)."""
+    summary = aggregates.game_summary(db, game_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Game not found")
+    return summary
+
+
+@app.get("/stats/days", response_model=models.CohortStats)
+def read_cohort_stats(
+    after: int = Query(0, ge=0, description="Return the days after this one."),
+    limit: int = Query(100, ge=1, le=HISTORY_PAGE_MAX),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Mean stats of all games on each day, from the maintained per-day totals:
+    the cost depends on `limit`, not on the number of games or days played.
+    """
+    days, next_after = aggregates.cohort_days(db, after, limit)
+    return models.CohortStats(days=days, next_after=next_after)
+
+
+@app.get("/leaderboard/{metric}", response_model=models.Leaderboard)
+def read_leaderboard(
+    metric: Literal["reputation", "max_money", "final_day"],
+    k: int = Query(10, ge=1, le=100),
+    window: Literal["week", "all"] = "week",
+    db: Session = Depends(get_read_db),
+):
+    """
+    The top `k` games by current reputation, highest money ever or days
+    played: this week's standing (games played in the last 7 days) by
+    default, or all games with `window=all`.
+    """
+    since = aggregates.week_start() if window == "week" else None
+    entries = aggregates.leaderboard(db, metric, k, since)
+    return models.Leaderboard(metric=metric, window=window, entries=entries)
+
+
 @app.post("/game", response_model=models.StartGameResponse)
-def start_game(
+async def start_game(
     start_req: models.StartGameRequest,
     db: Session = Depends(get_db)
 ):
     """
     Starts a new game, creates the initial game state in the database,
     generates the first event, and returns both to the client.
+
+    The initial state needs nothing from the database, so the game is
+    created while its first event is generated; if the generation fails the
+    game is deleted again, leaving no half-created game behind. The blocking
+    DB work runs in the threadpool (on the event loop for
+    `start_game_async`); the LLM call is awaited on the event loop so it does
+    not hold a worker thread while waiting.
+    """
+    run = db_runner(db)
+    initial_state = models.Game(
+        user_id=0,
+        game_id="",
+        static_properties=models.StaticProperties(**start_req.model_dump()),
+        stats=models.Stats(),
+        finances=models.Finances()
+    )
+    # 1. Generate the first event while the game is created.
+    generation = asyncio.ensure_future(in_span("llm.generate", generate_or_degrade(initial_state)))
+    try:
+        with metrics.span("db.create"):
+            game_state = await run(create_game, start_req)
+    except BaseException:
+        generation.cancel()
+        raise
+
+    # 2. Wait for the event; if there is none, delete the game again.
+    try:
+        event = await generation
+    except BaseException as e:
+        await run(discard_game, game_state)
+        if isinstance(e, Exception):
+            raise generation_failed(e) from e
+        raise
+
+    # 3. Issue the event into the ledger.
+    with metrics.span("db.commit"):
+        event = await run(finish_turn, game_state, event)
+    if EVENT_POOL_ENABLED:
+        await event_pool.mark_served(game_state.game_id, event)
+    if PREFETCH_ENABLED:
+        prefetcher.schedule(game_state, event)
+
+    with metrics.span("response"):
+        return models.StartGameResponse(
+            game_state=game_state,
+            event=event
+        )
+
+
+@app.post("/game/{game_id}/choice", response_model=models.ChoiceResponse)
+async def make_choice(
+    game_id: str,
+    choice_request: models.ChoiceRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Handles a player's choice, updating the game state and returning the new
+    state together with the next event.
+
+    The choice is normally `{event_id, option_index}`, resolved against the
+    event ledger; resubmitting an already played choice returns the original
+    response. A raw `impact` is still accepted from older clients.
+
+    The new day is committed while the next event is generated from the
+    in-memory state, and the event is issued once both are done; a failed
+    generation reverts the day. If the request dies between the commit and
+    the issue, resubmitting the choice completes the turn.
+
+    NOTE: The legacy `impact` form trusts the client to send a valid,
+    unmodified impact object. In a real-world scenario, this would be a
+    security risk.
+    """
+    run = db_runner(db)
+    loop = asyncio.get_running_loop()
+    generations = []
+
+    def generate(game_state: models.Game, impact: models.Impact) -> None:
+        # Called from inside the DB call, as soon as the new state is known.
+        generations.append(asyncio.run_coroutine_threadsafe(
+            in_span("llm.generate", next_event_for(game_state, impact)), loop
+        ))
+
+    try:
+        # 1. Apply the choice and commit the new day; the next event is
+        # generated from the in-memory state meanwhile.
+        with metrics.span("db.stage"):
+            game_state_response, _, replay = await run(play_choice, game_id, choice_request, generate)
+        if replay is not None:
+            return replay
+
+        # 2. Wait for the event; a failed generation reverts the day.
+        try:
+            next_event = await asyncio.wrap_future(generations[0])
+        except BaseException as e:
+            await run(revert_turn, game_state_response, choice_request.event_id)
+            if isinstance(e, Exception):
+                raise generation_failed(e) from e
+            raise
+
+        # 3. Issue the event into the ledger.
+        with metrics.span("db.commit"):
+            next_event = await run(finish_turn, game_state_response, next_event)
+    except HTTPException as e:
+        return await replay_duplicate(run, e, game_id, choice_request)
+    finally:
+        for generation in generations:
+            generation.cancel()  # a no-op once it is done
+    if PREFETCH_ENABLED:
+        prefetcher.schedule(game_state_response, next_event)
+
+    with metrics.span("response"):
+        return models.ChoiceResponse(
+            game_state=game_state_response,
+            event=next_event
+        )
+
+
+# ------------------- Async database variants -------------------
+# The endpoints above on an `AsyncSession` over aiosqlite: the DB work runs
+# on the event loop instead of taking a threadpool thread per step, so the
+# DB and LLM waits of many concurrent turns share one loop (compare the two
+# with benchmarks/bench_async_db.py). Responses are identical.
+
+@app.get("/async/game/{game_id}", response_model=models.Game)
+async def read_game_async(game_id: str, db=Depends(get_async_read_db)):
+    """`read_game` on an async session."""
+    return await db.run_sync(load_game, game_id)
+
+
+@app.post("/async/game", response_model=models.StartGameResponse)
+async def start_game_async(start_req: models.StartGameRequest, db=Depends(get_async_db)):
+    """`start_game` on an async session."""
+    return await start_game(start_req, db)
+
+
+@app.post("/async/game/{game_id}/choice", response_model=models.ChoiceResponse)
+async def make_choice_async(game_id: str, choice_request: models.ChoiceRequest, db=Depends(get_async_db)):
+    """`make_choice` on an async session."""
+    return await make_choice(game_id, choice_request, db)
+
+
+@app.post("/game/{game_id}/choice/stream")
+async def make_choice_stream(game_id: str, choice_request: models.ChoiceRequest):
+    """
+    Server-Sent Events variant of `make_choice`.
+
+    The new game state is sent as soon as the choice is applied, then the
+    next event streams in as the model writes it:
+
+    - `state`: the new `Game`, sent first.
+    - `description`: `{"delta": ...}`, a piece of the event description.
+    - `option`: one option object, sent as soon as it is complete.
+    - `event`: the final validated `Event`; it supersedes the partial frames.
+    - `error`: `{"detail": ...}` if no valid event could be produced; the
+      day is then reverted, as with the 502/503 of `make_choice`.
+
+    As in `make_choice`, the new day is committed before the event is
+    generated and the event is issued right before the `event` frame, each
+    in a short session of its own: no connection is held while the model
+    writes. A failed generation reverts the day; if the client disconnects
+    in between, resubmitting the choice completes the turn.
+    """
+    run = lambda fn, *args: run_in_threadpool(in_session, fn, *args)
+    try:
+        game_state, impact, replay = await run(play_choice, game_id, choice_request, lambda game_state, impact: None)
+    except HTTPException as e:
+        game_state, impact, replay = None, None, await replay_duplicate(run, e, game_id, choice_request)
+    if replay is not None:
+        body = iter([
+            sse_frame("state", replay.game_state.model_dump()),
+            sse_frame("event", replay.event.model_dump()),
+        ])
+    else:
+        body = stream_turn(game_state, impact, choice_request)
+
+    return StreamingResponse(
+        body,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def sse_frame(name: str, data) -> str:
+    return f"event: {name}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+async def stream_turn(game_state: models.Game, impact: models.Impact, choice_request: models.ChoiceRequest):
+    """Body of `make_choice_stream`, once the new day is committed."""
+    run = lambda fn, *args: run_in_threadpool(in_session, fn, *args)
+    yield sse_frame("state", game_state.model_dump())
+
+    # 1. A prefetched branch or a pooled event is (nearly) ready: send it whole.
+    event = None
+    task = prefetcher.take(game_state.game_id, game_state.day - 1, impact) if PREFETCH_ENABLED else None
+    if task is not None:
+        try:
+            event = await task
+        except Exception:
+            pass  # Stream a live generation below.
+        else:
+            if EVENT_POOL_ENABLED:
+                await event_pool.mark_served(game_state.game_id, event)
+    if event is None and EVENT_POOL_ENABLED:
+        event = await event_pool.draw(game_state)
+    if event is not None:
+        yield sse_frame("description", {"delta": event["description"]})
+        for option in event["options"]:
+            yield sse_frame("option", option)
+    else:
+        # 2. Otherwise stream the live generation.
+        try:
+            async for name, payload in stream_event(game_state):
+                if name == "description":
+                    yield sse_frame("description", {"delta": payload})
+                elif name == "option":
+                    yield sse_frame("option", payload)
+                else:
+                    event = payload
+        except Exception as e:
+            if not isinstance(e, LLMUnavailableError) or not LLM_DEGRADE_ENABLED:
+                await run(revert_turn, game_state, choice_request.event_id)
+                yield sse_frame("error", {"detail": generation_failed(e).detail})
+                return
+            event = await degraded_event(game_state)
+        else:
+            if EVENT_POOL_ENABLED:
+                event_pool.add(game_state, event)
+                await event_pool.mark_served(game_state.game_id, event)
+
+    # 3. Issue the event, then hand it out.
+    try:
+        event = await run(finish_turn, game_state, event)
+    except HTTPException as e:
+        try:
+            # A concurrent duplicate of this submission may have issued it.
+            replay = await replay_duplicate(run, e, game_state.game_id, choice_request)
+        except HTTPException:
+            yield sse_frame("error", {"detail": e.detail})
+            return
+        yield sse_frame("event", replay.event.model_dump())
+        return
+    if PREFETCH_ENABLED:
+        prefetcher.schedule(game_state, event)
+    yield sse_frame("event", event)
+
+
+async def next_event_for(game_state: models.Game, impact: models.Impact) -> dict:
+    """
+    Returns the event for the new day, taking the prefetched branch for the
+    chosen impact when there is one and generating it live otherwise.
+    """
+    if PREFETCH_ENABLED:
+        task = prefetcher.take(game_state.game_id, game_state.day - 1, impact)
+        if task is not None:
+            try:
+                event = await task
+            except Exception:
+                pass  # Fall back to live generation below.
+            else:
+                if EVENT_POOL_ENABLED:
+                    await event_pool.mark_served(game_state.game_id, event)
+                return event
+    return await generate_or_degrade(game_state)
+
+
+async def in_span(name: str, awaitable: Awaitable[T]) -> T:
+    """Awaits `awaitable`, timed as stage `name`."""
+    with metrics.span(name):
+        return await awaitable
+
+
+async def generate_or_degrade(game_state: models.Game) -> dict:
+    """
+    `generate_event_async`, falling back to `degraded_event` while the LLM
+    gateway is unavailable (unless `LLM_DEGRADE` is off).
+    """
+    try:
+        return await generate_event_async(game_state)
+    except LLMUnavailableError:
+        if not LLM_DEGRADE_ENABLED:
+            raise
+        return await degraded_event(game_state)
+
+
+UNAVAILABLE_DETAIL = "The event generator is overloaded, please retry shortly."
+
+
+def unavailable(error: LLMUnavailableError) -> HTTPException:
+    """503 with a Retry-After hint for a call the LLM gateway turned away."""
+    return HTTPException(
+        status_code=503,
+        detail=UNAVAILABLE_DETAIL,
+        headers={"Retry-After": str(max(1, math.ceil(error.retry_after)))},
+    )
+
+
+INVALID_EVENT_DETAIL = "Could not generate a valid event."
+UPSTREAM_ERROR_DETAIL = "The event generator failed."
+
+
+def generation_failed(error: Exception) -> HTTPException:
+    """
+    The HTTP error for a failed event generation: 503 when the gateway
+    turned the call away, 502 for an invalid event or any other upstream
+    error (e.g. a Gemini 400/403, which the gateway passes through).
+    """
+    if isinstance(error, LLMUnavailableError):
+        return unavailable(error)
+    if isinstance(error, EventValidationError):
+        return HTTPException(status_code=502, detail=INVALID_EVENT_DETAIL)
+    return HTTPException(status_code=502, detail=UPSTREAM_ERROR_DETAIL)
+
+
+def create_game(db: Session, start_req: models.StartGameRequest) -> models.Game:
+    """
+    Creates the User, Game and first Day rows for a new game in a single
+    transaction and returns the initial game state.
     """
     # 1. Create a new User and Game in the database
     # Note: In a real app, you'd get the user_id from an authenticated session.
     # For now, we create a new user for each new game.
     new_user = init_db.User()
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-
     new_game = init_db.Game(
         age=start_req.age,
         gender=start_req.gender,
         character_name=start_req.character_name,
         work=start_req.work,
-        user_id=new_user.id
+        current_day=1,
+        user=new_user
     )
-    db.add(new_game)
-    db.commit()
-    db.refresh(new_game)
-    game_id = str(new_game.id)
 
     # 2. Create the first Day entry for the new game
     initial_stats = models.Stats() # Get default starting stats
     new_day = init_db.Day(
-        game_id=new_game.id,
+        game=new_game,
         number_of_day=1,
-        health=initial_stats.health,
-        happiness=initial_stats.happiness,
-        stress=initial_stats.stress,
-        reputation=initial_stats.reputation,
-        education=initial_stats.education,
-        money=initial_stats.money,
-        weekly_income=initial_stats.weekly_income,
-        weekly_expense=initial_stats.weekly_expense,
-        free_time=initial_stats.free_time
+        **initial_stats.model_dump()
     )
-    db.add(new_day)
+    db.add_all([new_user, new_game, new_day])
+    db.flush()  # Assigns the ids without ending the transaction.
+
+    # 3. Construct the initial game state before committing, so the commit
+    # does not expire the objects and force a re-read.
+    game_state = build_game_state(db_game=new_game, day=1, stats=initial_stats)
     db.commit()
-    db.refresh(new_day)
+    return game_state
 
-    # 3. Construct the initial game state Pydantic model
-    game_state = get_full_game(db, new_game)
 
-    # 4. Generate the first event using the LLM
-    event = generate_event(game_state)
-    # The active_events dictionary is no longer needed with the new flow.
-    # active_events[game_id] = event 
+def apply_choice(db: Session, game_id: str, impact: models.Impact, commit: bool = True) -> models.Game:
+    """
+    Applies the impact of a chosen option to the latest day of a game and
+    starts the next day, as one unit of work: a single joined read (plus a
+    bounded replay in delta storage mode), clamping in memory, a single insert
+    and one commit.
 
-    return models.StartGameResponse(
-        game_state=game_state,
-        event=event
-    )
+    With `commit=False` the new rows are only added to the session, and the
+    caller finishes the turn with `commit_turn` (or rolls it back).
+    """
+    # 1. Retrieve the game together with its current day
+    state = history.load_current_state(db, game_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Game not found")
+    db_game, current_stats = state
+    if current_stats is None:
+        raise HTTPException(status_code=404, detail="No days found for this game.")
 
+    # 2. Apply the impact to the day's stats, with clamping
+    new_stats = apply_impact(current_stats, impact)
 
+    # 3. Record the new Day (increment day number) holding the updated stats
+    new_day_number = db_game.current_day + 1
+    history.record_day(db, db_game.id, new_day_number, new_stats, impact)
+    db_game.current_day = new_day_number
 
+    # 4. Build the response from the in-memory objects, then commit once
+    game_state = build_game_state(db_game, new_day_number, new_stats)
+    if commit:
+        commit_turn(db)
+    return game_state
 
-@app.post("/game/{game_id}/choice", response_model=models.ChoiceResponse)
-def make_choice(
-    game_id: str,
-    choice_request: models.ChoiceRequest,
-    db: Session = Depends(get_db)
-):
+
+async def replay_duplicate(
+    run, error: HTTPException, game_id: str, choice: models.ChoiceRequest
+) -> models.ChoiceResponse:
+    """
+    Answers a choice that failed with `error`, a 409, because a concurrent
+    duplicate of the same submission won the race: returns the response the
+    duplicate got. Re-raises `error` for anything else.
+    """
+    if error.status_code != 409 or choice.event_id is None:
+        raise error
+    _, _, replay = await run(stage_choice, game_id, choice)
+    if replay is None:
+        raise error
+    return replay
+
+
+def stage_choice(
+    db: Session, game_id: str, choice: models.ChoiceRequest
+) -> tuple[Optional[models.Game], Optional[models.Impact], Optional[models.ChoiceResponse]]:
     """
-    Handles a player's choice by directly receiving the impact from the
-    frontend, updating the game state, and returning the new state.
+    Resolves a choice and stages the new day with `apply_choice(commit=False)`.
 
-    NOTE: This endpoint trusts the client to send a valid, unmodified impact
-    object. In a real-world scenario, this would be a security risk.
+    Returns `(game_state, impact, None)` for a new turn, or
+    `(None, None, response)` when the event was already played with the same
+    option, `response` being the original answer.
+
+    A day that was committed without its event being issued (the request
+    that played it failed between the two, see `make_choice`) is resumed:
+    `(game_state, impact, None)` with nothing staged, so the caller
+    generates and issues the missing event.
     """
-    # 1. Retrieve the game from the database
-    db_game = db.query(init_db.Game).filter(init_db.Game.id == game_id).first()
-    if not db_game:
-        raise HTTPException(status_code=404, detail="Game not found")
+    if choice.event_id is None:
+        return apply_choice(db, game_id, choice.impact, commit=False), choice.impact, None
 
-    # 2. Get the impact directly from the request
-    impact = choice_request.impact
+    issued = ledger.get_issued(db, game_id, choice.event_id)
+    if issued is None:
+        raise HTTPException(status_code=404, detail="Event not found for this game.")
+    if issued.chosen_option is not None:
+        if issued.chosen_option != choice.option_index:
+            raise HTTPException(status_code=409, detail="Another option was already chosen for this event.")
+        next_issued = ledger.get_issued_for_day(db, issued.game_id, issued.number_of_day + 1)
+        if next_issued is None:
+            return resumed_turn(db, issued), ledger.option_impact(issued, choice.option_index), None
+        return None, None, replay_turn(db, issued, next_issued)
 
-    # 3. Get the most recent day for the game
-    current_day = db.query(init_db.Day).filter(init_db.Day.game_id == game_id).order_by(init_db.Day.number_of_day.desc()).first()
-    if not current_day:
-        raise HTTPException(status_code=404, detail="No days found for this game.")
+    impact = ledger.option_impact(issued, choice.option_index)
+    if impact is None:
+        raise HTTPException(status_code=422, detail="option_index is out of range for this event.")
+    game_state = apply_choice(db, game_id, impact, commit=False)
+    if game_state.day != issued.number_of_day + 1:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="This event is no longer current.")
+    issued.chosen_option = choice.option_index
+    return game_state, impact, None
 
-    # 4. Apply the impact to the day's stats, with clamping
-    current_day.health = max(0, min(100, current_day.health + impact.health))
-    current_day.happiness = max(0, min(100, current_day.happiness + impact.happiness))
-    current_day.stress = max(0, min(100, current_day.stress + impact.stress))
-    current_day.reputation += impact.reputation
-    current_day.education += impact.education
-    current_day.money += impact.money
-    current_day.weekly_income += impact.weekly_income
-    current_day.weekly_expense += impact.weekly_expense
-    current_day.free_time += impact.free_time
-
-    # 5. Commit the changes to the database
-    db.commit()
-    db.refresh(current_day)
 
-    # 6. Create new Day (increment day number)
-    new_day = init_db.Day(
-        game_id=db_game.id,
-        number_of_day=current_day.number_of_day + 1,
-        health=current_day.health,
-        happiness=current_day.happiness,
-        stress=current_day.stress,
-        reputation=current_day.reputation,
-        education=current_day.education,
-        money=current_day.money,
-        weekly_income=current_day.weekly_income,
-        weekly_expense=current_day.weekly_expense,
-        free_time=current_day.free_time
-    )
-    db.add(new_day)
-    db.commit()
-    db.refresh(new_day)
+def play_choice(
+    db: Session,
+    game_id: str,
+    choice: models.ChoiceRequest,
+    on_staged: Callable[[models.Game, models.Impact], None],
+) -> tuple[Optional[models.Game], Optional[models.Impact], Optional[models.ChoiceResponse]]:
+    """
+    `stage_choice`, then commits the new day. `on_staged(game_state, impact)`
+    is called in between, so the caller can start generating the next event
+    while the day is written.
 
-    # 7. Construct the full, updated game state response
-    game_state_response = get_full_game(db, db_game)
+    The whole turn is one DB call: a pooled connection is never held across
+    a threadpool hop, where requests waiting for a connection could starve
+    the threads the holders need to finish.
+    """
+    game_state, impact, replay = stage_choice(db, game_id, choice)
+    if replay is None:
+        on_staged(game_state, impact)
+        with metrics.span("db.persist"):
+            commit_turn(db)
+    return game_state, impact, replay
 
-    # 8. Generate the next event using the LLM
-    next_event = generate_event(game_state_response)
 
+def replay_turn(
+    db: Session, issued: init_db.IssuedEvent, next_issued: init_db.IssuedEvent
+) -> models.ChoiceResponse:
+    """The response originally returned for the played event `issued`."""
     return models.ChoiceResponse(
-        game_state=game_state_response,
-        event=next_event
+        game_state=resumed_turn(db, issued),
+        event=ledger.event_of(next_issued),
     )
 
 
-def get_full_game(db: Session, db_game: init_db.Game) -> models.Game:
+def resumed_turn(db: Session, issued: init_db.IssuedEvent) -> models.Game:
+    """The game state of the day that followed the played event `issued`."""
+    day = issued.number_of_day + 1
+    db_game = db.get(init_db.Game, issued.game_id)
+    stats = history.stats_at(db, issued.game_id, day)
+    if stats is None:
+        raise HTTPException(status_code=409, detail="This day has already been played.")
+    return build_game_state(db_game, day, stats)
+
+
+def finish_turn(db: Session, game_state: models.Game, event: dict) -> dict:
     """
-    For Jana: Constructs the complete Pydantic Game model from database objects.
+    Issues `event` for the day of `game_state` into the ledger and commits
+    the staged turn. Returns the event carrying its ledger `event_id`.
+
+    The day must still be the game's current one; if it was reverted in the
+    meantime (see `revert_turn`) nothing is issued and the turn is a 409.
+    """
+    game_id = int(game_state.game_id)
+    try:
+        event = ledger.issue_event(db, game_id, game_state.day, event)
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="This day has already been played.")
+    # The insert holds the write lock, so this read is up to date.
+    current_day = db.query(init_db.Game.current_day).filter(init_db.Game.id == game_id).scalar()
+    if current_day != game_state.day:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="This event is no longer current.")
+    # Issuing makes the day final: fold it into the aggregates with the turn.
+    aggregates.record_day(db, game_id, game_state.day, game_state.stats, time.time())
+    commit_turn(db)
+    return event
+
+
+def revert_turn(db: Session, game_state: models.Game, event_id: Optional[int]) -> None:
     """
-    # This function would gather all the necessary data from the DB and assemble the full game state.
-    # This is a simplified representation without finances for now. :)
-    
-    current_day = db.query(init_db.Day).filter(init_db.Day.game_id == db_game.id).order_by(init_db.Day.number_of_day.desc()).first()
+    Undoes a committed day of `game_state` whose event could not be
+    generated: the game goes back to the previous day, and the event
+    `event_id` can be chosen again. Does nothing if an event was issued for
+    the day meanwhile (the turn was completed by a duplicate submission).
+    """
+    game_id, day = int(game_state.game_id), game_state.day
+    issued_for_day = db.query(init_db.IssuedEvent).filter(
+        init_db.IssuedEvent.game_id == game_id, init_db.IssuedEvent.number_of_day == day
+    ).exists()
+    reverted = (
+        db.query(init_db.Game)
+        .filter(init_db.Game.id == game_id, init_db.Game.current_day == day, ~issued_for_day)
+        .update({init_db.Game.current_day: day - 1}, synchronize_session=False)
+    )
+    if reverted:
+        history.delete_day(db, game_id, day)
+        if event_id is not None:
+            db.query(init_db.IssuedEvent).filter(init_db.IssuedEvent.id == event_id).update(
+                {init_db.IssuedEvent.chosen_option: None}, synchronize_session=False
+            )
+    db.commit()
+
+
+def discard_game(db: Session, game_state: models.Game) -> None:
+    """Deletes a game created by `create_game` whose first event could not be generated."""
+    db_game = db.get(init_db.Game, int(game_state.game_id))
+    if db_game is not None:
+        user = db_game.user
+        db.delete(db_game)  # and its first day, through the cascade
+        db.delete(user)
+        db.commit()
 
+
+def commit_turn(db: Session) -> None:
+    """Commits a turn; a concurrent submit for the same day becomes a 409."""
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="This day has already been played.")
+
+
+def build_game_state(db_game: init_db.Game, day: int, stats: models.Stats) -> models.Game:
+    """Assembles the Pydantic Game model from objects already in memory."""
     static_props = models.StaticProperties(
         character_name=db_game.character_name,
         gender=db_game.gender,
@@ -184,18 +925,6 @@ def get_full_game(db: Session, db_game: init_db.Game) -> models.Game:
         work=db_game.work
     )
 
-    stats = models.Stats(
-        health=current_day.health,
-        happiness=current_day.happiness,
-        stress=current_day.stress,
-        reputation=current_day.reputation,
-        education=current_day.education,
-        money=current_day.money,
-        weekly_income=current_day.weekly_income,
-        weekly_expense=current_day.weekly_expense,
-        free_time=current_day.free_time
-    )
-
     # Finances would be populated from its own tables if they existed - might implement later
     # For now, returning an empty Finances object.
     finances = models.Finances()
@@ -203,8 +932,16 @@ def get_full_game(db: Session, db_game: init_db.Game) -> models.Game:
     return models.Game(
         user_id=db_game.user_id,
         game_id=str(db_game.id),
-        day=current_day.number_of_day,
+        day=day,
         static_properties=static_props,
         stats=stats,
         finances=finances
-    )
\ No newline at end of file
+    )
+
+
+def get_full_game(db: Session, db_game: init_db.Game) -> models.Game:
+    """
+    For Jana: Constructs the complete Pydantic Game model from database objects.
+    """
+    stats = history.stats_at(db, db_game.id, db_game.current_day)
+    return build_game_state(db_game, db_game.current_day, stats)
@@ -0,0 +1,282 @@
+"""
+Lightweight per-stage instrumentation with a Prometheus text exposition.
+
+- `span(name)` times a block into the `app_stage_seconds` histogram; `timed`
+  does the same for a whole function. With `METRICS=false` `span` returns a
+  shared no-op context manager and `timed` leaves the function unwrapped, so
+  a disabled span costs one function call and one branch.
+- `inc(name, value)` bumps a counter (LLM calls, tokens, retries, ...).
+- `MetricsMiddleware` times every request per endpoint and counts the SQL
+  statements it runs (`count_queries` hooks an engine).
+- `PROFILE_SAMPLE_RATE` turns on a sampling profiler: that share of requests
+  runs under cProfile and is dumped to `PROFILE_DIR` as a `.prof` file, or
+  handed to a hook installed with `set_profile_hook`.
+"""
+
+import bisect
+import contextlib
+import contextvars
+import cProfile
+import functools
+import inspect
+import os
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+from .settings import settings
+
+METRICS_ENABLED = settings.metrics
+PROFILE_SAMPLE_RATE = settings.profile_sample_rate
+PROFILE_DIR = settings.profile_dir
+
+# Upper bounds (seconds) of the latency histogram buckets.
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds of the per-request SQL statement count histogram.
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50)
+
+COUNTER_HELP = {
+    "llm_calls_total": "LLM requests sent.",
+    "llm_retries_total": "Extra LLM attempts after an invalid reply.",
+    "llm_prompt_tokens_total": "Prompt tokens sent to the LLM (reported, or estimated in mock mode).",
+    "llm_output_tokens_total": "Output tokens received from the LLM (reported, or estimated in mock mode).",
+    "db_queries_total": "SQL statements executed.",
+}
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """Stage histograms, request histograms and counters of this process."""
+
+    def __init__(self):
+        self.stages: dict[str, Histogram] = {}
+        self.requests: dict[str, Histogram] = {}
+        self.queries: dict[str, Histogram] = {}
+        self.counters: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stages.setdefault(stage, Histogram(BUCKETS)).observe(seconds)
+
+    def observe_request(self, endpoint: str, seconds: float, queries: int) -> None:
+        with self._lock:
+            self.requests.setdefault(endpoint, Histogram(BUCKETS)).observe(seconds)
+            self.queries.setdefault(endpoint, Histogram(QUERY_BUCKETS)).observe(queries)
+
+    def inc(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stages.clear()
+            self.requests.clear()
+            self.queries.clear()
+            self.counters.clear()
+
+
+registry = Registry()
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        registry.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+_NOOP = contextlib.nullcontext()
+
+
+def span(name: str):
+    """Context manager timing a block as stage `name`."""
+    if not METRICS_ENABLED:
+        return _NOOP
+    return _Span(name)
+
+
+def timed(name: str):
+    """Decorator timing every call of a (sync or async) function as stage `name`."""
+    def decorate(fn):
+        if not METRICS_ENABLED:
+            return fn
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    registry.observe(name, time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                registry.observe(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def inc(name: str, value: float = 1) -> None:
+    """Bump counter `name` (see COUNTER_HELP)."""
+    if METRICS_ENABLED:
+        registry.inc(name, value)
+
+
+# ------------------- Per-request SQL statement counts -------------------
+
+# A one-element list per request, shared with the threadpool (contextvars
+# are copied into `run_in_threadpool`, the list object is not).
+_query_count: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("query_count", default=None)
+
+
+def _on_execute(conn, cursor, statement, parameters, context, executemany):
+    counter = _query_count.get()
+    if counter is not None:
+        counter[0] += 1
+    registry.inc("db_queries_total")
+
+
+def count_queries(engine) -> None:
+    """Counts the statements `engine` executes, per request and in total."""
+    if METRICS_ENABLED:
+        from sqlalchemy import event
+        if not event.contains(engine, "before_cursor_execute", _on_execute):
+            event.listen(engine, "before_cursor_execute", _on_execute)
+
+
+# ------------------- Sampling profiler -------------------
+
+_profile_hook: Optional[Callable[[str, cProfile.Profile], None]] = None
+_profiling = threading.Lock()
+
+
+def set_profile_hook(hook: Optional[Callable[[str, cProfile.Profile], None]]) -> None:
+    """Receive sampled profiles as `hook(endpoint, profile)` instead of .prof files."""
+    global _profile_hook
+    _profile_hook = hook
+
+
+def _save_profile(endpoint: str, profile: cProfile.Profile) -> None:
+    if _profile_hook is not None:
+        _profile_hook(endpoint, profile)
+        return
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profile.dump_stats(os.path.join(PROFILE_DIR, f"{time.time():.6f}-{endpoint}.prof"))
+
+
+# ------------------- ASGI middleware -------------------
+
+class MetricsMiddleware:
+    """
+    Times each HTTP request (until its last body chunk is sent) per endpoint
+    and records its SQL statement count. Sampled requests are profiled; only
+    one at a time, and the profile covers everything the event loop thread ran
+    meanwhile.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        counter = [0]
+        token = _query_count.set(counter)
+        profile = None
+        if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE and _profiling.acquire(blocking=False):
+            profile = cProfile.Profile()
+            profile.enable()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            elapsed = time.perf_counter() - start
+            _query_count.reset(token)
+            endpoint = getattr(scope.get("endpoint"), "__name__", "unmatched")
+            registry.observe_request(endpoint, elapsed, counter[0])
+            if profile is not None:
+                profile.disable()
+                _profiling.release()
+                _save_profile(endpoint, profile)
+
+
+# ------------------- Prometheus text format -------------------
+
+def _histogram_lines(name: str, label: str, histograms: dict[str, Histogram]) -> list[str]:
+    lines = []
+    for key, histogram in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(histogram.bounds + (float("inf"),), histogram.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'{name}_bucket{{{label}="{key}",le="{le}"}} {cumulative}')
+        lines.append(f'{name}_sum{{{label}="{key}"}} {histogram.sum!r}')
+        lines.append(f'{name}_count{{{label}="{key}"}} {histogram.count}')
+    return lines
+
+
+def render(gauges: dict[str, dict] = None) -> str:
+    """
+    The registry in Prometheus text format. `gauges` maps a component name to
+    a flat stats dict (e.g. `event_pool.stats()`); its numeric values are
+    exported as `app_<component>_<key>` gauges.
+    """
+    # Under the registry lock, so each histogram is read as one consistent snapshot.
+    with registry._lock:
+        lines = [
+            "# HELP app_stage_seconds Time spent in each stage of a request.",
+            "# TYPE app_stage_seconds histogram",
+            *_histogram_lines("app_stage_seconds", "stage", registry.stages),
+            "# HELP app_request_seconds Request latency per endpoint.",
+            "# TYPE app_request_seconds histogram",
+            *_histogram_lines("app_request_seconds", "endpoint", registry.requests),
+            "# HELP app_request_db_queries SQL statements per request.",
+            "# TYPE app_request_db_queries histogram",
+            *_histogram_lines("app_request_db_queries", "endpoint", registry.queries),
+        ]
+        for name, help_text in COUNTER_HELP.items():
+            lines += [
+                f"# HELP app_{name} {help_text}",
+                f"# TYPE app_{name} counter",
+                f"app_{name} {registry.counters.get(name, 0)!r}",
+            ]
+    for component, stats in (gauges or {}).items():
+        for key, value in stats.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            lines += [f"# TYPE app_{component}_{key} gauge", f"app_{component}_{key} {value!r}"]
+    return "\n".join(lines) + "\n"
@@ -1,6 +1,6 @@
-from typing import List, Optional
+from typing import Annotated, Dict, List, Optional, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 # =============================================================================
@@ -60,13 +60,17 @@ class Finances(BaseModel):
 
 # ------------------- Action/Event Schemas -------------------
 
+# Integer impacts are stored packed as int32 (see app/history.py).
+Int32 = Annotated[int, Field(ge=-2**31, le=2**31 - 1)]
+
+
 class Impact(BaseModel):
     """Describes stat changes made by an action or event - we add these on."""
-    health: int = 0
-    happiness: int = 0
-    stress: int = 0
-    reputation: int = 0
-    education: int = 0
+    health: Int32 = 0
+    happiness: Int32 = 0
+    stress: Int32 = 0
+    reputation: Int32 = 0
+    education: Int32 = 0
     money: float = 0.0
     weekly_income: float = 0.0
     weekly_expense: float = 0.0
@@ -133,11 +137,87 @@ class StartGameResponse(BaseModel):
 
 
 class ChoiceRequest(BaseModel):
-    """Request model for submitting a choice's impact."""
-    impact: Impact
+    """
+    Request model for submitting a choice.
+
+    Preferred: the `event_id` of the served event and the index of the chosen
+    option; the server looks the impact up in its event ledger. Sending the
+    option's `impact` directly is still accepted for older clients.
+    """
+    event_id: Optional[int] = None
+    option_index: Optional[int] = Field(None, ge=0)
+    impact: Optional[Impact] = None
+
+    @model_validator(mode="after")
+    def check_choice(self):
+        if self.event_id is not None and self.option_index is not None:
+            return self
+        if self.impact is not None and self.event_id is None and self.option_index is None:
+            return self
+        raise ValueError("send either event_id and option_index, or impact")
 
 
 class ChoiceResponse(BaseModel):
     """Response model after a choice has been applied."""
     game_state: Game
     event: Event
+
+
+class HistoryDay(Stats):
+    """The stats of one past day."""
+    day: int
+
+
+class GameHistory(BaseModel):
+    """
+    A page of a game's history, oldest day first. Pass `next_after` as
+    `after` to get the next page; it is None on the last page.
+    """
+    game_id: str
+    days: List[HistoryDay]
+    next_after: Optional[int] = None
+
+
+class GameHistoryColumns(BaseModel):
+    """`GameHistory` in columnar form: one array per stat, plus `day`."""
+    game_id: str
+    columns: Dict[str, List[Union[int, float]]]
+    next_after: Optional[int] = None
+
+
+# ------------------- Aggregate Models -------------------
+
+class DayCohortStats(BaseModel):
+    """Every game's final stats on one day: how many games reached it and the mean of each stat."""
+    day: int
+    players: int
+    mean: Dict[str, float]
+
+
+class CohortStats(BaseModel):
+    """A page of `DayCohortStats`; pass `next_after` as `after` for the next one."""
+    days: List[DayCohortStats]
+    next_after: Optional[int] = None
+
+
+class GameSummary(BaseModel):
+    """A game as of its latest final day, with its extremes so far."""
+    game_id: str
+    final_day: int
+    reputation: int
+    money: float
+    max_money: float
+    min_health: int
+
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    game_id: str
+    character_name: str
+    value: Union[int, float]
+
+
+class Leaderboard(BaseModel):
+    metric: str
+    window: str
+    entries: List[LeaderboardEntry]
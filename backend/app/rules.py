@@ -0,0 +1,99 @@
+"""
+Game rules: the stat-transition kernel shared by the API, the simulator and
+the tests.
+
+A turn adds an `Impact` to the current `Stats` and clamps every stat to the
+bounds declared on the `Stats` schema (e.g. health 0..100, reputation
+-100..100, education >= 0). The bounds are read from the Pydantic field
+metadata once, so the schema stays the single source of truth.
+
+Stats are handled as plain vectors in `STAT_FIELDS` order: `step` works on
+one vector, `step_batch` on a (games x stats) NumPy array.
+"""
+
+from typing import Optional, Sequence
+
+from annotated_types import Ge, Gt, Le, Lt
+
+from .models import Impact, Stats
+
+STAT_FIELDS = tuple(Stats.model_fields)
+assert STAT_FIELDS == tuple(Impact.model_fields), "Stats and Impact must share field order"
+
+
+def _schema_bounds() -> tuple[tuple[int, Optional[float], Optional[float]], ...]:
+    """(index, lower, upper) for every `Stats` field that declares a bound."""
+    bounds = []
+    for i, field in enumerate(Stats.model_fields.values()):
+        lower = upper = None
+        for constraint in field.metadata:
+            if isinstance(constraint, (Ge, Gt)):
+                lower = constraint.ge if isinstance(constraint, Ge) else constraint.gt
+            elif isinstance(constraint, (Le, Lt)):
+                upper = constraint.le if isinstance(constraint, Le) else constraint.lt
+        if lower is not None or upper is not None:
+            bounds.append((i, lower, upper))
+    return tuple(bounds)
+
+
+BOUNDS = _schema_bounds()
+
+
+def to_vector(model) -> list:
+    """A `Stats` or `Impact` model as a list in `STAT_FIELDS` order."""
+    return [getattr(model, field) for field in STAT_FIELDS]
+
+
+def from_vector(values: Sequence) -> Stats:
+    """Builds `Stats` from a vector without re-running validation."""
+    return Stats.model_construct(**dict(zip(STAT_FIELDS, values)))
+
+
+def clamp(values: list) -> list:
+    """Clamps a stat vector to the schema bounds, in place."""
+    for i, lower, upper in BOUNDS:
+        value = values[i]
+        if lower is not None and value < lower:
+            values[i] = lower
+        elif upper is not None and value > upper:
+            values[i] = upper
+    return values
+
+
+def step(stats: Sequence, impact: Sequence) -> list:
+    """One turn on plain vectors: add the impact, then clamp."""
+    return clamp([s + d for s, d in zip(stats, impact)])
+
+
+def apply_impact(stats: Stats, impact: Impact) -> Stats:
+    """
+    Returns the stats after applying an impact, as a turn in `make_choice`.
+
+    The result is built without validation; the kernel guarantees it is
+    within the schema bounds.
+    """
+    return from_vector(step(to_vector(stats), to_vector(impact)))
+
+
+_bound_arrays = None
+
+
+def step_batch(stats, impacts):
+    """
+    Batched `step` on NumPy arrays of shape (games, stats), in place.
+
+    Returns `stats` for convenience.
+    """
+    global _bound_arrays
+    import numpy as np
+
+    if _bound_arrays is None:
+        columns = [i for i, _, _ in BOUNDS]
+        lower = [-np.inf if lo is None else lo for _, lo, _ in BOUNDS]
+        upper = [np.inf if hi is None else hi for _, _, hi in BOUNDS]
+        _bound_arrays = (columns, np.array(lower), np.array(upper))
+    columns, lower, upper = _bound_arrays
+
+    stats += impacts
+    stats[:, columns] = np.clip(stats[:, columns], lower, upper)
+    return stats
@@ -0,0 +1,121 @@
+"""
+Backend configuration, read once from the environment.
+
+Every setting of the backend is a field of `Settings` (documented in
+backend/.env.example under the same name in upper case). `settings` is
+built at import from `os.environ`, after loading `backend/.env` if there is
+one. Modules copy what they need into module-level constants, which tests
+and benchmarks may override.
+
+This module only uses the standard library, so importing it is cheap;
+python-dotenv is imported only when a .env file exists.
+"""
+
+import os
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Mapping, Optional
+
+# Anchored to backend/ so every worker process resolves the same paths,
+# whatever directory it was started from.
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+ENV_FILE = BACKEND_DIR / ".env"
+
+
+@dataclass(frozen=True)
+class Settings:
+    # LLM client
+    use_mock_llm: bool = True
+    gemini_api_key: Optional[str] = None
+    gemini_model: str = "gemini-2.0-flash-exp"
+    gemini_base_url: Optional[str] = None
+    llm_max_concurrency: int = 16
+    mock_llm_latency_ms: float = 0.0
+    # Import and connect the LLM SDK in the background right after startup.
+    llm_warmup: bool = True
+
+    # LLM gateway
+    llm_deadline_s: float = 20.0
+    llm_retries: int = 2
+    llm_rate_limit_rpm: float = 0.0
+    llm_rate_burst: float = 4.0
+    llm_max_queue: int = 256
+    llm_breaker_failures: int = 5
+    llm_breaker_reset_s: float = 30.0
+    llm_degrade: bool = True
+
+    # Event generation
+    llm_max_attempts: int = 3
+    llm_prefetch: bool = True
+    llm_batch: bool = False
+    llm_batch_window_ms: float = 30.0
+    llm_batch_max_size: int = 8
+    llm_cache: bool = True
+    llm_cache_max_entries: int = 10000
+    llm_cache_ttl_s: float = 3600.0
+    llm_cache_path: Optional[str] = None
+    scenario_strategy_path: str = str(BACKEND_DIR / "app" / "llm" / "scenario_strategy.md")
+    event_pool: bool = True
+    event_pool_low_water: int = 4
+    event_pool_capacity: int = 32
+    event_pool_fill_interval_s: float = 1.0
+
+    # Database
+    database_url: str = f"sqlite:///{BACKEND_DIR / 'mydb.sqlite'}"
+    db_profile: str = "production"
+    db_pool_size: int = 8
+    db_max_overflow: int = 16
+    db_read_pool: bool = True
+    # Create or migrate the schema in the app's lifespan hook.
+    db_init_on_startup: bool = True
+    day_storage_mode: str = "snapshot"
+    day_checkpoint_interval: int = 16
+
+    # Export (python -m app.export, POST /admin/export)
+    export_dir: str = str(BACKEND_DIR / "exports")
+    export_chunk_games: int = 100
+    # Token for the /admin endpoints; they are off while it is unset.
+    admin_token: Optional[str] = None
+
+    # Shared state
+    state_backend: str = "memory"
+    state_path: str = str(BACKEND_DIR / "state.sqlite")
+    state_kv_address: str = "127.0.0.1:7379"
+
+    # Metrics
+    metrics: bool = True
+    profile_sample_rate: float = 0.0
+    profile_dir: str = str(BACKEND_DIR / "profiles")
+
+    @classmethod
+    def from_env(cls, environ: Mapping[str, str] = os.environ) -> "Settings":
+        """
+        Settings from `environ`: each field is read from its upper-case name
+        and parsed by its type; unset (or empty optional) variables keep the
+        default.
+        """
+        values = {}
+        for field in fields(cls):
+            raw = environ.get(field.name.upper())
+            if raw is None:
+                continue
+            if field.type is bool:
+                values[field.name] = raw.lower() == "true"
+            elif field.type in (int, float):
+                values[field.name] = field.type(raw)
+            elif field.type == Optional[str]:
+                values[field.name] = raw or None
+            else:
+                values[field.name] = raw
+        return cls(**values)
+
+
+def _load_env_file() -> None:
+    """Export `backend/.env` into the environment (existing variables win)."""
+    if ENV_FILE.is_file():
+        from dotenv import load_dotenv
+        load_dotenv(ENV_FILE)
+
+
+_load_env_file()
+settings = Settings.from_env()
@@ -0,0 +1,233 @@
+"""
+Headless, vectorized game simulation for balancing.
+
+Plays thousands of games in parallel without the API, the database or the
+LLM: stats live in a (games x 9) NumPy array, events come from an
+`EventCorpus` of impact vectors and a player policy picks one option per game
+per day. Turns go through the same stat kernel as `make_choice`
+(`rules.step_batch`).
+
+Usage (from backend/):
+    python -m app.simulation --games 10000 --days 100 --policy saver
+    python -m app.simulation --corpus events.json --policy greedy_happiness
+"""
+
+import argparse
+import json
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+
+from .models import Event, Stats
+from .rules import STAT_FIELDS, step_batch, to_vector
+
+FIELD_INDEX = {field: i for i, field in enumerate(STAT_FIELDS)}
+
+
+@dataclass
+class EventCorpus:
+    """
+    Events as dense arrays.
+
+    impacts: (events, max_options, stats) impact vectors.
+    mask: (events, max_options) True where the option exists.
+    """
+    impacts: np.ndarray
+    mask: np.ndarray
+
+    @classmethod
+    def from_events(cls, events: Iterable) -> "EventCorpus":
+        """Build a corpus from `Event` models or event dicts."""
+        parsed = [Event.model_validate(event) for event in events]
+        if not parsed:
+            raise ValueError("An event corpus needs at least one event")
+        max_options = max(len(event.options) for event in parsed)
+        impacts = np.zeros((len(parsed), max_options, len(STAT_FIELDS)))
+        mask = np.zeros((len(parsed), max_options), dtype=bool)
+        for e, event in enumerate(parsed):
+            for o, option in enumerate(event.options):
+                impacts[e, o] = to_vector(option.impact)
+                mask[e, o] = True
+        return cls(impacts, mask)
+
+    @classmethod
+    def from_file(cls, path: str) -> "EventCorpus":
+        """Load recorded events from a JSON array or an NDJSON file."""
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        if text.lstrip().startswith("["):
+            events = json.loads(text)
+        else:
+            events = [json.loads(line) for line in text.splitlines() if line.strip()]
+        return cls.from_events(events)
+
+    @classmethod
+    def from_mock(cls) -> "EventCorpus":
+        """The mock LLM's event."""
+        from .llm.gemini_client import _get_mock_event
+        return cls.from_events([_get_mock_event()])
+
+    @classmethod
+    def synthetic(cls, events: int = 500, options: int = 3, seed: int = 0) -> "EventCorpus":
+        """
+        Random events within the ranges the prompt asks the LLM for
+        (-20..20 for stats, larger swings for money).
+        """
+        rng = np.random.default_rng(seed)
+        impacts = np.zeros((events, options, len(STAT_FIELDS)))
+        for field in ("health", "happiness", "stress", "reputation", "education"):
+            impacts[:, :, FIELD_INDEX[field]] = rng.integers(-20, 21, size=(events, options))
+        impacts[:, :, FIELD_INDEX["money"]] = rng.normal(0, 40, size=(events, options)).round(2)
+        for field in ("weekly_income", "weekly_expense"):
+            impacts[:, :, FIELD_INDEX[field]] = rng.choice([0, 0, 0, 5, 10, -5], size=(events, options))
+        impacts[:, :, FIELD_INDEX["free_time"]] = rng.integers(-3, 4, size=(events, options))
+        return cls(impacts, np.ones((events, options), dtype=bool))
+
+
+# ------------------- Player policies -------------------
+# A policy gets the current stats (games x stats), the offered option impacts
+# (games x options x stats), the option mask (games x options) and the RNG,
+# and returns the chosen option index per game.
+
+Policy = Callable[[np.ndarray, np.ndarray, np.ndarray, np.random.Generator], np.ndarray]
+
+
+def _best(scores: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    return np.where(mask, scores, -np.inf).argmax(axis=1)
+
+
+def random_policy(stats, impacts, mask, rng):
+    """Picks uniformly among the available options."""
+    return _best(rng.random(mask.shape), mask)
+
+
+def greedy_happiness_policy(stats, impacts, mask, rng):
+    """Always takes the option with the biggest immediate happiness gain."""
+    return _best(impacts[:, :, FIELD_INDEX["happiness"]], mask)
+
+
+def saver_policy(stats, impacts, mask, rng):
+    """Maximizes money now plus the change in weekly net income."""
+    scores = (
+        impacts[:, :, FIELD_INDEX["money"]]
+        + impacts[:, :, FIELD_INDEX["weekly_income"]]
+        - impacts[:, :, FIELD_INDEX["weekly_expense"]]
+    )
+    return _best(scores, mask)
+
+
+POLICIES: dict[str, Policy] = {
+    "random": random_policy,
+    "greedy_happiness": greedy_happiness_policy,
+    "saver": saver_policy,
+}
+
+
+# ------------------- Simulation -------------------
+
+def initial_stats(games: int) -> np.ndarray:
+    """Every game starts from the default `Stats`."""
+    return np.tile(np.array(to_vector(Stats()), dtype=float), (games, 1))
+
+
+@dataclass
+class SimulationResult:
+    """
+    Per-day distribution statistics, each of shape (days + 1, stats);
+    row 0 is the starting state.
+    """
+    mean: np.ndarray
+    std: np.ndarray
+    p10: np.ndarray
+    p50: np.ndarray
+    p90: np.ndarray
+    final_stats: np.ndarray
+    turns: int
+    seconds: float
+
+    def summary(self, field: str) -> dict[str, np.ndarray]:
+        """The per-day series of one stat."""
+        i = FIELD_INDEX[field]
+        return {name: getattr(self, name)[:, i] for name in ("mean", "std", "p10", "p50", "p90")}
+
+
+def simulate(
+    games: int,
+    days: int,
+    corpus: EventCorpus,
+    policy: Policy = random_policy,
+    seed: int = 0,
+    stats: Optional[np.ndarray] = None,
+) -> SimulationResult:
+    """
+    Plays `games` games for `days` turns each.
+
+    Every day each game draws a random event from the corpus and the policy
+    picks one of its options.
+    """
+    rng = np.random.default_rng(seed)
+    stats = initial_stats(games) if stats is None else stats.astype(float, copy=True)
+    rows = np.arange(games)
+    quantiles = np.empty((days + 1, 3, len(STAT_FIELDS)))
+    mean = np.empty((days + 1, len(STAT_FIELDS)))
+    std = np.empty_like(mean)
+
+    def record(day):
+        mean[day] = stats.mean(axis=0)
+        std[day] = stats.std(axis=0)
+        quantiles[day] = np.percentile(stats, [10, 50, 90], axis=0)
+
+    start = time.perf_counter()
+    record(0)
+    for day in range(1, days + 1):
+        event_ids = rng.integers(len(corpus.impacts), size=games)
+        offered = corpus.impacts[event_ids]
+        mask = corpus.mask[event_ids]
+        choice = policy(stats, offered, mask, rng)
+        step_batch(stats, offered[rows, choice])
+        record(day)
+    seconds = time.perf_counter() - start
+
+    return SimulationResult(
+        mean=mean,
+        std=std,
+        p10=quantiles[:, 0],
+        p50=quantiles[:, 1],
+        p90=quantiles[:, 2],
+        final_stats=stats,
+        turns=games * days,
+        seconds=seconds,
+    )
+
+
+def _print_report(result: SimulationResult, every: int) -> None:
+    header = "day " + "".join(f"{field[:12]:>14}" for field in STAT_FIELDS)
+    print(header)
+    for day in range(0, len(result.mean), every):
+        print(f"{day:<4}" + "".join(f"{value:>14.1f}" for value in result.mean[day]))
+    print(
+        f"\n{result.turns:,} turns in {result.seconds:.2f}s "
+        f"({result.turns / result.seconds:,.0f} turns/s)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vectorized balance simulation (mean stats per day).")
+    parser.add_argument("--games", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=100)
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random")
+    parser.add_argument("--corpus", help="recorded events (JSON array or NDJSON); synthetic if omitted")
+    parser.add_argument("--mock", action="store_true", help="use the mock LLM event as the corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--every", type=int, default=10, help="print every N-th day")
+    args = parser.parse_args()
+
+    if args.corpus:
+        corpus = EventCorpus.from_file(args.corpus)
+    elif args.mock:
+        corpus = EventCorpus.from_mock()
+    else:
+        corpus = EventCorpus.synthetic(seed=args.seed)
+    _print_report(simulate(args.games, args.days, corpus, POLICIES[args.policy], args.seed), args.every)
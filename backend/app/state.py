@@ -0,0 +1,418 @@
+"""
+Pluggable key-value backends for state shared between worker processes.
+
+Game state lives in the database. What is left in process memory is
+derived, best-effort state: the generation cache and the event pool's
+record of which events a game has already seen. Under several uvicorn
+workers each process would otherwise keep its own copy, so a game served by
+two workers could see the same pooled event twice and every worker would pay
+for its own cache misses. Those structures keep a small in-process hot tier
+and put everything that must be consistent across processes in a
+`StateStore`:
+
+- "memory": a plain in-process store (single worker, tests).
+- "sqlite": a WAL-mode SQLite file shared by every process on the host.
+- "kv": a client for a networked key-value server. `python -m app.state`
+  runs a small in-memory server speaking the same protocol, as a local
+  stand-in for Redis or Memcached.
+
+The interface is deliberately tiny (strings and string sets with a TTL) so a
+real shared KV store can be dropped in behind it. The operations block; code
+on the event loop uses their `*_async` variants, which run them in a thread
+for the backends that do I/O.
+"""
+
+import abc
+import argparse
+import asyncio
+import json
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Sequence, Set, TypeVar
+
+from .settings import settings
+
+STATE_BACKEND = settings.state_backend
+STATE_PATH = settings.state_path
+STATE_KV_ADDRESS = settings.state_kv_address
+
+T = TypeVar("T")
+
+
+class StateStore(abc.ABC):
+    """String values and string sets under string keys, each with an optional TTL."""
+
+    @abc.abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        ...
+
+    @abc.abstractmethod
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        ...
+
+    @abc.abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abc.abstractmethod
+    def sadd(self, key: str, member: str, ttl: Optional[float] = None) -> bool:
+        """Add `member` to the set at `key`; True if it was not there yet."""
+
+    @abc.abstractmethod
+    def sadd_first(self, key: str, members: Sequence[str], ttl: Optional[float] = None) -> Optional[str]:
+        """Add the first of `members` not in the set at `key` yet and return it; None if all are."""
+
+    @abc.abstractmethod
+    def smembers(self, key: str) -> Set[str]:
+        ...
+
+    # Whether the operations do I/O, so the async variants run them in a thread.
+    blocking = True
+
+    async def _offload(self, operation: Callable[..., T], *args) -> T:
+        if not self.blocking:
+            return operation(*args)
+        return await asyncio.to_thread(operation, *args)
+
+    async def get_async(self, key: str) -> Optional[str]:
+        return await self._offload(self.get, key)
+
+    async def set_async(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        await self._offload(self.set, key, value, ttl)
+
+    async def sadd_async(self, key: str, member: str, ttl: Optional[float] = None) -> bool:
+        return await self._offload(self.sadd, key, member, ttl)
+
+    async def sadd_first_async(
+        self, key: str, members: Sequence[str], ttl: Optional[float] = None
+    ) -> Optional[str]:
+        return await self._offload(self.sadd_first, key, members, ttl)
+
+    async def smembers_async(self, key: str) -> Set[str]:
+        return await self._offload(self.smembers, key)
+
+
+def _expiry(ttl: Optional[float]) -> float:
+    return time.time() + ttl if ttl is not None else float("inf")
+
+
+class MemoryStore(StateStore):
+    """
+    In-process store; the least recently used keys are dropped beyond
+    `max_entries`.
+    """
+
+    blocking = False
+
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        # key -> (expires_at, str or set)
+        self._entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _live(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _put(self, key: str, value, ttl: Optional[float]) -> None:
+        self._entries[key] = (_expiry(ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._live(key)
+        return value if isinstance(value, str) else None
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._put(key, value, ttl)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def sadd(self, key: str, member: str, ttl: Optional[float] = None) -> bool:
+        with self._lock:
+            members = self._live(key)
+            if not isinstance(members, set):
+                members = set()
+            if member in members:
+                return False
+            members.add(member)
+            self._put(key, members, ttl)
+            return True
+
+    def sadd_first(self, key: str, members: Sequence[str], ttl: Optional[float] = None) -> Optional[str]:
+        with self._lock:
+            existing = self._live(key)
+            if not isinstance(existing, set):
+                existing = set()
+            for member in members:
+                if member not in existing:
+                    existing.add(member)
+                    self._put(key, existing, ttl)
+                    return member
+            return None
+
+    def smembers(self, key: str) -> Set[str]:
+        with self._lock:
+            members = self._live(key)
+        return set(members) if isinstance(members, set) else set()
+
+
+class SQLiteStore(StateStore):
+    """
+    Store in a WAL-mode SQLite file, shared by all processes on one host.
+
+    Expired rows are skipped on read and deleted by a write at most every
+    `purge_interval` seconds.
+    """
+
+    def __init__(self, path: str = STATE_PATH, purge_interval: float = 60.0):
+        self.path = path
+        self.purge_interval = purge_interval
+        self._next_purge = 0.0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.execute("PRAGMA busy_timeout = 5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv_sets "
+            "(key TEXT NOT NULL, member TEXT NOT NULL, expires_at REAL NOT NULL, "
+            "PRIMARY KEY (key, member)) WITHOUT ROWID"
+        )
+        for table in ("kv", "kv_sets"):
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_expires_at ON {table} (expires_at)")
+        self._lock = threading.Lock()
+
+    def _purge(self, now: float) -> None:
+        """Deletes expired rows if the last purge is `purge_interval` old (under the lock)."""
+        if now < self._next_purge:
+            return
+        self._next_purge = now + self.purge_interval
+        self._conn.execute("DELETE FROM kv WHERE expires_at <= ?", (now,))
+        self._conn.execute("DELETE FROM kv_sets WHERE expires_at <= ?", (now,))
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM kv WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._purge(time.time())
+            self._conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, _expiry(ttl)),
+            )
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+            self._conn.execute("DELETE FROM kv_sets WHERE key = ?", (key,))
+
+    _SADD = (
+        "INSERT INTO kv_sets (key, member, expires_at) VALUES (?, ?, ?) "
+        "ON CONFLICT (key, member) DO UPDATE SET expires_at = excluded.expires_at "
+        "WHERE kv_sets.expires_at <= ?"
+    )
+
+    def sadd(self, key: str, member: str, ttl: Optional[float] = None) -> bool:
+        now = time.time()
+        with self._lock:
+            self._purge(now)
+            return self._conn.execute(self._SADD, (key, member, _expiry(ttl), now)).rowcount > 0
+
+    def sadd_first(self, key: str, members: Sequence[str], ttl: Optional[float] = None) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            self._purge(now)
+            existing = self._members(key, now)
+            for member in members:
+                # Another process may have added it since the read: try the next one.
+                if member not in existing and self._conn.execute(
+                    self._SADD, (key, member, _expiry(ttl), now)
+                ).rowcount > 0:
+                    return member
+            return None
+
+    def smembers(self, key: str) -> Set[str]:
+        with self._lock:
+            return self._members(key, time.time())
+
+    def _members(self, key: str, now: float) -> Set[str]:
+        rows = self._conn.execute(
+            "SELECT member FROM kv_sets WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchall()
+        return {row[0] for row in rows}
+
+
+class KVClientStore(StateStore):
+    """
+    Client for the KV server (`python -m app.state`): one JSON array per line
+    in each direction, over a persistent TCP connection.
+    """
+
+    def __init__(self, address: str = STATE_KV_ADDRESS, timeout: float = 1.0):
+        host, port = address.rsplit(":", 1)
+        self._address = (host, int(port))
+        self._timeout = timeout
+        self._sock = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def _call(self, *command):
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._sock = socket.create_connection(self._address, timeout=self._timeout)
+                        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                        self._reader = self._sock.makefile("rb")
+                    self._sock.sendall(json.dumps(command).encode() + b"\n")
+                    line = self._reader.readline()
+                    if not line:
+                        raise ConnectionError("KV server closed the connection")
+                    reply = json.loads(line)
+                    break
+                except OSError:
+                    self._close()
+                    if attempt:
+                        raise
+        if isinstance(reply, dict):
+            raise KVCommandError(reply["error"])
+        return reply
+
+    def _close(self) -> None:
+        if self._sock is not None:
+            self._sock.close()
+        self._sock = self._reader = None
+
+    def get(self, key: str) -> Optional[str]:
+        return self._call("get", key)
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        self._call("set", key, value, ttl)
+
+    def delete(self, key: str) -> None:
+        self._call("delete", key)
+
+    def sadd(self, key: str, member: str, ttl: Optional[float] = None) -> bool:
+        return self._call("sadd", key, member, ttl)
+
+    def sadd_first(self, key: str, members: Sequence[str], ttl: Optional[float] = None) -> Optional[str]:
+        return self._call("sadd_first", key, list(members), ttl)
+
+    def smembers(self, key: str) -> Set[str]:
+        return set(self._call("smembers", key))
+
+
+# The operations the KV server runs; anything else is an error reply.
+KV_COMMANDS = ("get", "set", "delete", "sadd", "sadd_first", "smembers")
+
+
+class KVCommandError(Exception):
+    """The KV server rejected a command (unknown name or bad arguments)."""
+
+
+async def serve_kv(host: str, port: int, store: Optional[MemoryStore] = None) -> asyncio.AbstractServer:
+    """
+    Starts a KV server backed by a `MemoryStore`; returns the asyncio server.
+
+    Each request line is a JSON array `[command, *args]` with a command from
+    `KV_COMMANDS`; the reply is the JSON result, or `{"error": ...}` for a
+    request that cannot be run.
+    """
+    store = store or MemoryStore()
+
+    def run(line: bytes):
+        try:
+            command = json.loads(line)
+        except ValueError:
+            command = None
+        if not isinstance(command, list) or not command:
+            return {"error": "expected a JSON array [command, *args]"}
+        name, *args = command
+        if name not in KV_COMMANDS:
+            return {"error": f"unknown command {name!r}"}
+        try:
+            result = getattr(store, name)(*args)
+        except (TypeError, ValueError) as e:
+            return {"error": f"bad arguments for {name}: {e}"}
+        return sorted(result) if isinstance(result, set) else result
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while line := await reader.readline():
+                writer.write(json.dumps(run(line)).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+def create_store(backend: str = STATE_BACKEND) -> StateStore:
+    """The store selected by `STATE_BACKEND`."""
+    if backend == "memory":
+        return MemoryStore()
+    if backend == "sqlite":
+        return SQLiteStore(STATE_PATH)
+    if backend == "kv":
+        return KVClientStore(STATE_KV_ADDRESS)
+    raise ValueError(f"Unknown STATE_BACKEND {backend!r}, expected memory, sqlite or kv")
+
+
+# Shared by the generation cache and the event pool. Built on first use, so
+# importing the app opens no state file or KV connection.
+_shared_store: Optional[StateStore] = None
+_shared_store_lock = threading.Lock()
+
+
+def get_shared_store() -> StateStore:
+    """The store shared by the generation cache and the event pool, created on first call."""
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = create_store()
+        return _shared_store
+
+
+def __getattr__(name: str):
+    if name == "shared_store":
+        return get_shared_store()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+async def _serve_forever(host: str, port: int) -> None:
+    server = await serve_kv(host, port)
+    print(f"KV server listening on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for a shared KV store.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(STATE_KV_ADDRESS.rsplit(":", 1)[1]))
+    args = parser.parse_args()
+    asyncio.run(_serve_forever(args.host, args.port))
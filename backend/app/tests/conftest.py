@@ -0,0 +1,89 @@
+import os
+
+# The app's own engine (used by the lifespan schema check) stays in memory;
+# the tests' sessions come from the fixtures below.
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import init_db
+from app.main import app, get_db, get_read_db
+from app.models import Finances, Game, StaticProperties, Stats
+
+
+@pytest.fixture
+def db_engine():
+    """A fresh in-memory database with all tables created."""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    init_db.init_db(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def client(db_engine):
+    """A TestClient backed by the in-memory database."""
+    TestingSession = sessionmaker(autocommit=False, autoflush=False, bind=db_engine)
+
+    def override_get_db():
+        db = TestingSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def new_game() -> dict:
+    """The body of a `POST /game` request."""
+    return {"age": 16, "gender": "female", "character_name": "Alice", "work": False}
+
+
+@pytest.fixture
+def play(client, new_game):
+    """
+    `play(turns, option=0, game=None)` starts a game (or continues `game`, a
+    (game_id, event) pair) and makes `turns` choices of `option`; returns
+    the (game_id, event) pair to continue from.
+    """
+    def play(turns: int, option: int = 0, game=None) -> tuple[int, dict]:
+        if game is None:
+            started = client.post("/game", json=new_game).json()
+            game = int(started["game_state"]["game_id"]), started["event"]
+        game_id, event = game
+        for _ in range(turns):
+            event = client.post(
+                f"/game/{game_id}/choice", json={"event_id": event["event_id"], "option_index": option}
+            ).json()["event"]
+        return game_id, event
+
+    return play
+
+
+@pytest.fixture
+def game_state() -> Game:
+    """An in-memory game on day 3 with the default stats."""
+    return Game(
+        user_id=1,
+        game_id="7",
+        day=3,
+        static_properties=StaticProperties(
+            character_name="Alice", gender="female", age=16, work=False
+        ),
+        stats=Stats(),
+        finances=Finances(),
+    )
@@ -0,0 +1,116 @@
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import aggregates, history, init_db, main
+from app.llm.validation import EventValidationError
+
+
+def _tables(db) -> tuple[list, list]:
+    cohorts = [
+        (row.number_of_day, row.players, *(getattr(row, f"sum_{field}") for field in history.STAT_FIELDS))
+        for row in db.query(init_db.DayCohort).order_by(init_db.DayCohort.number_of_day)
+    ]
+    summaries = [
+        (row.game_id, row.final_day, row.reputation, row.money, row.max_money, row.min_health)
+        for row in db.query(init_db.GameSummary).order_by(init_db.GameSummary.game_id)
+    ]
+    return cohorts, summaries
+
+
+@pytest.mark.parametrize("mode", ["snapshot", "delta"])
+def test_aggregates_match_the_day_history(client, play, db_engine, monkeypatch, mode):
+    monkeypatch.setattr(history, "DAY_STORAGE_MODE", mode)
+    monkeypatch.setattr(history, "DAY_CHECKPOINT_INTERVAL", 3)
+    game_ids = [play(turns, option)[0] for turns, option in ((6, 0), (2, 1), (4, 1))]
+    with sessionmaker(bind=db_engine)() as db:
+        timelines = {game_id: history.get_stat_timeline(db, game_id) for game_id in game_ids}
+
+    for game_id, timeline in timelines.items():
+        assert client.get(f"/game/{game_id}/summary").json() == {
+            "game_id": str(game_id),
+            "final_day": timeline["day"][-1],
+            "reputation": timeline["reputation"][-1],
+            "money": timeline["money"][-1],
+            "max_money": max(timeline["money"]),
+            "min_health": min(timeline["health"]),
+        }
+
+    page = client.get("/stats/days", params={"after": 1, "limit": 3}).json()
+    assert [day["day"] for day in page["days"]] == [2, 3, 4] and page["next_after"] == 4
+    day_3 = [timeline["money"][2] for timeline in timelines.values()]
+    assert page["days"][1]["players"] == 3
+    assert page["days"][1]["mean"]["money"] == pytest.approx(sum(day_3) / 3)
+    assert client.get("/stats/days", params={"after": 6}).json() == {
+        "days": [{"day": 7, "players": 1, "mean": {
+            field: pytest.approx(timelines[game_ids[0]][field][-1]) for field in history.STAT_FIELDS
+        }}],
+        "next_after": None,
+    }
+
+    board = client.get("/leaderboard/final_day", params={"k": 2}).json()
+    assert [(entry["game_id"], entry["value"]) for entry in board["entries"]] == [
+        (str(game_ids[0]), 7), (str(game_ids[2]), 5),
+    ]
+    assert client.get("/leaderboard/health").status_code == 422
+    assert client.get("/game/999/summary").status_code == 404
+
+
+def test_rebuild_reproduces_the_maintained_tables(play, db_engine):
+    for turns in (5, 0, 3):
+        play(turns, option=1)
+    with sessionmaker(bind=db_engine)() as db:
+        maintained = _tables(db)
+        aggregates.rebuild(db)
+        rebuilt = _tables(db)
+    assert rebuilt[1] == maintained[1]
+    assert [row[:2] for row in rebuilt[0]] == [row[:2] for row in maintained[0]]
+    for rebuilt_row, maintained_row in zip(rebuilt[0], maintained[0]):
+        assert rebuilt_row[2:] == pytest.approx(maintained_row[2:])
+
+
+def test_rebuild_counts_the_current_day_of_games_from_before_the_ledger(client, play, db_engine):
+    game_id, _ = play(2)
+    Session = sessionmaker(bind=db_engine)
+    with Session() as db:
+        # A game played before the ledger existed: no event was ever issued.
+        db.query(init_db.IssuedEvent).filter_by(game_id=game_id).delete()
+        aggregates.rebuild(db)
+        db.commit()
+    assert client.get(f"/game/{game_id}/summary").json()["final_day"] == 3
+
+    assert client.post(f"/game/{game_id}/choice", json={"impact": {"money": 5}}).status_code == 200
+    assert client.get(f"/game/{game_id}/summary").json()["final_day"] == 4
+    days = client.get("/stats/days").json()["days"]
+    assert [(day["day"], day["players"]) for day in days] == [(1, 1), (2, 1), (3, 1), (4, 1)]
+
+
+def test_a_reverted_day_is_not_counted(client, new_game, monkeypatch):
+    monkeypatch.setattr(main, "PREFETCH_ENABLED", False)
+    monkeypatch.setattr(main, "EVENT_POOL_ENABLED", False)
+    started = client.post("/game", json=new_game).json()
+    game_id = started["game_state"]["game_id"]
+
+    async def invalid(game_state, impact):
+        raise EventValidationError("no valid event")
+
+    monkeypatch.setattr(main, "next_event_for", invalid)
+    choice = {"event_id": started["event"]["event_id"], "option_index": 0}
+    assert client.post(f"/game/{game_id}/choice", json=choice).status_code == 502
+    assert client.get(f"/game/{game_id}/summary").json()["final_day"] == 1
+    assert [day["day"] for day in client.get("/stats/days").json()["days"]] == [1]
+
+
+def test_leaderboard_ranks_this_weeks_games_by_default(client, play, db_engine):
+    idle, active = play(3)[0], play(1)[0]
+    with sessionmaker(bind=db_engine)() as db:
+        summary = db.get(init_db.GameSummary, idle)
+        summary.played_at -= aggregates.LEADERBOARD_WINDOW + 1
+        db.commit()
+
+    def ranked(**params):
+        board = client.get("/leaderboard/final_day", params=params).json()
+        return board["window"], [entry["game_id"] for entry in board["entries"]]
+
+    assert ranked() == ("week", [str(active)])
+    assert ranked(window="all") == ("all", [str(idle), str(active)])
+    assert client.get("/leaderboard/final_day", params={"window": "month"}).status_code == 422
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app import init_db, main
+from app.llm.validation import EventValidationError
+from app.main import app, get_async_db, get_async_read_db, get_db, get_read_db
+
+
+@pytest.fixture
+def async_client(tmp_path):
+    """A TestClient whose sync and async sessions share one SQLite file."""
+    url = f"sqlite:///{tmp_path / 'async.sqlite'}"
+    engine = init_db.create_db_engine(url)
+    init_db.init_db(engine)
+    async_engine = init_db.create_async_db_engine(url)
+    sessions = sessionmaker(autoflush=False, bind=engine)
+    async_sessions = async_sessionmaker(autoflush=False, bind=async_engine)
+
+    def override_get_db():
+        db = sessions()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_get_async_db():
+        async with async_sessions() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_async_read_db] = override_get_async_db
+    with TestClient(app) as test_client:
+        yield test_client
+        # aiosqlite connections belong to the client's event loop.
+        test_client.portal.call(async_engine.dispose)
+    app.dependency_overrides.clear()
+    engine.dispose()
+
+
+def _choose(client, game_id, event, option=0):
+    return client.post(
+        f"/async/game/{game_id}/choice", json={"event_id": event["event_id"], "option_index": option}
+    )
+
+
+def test_async_endpoints_play_the_same_game_as_the_sync_ones(async_client, new_game):
+    started = async_client.post("/async/game", json=new_game)
+    assert started.status_code == 200
+    game_id, event = started.json()["game_state"]["game_id"], started.json()["event"]
+
+    for _ in range(3):
+        response = _choose(async_client, game_id, event)
+        assert response.status_code == 200
+        event = response.json()["event"]
+
+    state = async_client.get(f"/async/game/{game_id}").json()
+    assert state["day"] == 4
+    assert async_client.get(f"/game/{game_id}").json() == state
+
+
+def test_replays_and_conflicts_on_async_sessions(async_client, new_game):
+    started = async_client.post("/async/game", json=new_game).json()
+    game_id, event = started["game_state"]["game_id"], started["event"]
+
+    first = _choose(async_client, game_id, event)
+    assert _choose(async_client, game_id, event).json() == first.json()
+    assert _choose(async_client, game_id, event, option=1).status_code == 409
+    assert async_client.get("/async/game/999").status_code == 404
+
+
+def test_failed_generation_rolls_back_the_async_turn(async_client, new_game, monkeypatch):
+    started = async_client.post("/async/game", json=new_game).json()
+    game_id = started["game_state"]["game_id"]
+
+    async def invalid(game_state, impact):
+        raise EventValidationError("no valid event")
+
+    monkeypatch.setattr(main, "next_event_for", invalid)
+    assert _choose(async_client, game_id, started["event"]).status_code == 502
+    assert async_client.get(f"/async/game/{game_id}").json()["day"] == 1
+
+
+def test_async_engine_applies_the_profile_pragmas(tmp_path):
+    async def pragmas():
+        engine = init_db.create_async_db_engine(f"sqlite:///{tmp_path / 'wal.sqlite'}", "production")
+        try:
+            async with engine.connect() as conn:
+                return [
+                    (await conn.execute(text(f"PRAGMA {name}"))).scalar()
+                    for name in ("journal_mode", "busy_timeout")
+                ]
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(pragmas()) == ["wal", 5000]
@@ -0,0 +1,45 @@
+import asyncio
+import time
+
+from app.llm import gemini_client
+from app.llm.event_generator import generate_event_async
+from app.models import Event
+
+
+def test_mock_event_matches_event_schema(game_state):
+    event = asyncio.run(generate_event_async(game_state))
+    assert Event.model_validate(event).options
+
+
+def test_async_generation_overlaps_up_to_concurrency_limit(monkeypatch):
+    monkeypatch.setattr(gemini_client, "MOCK_LATENCY_MS", 50)
+    monkeypatch.setattr(gemini_client, "MAX_CONCURRENCY", 4)
+    gemini_client._semaphores.clear()
+
+    async def run_batch(n):
+        start = time.perf_counter()
+        await asyncio.gather(*(gemini_client.generate_response_async("p") for _ in range(n)))
+        return time.perf_counter() - start
+
+    # 8 calls with a limit of 4 take two rounds, not eight.
+    elapsed = asyncio.run(run_batch(8))
+    assert 0.1 <= elapsed < 0.3
+
+
+def test_start_game_and_choice_endpoints(client, new_game):
+    response = client.post("/game", json=new_game)
+    assert response.status_code == 200
+    body = response.json()
+    game_id = body["game_state"]["game_id"]
+    impact = body["event"]["options"][0]["impact"]
+
+    response = client.post(f"/game/{game_id}/choice", json={"impact": impact})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["game_state"]["day"] == 2
+    assert body["game_state"]["stats"]["happiness"] == 53
+
+
+def test_choice_for_unknown_game_returns_404(client):
+    response = client.post("/game/999/choice", json={"impact": {}})
+    assert response.status_code == 404
@@ -0,0 +1,84 @@
+import asyncio
+
+from app.llm import gemini_client
+from app.llm.batching import BatchScheduler
+from app.llm.event_pool import default_start_state
+from app.llm.gemini_client import _get_mock_event
+
+
+def _states(n):
+    return [default_start_state(False).model_copy(update={"day": day}) for day in range(1, n + 1)]
+
+
+def _run(scheduler, states):
+    async def main():
+        return await asyncio.gather(*(scheduler.submit(state) for state in states))
+    return asyncio.run(main())
+
+
+def test_concurrent_requests_share_one_batched_call():
+    prompts = []
+
+    async def generate(prompt):
+        prompts.append(prompt)
+        return await gemini_client.generate_response_async(prompt)
+
+    scheduler = BatchScheduler(generate=generate, window=0.01, max_size=8)
+    events = _run(scheduler, _states(5))
+
+    assert len(prompts) == 1
+    assert "Number of events: 5" in prompts[0]
+    assert all(f"Player {i}:\nDay: {i}\n" in prompts[0] for i in range(1, 6))
+    assert len(events) == 5 and all(len(event["options"]) == 3 for event in events)
+    assert scheduler.stats()["mean_batch_size"] == 5
+
+
+def test_full_batches_are_sent_without_waiting_for_the_window():
+    calls = []
+
+    async def generate(prompt):
+        calls.append(prompt)
+        return [_get_mock_event() for _ in range(3)]
+
+    scheduler = BatchScheduler(generate=generate, window=60, max_size=3)
+    events = _run(scheduler, _states(3))
+
+    assert len(calls) == 1 and len(events) == 3
+
+
+def test_invalid_or_missing_elements_fall_back_to_single_calls():
+    singles = []
+
+    async def generate(prompt):
+        return [{"description": "broken"}, _get_mock_event()]  # 1 invalid, 1 missing
+
+    async def single(state):
+        singles.append(state.day)
+        return {**_get_mock_event(), "description": f"single {state.day}"}
+
+    scheduler = BatchScheduler(generate=generate, window=0.01, max_size=8, single=single)
+    events = _run(scheduler, _states(3))
+
+    assert sorted(singles) == [1, 3]
+    assert [event["description"].startswith("single") for event in events] == [True, False, True]
+    assert scheduler.stats()["fallbacks"] == 2
+
+
+def test_failed_batch_call_falls_back_and_propagates_single_errors():
+    async def generate(prompt):
+        raise RuntimeError("upstream down")
+
+    async def single(state):
+        if state.day == 2:
+            raise RuntimeError("still down")
+        return _get_mock_event()
+
+    scheduler = BatchScheduler(generate=generate, window=0.01, max_size=8, single=single)
+
+    async def main():
+        return await asyncio.gather(
+            *(scheduler.submit(state) for state in _states(2)), return_exceptions=True
+        )
+
+    first, second = asyncio.run(main())
+    assert first["options"] and isinstance(second, RuntimeError)
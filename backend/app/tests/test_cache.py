@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+import pytest
+
+from app.llm.cache import GenerationCache, prompt_fingerprint
+
+EVENT = {"event_id": 1, "description": "Cached", "options": []}
+
+
+def test_fingerprint_ignores_event_id_only():
+    assert prompt_fingerprint('{"event_id": 1700000000, "day": 1}') == \
+        prompt_fingerprint('{"event_id": 1700000042, "day": 1}')
+    assert prompt_fingerprint('{"event_id": 1, "day": 1}') != \
+        prompt_fingerprint('{"event_id": 1, "day": 2}')
+
+
+def test_lru_and_ttl_eviction(monkeypatch):
+    cache = GenerationCache(max_entries=2, ttl=10)
+
+    async def scenario():
+        await cache.put("a", EVENT)
+        await cache.put("b", EVENT)
+        await cache.get("a")
+        await cache.put("c", EVENT)
+        assert await cache.get("b") is None
+        assert await cache.get("a") == EVENT
+
+        now = time.time()
+        monkeypatch.setattr("app.llm.cache.time.time", lambda: now + 11)
+        assert await cache.get("a") is None
+
+    asyncio.run(scenario())
+    assert cache.stats()["entries"] == 1  # "c" is expired but not looked up yet
+    assert cache.stats()["bytes"] > 0
+
+
+def test_disk_tier_survives_a_new_cache(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    asyncio.run(GenerationCache(path=path).put("k", EVENT))
+    assert asyncio.run(GenerationCache(path=path).get("k")) == EVENT
+
+
+def test_concurrent_identical_requests_share_one_call():
+    calls = 0
+
+    async def generate():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return EVENT
+
+    async def scenario():
+        cache = GenerationCache()
+        results = await asyncio.gather(*(cache.get_or_generate("k", generate) for _ in range(10)))
+        assert await cache.get_or_generate("k", generate) == EVENT
+        return cache, results
+
+    cache, results = asyncio.run(scenario())
+    assert calls == 1
+    assert results == [EVENT] * 10
+    assert cache.stats() | {"bytes": 0} == {
+        "hits": 1, "misses": 1, "coalesced": 9, "hit_ratio": 10 / 11, "entries": 1, "bytes": 0,
+    }
+
+
+def test_failures_are_not_cached():
+    async def broken():
+        raise RuntimeError("upstream down")
+
+    async def scenario():
+        cache = GenerationCache()
+        with pytest.raises(RuntimeError):
+            await cache.get_or_generate("k", broken)
+        return await cache.get("k")
+
+    assert asyncio.run(scenario()) is None
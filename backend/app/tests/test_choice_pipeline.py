@@ -0,0 +1,160 @@
+import threading
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app import init_db, main
+from app.llm import event_generator, gemini_client
+from app.llm.fake_llm import FakeLLMError
+from app.llm.validation import EventValidationError
+from app.main import apply_choice, create_game
+from app.models import Impact, StartGameRequest
+
+
+def _start(session):
+    return create_game(
+        session,
+        StartGameRequest(age=16, gender="female", character_name="Alice", work=False),
+    )
+
+
+def test_apply_choice_is_one_read_one_write_one_commit(db_engine):
+    session = sessionmaker(bind=db_engine)()
+    game_id = _start(session).game_id
+    session.expunge_all()
+
+    statements, commits = [], []
+    event.listen(db_engine, "before_cursor_execute",
+                 lambda conn, cursor, sql, *args: statements.append(sql.split()[0]))
+    event.listen(db_engine, "commit", lambda conn: commits.append(1))
+
+    game_state = apply_choice(session, game_id, Impact(health=-30, money=12.5))
+
+    # The read, then the current-day pointer and the new Day.
+    assert sorted(statements) == ["INSERT", "SELECT", "UPDATE"]
+    assert statements[0] == "SELECT"
+    assert len(commits) == 1
+    assert game_state.day == 2
+    assert game_state.stats.health == 70
+    assert game_state.stats.money == 62.5
+
+
+def test_apply_choice_keeps_previous_day_unchanged(db_engine):
+    session = sessionmaker(bind=db_engine)()
+    game_id = _start(session).game_id
+    apply_choice(session, game_id, Impact(happiness=20))
+
+    days = session.query(init_db.Day).order_by(init_db.Day.number_of_day).all()
+    assert [(d.number_of_day, d.happiness) for d in days] == [(1, 50), (2, 70)]
+
+
+@pytest.fixture
+def no_speculation(monkeypatch):
+    monkeypatch.setattr(main, "PREFETCH_ENABLED", False)
+    monkeypatch.setattr(main, "EVENT_POOL_ENABLED", False)
+
+
+def _choose(client, game_id, event):
+    return client.post(f"/game/{game_id}/choice", json={"event_id": event["event_id"], "option_index": 0})
+
+
+def test_next_event_is_generated_while_the_day_is_committed(no_speculation, client, new_game, monkeypatch):
+    started = client.post("/game", json=new_game).json()
+    generating = threading.Event()
+    overlapped = []
+    commit_turn, next_event_for = main.commit_turn, main.next_event_for
+
+    def slow_commit(db):
+        # Only returns early if the generation started in the meantime.
+        overlapped.append(generating.wait(timeout=5))
+        commit_turn(db)
+
+    async def generate(game_state, impact):
+        generating.set()
+        return await next_event_for(game_state, impact)
+
+    monkeypatch.setattr(main, "commit_turn", slow_commit)
+    monkeypatch.setattr(main, "next_event_for", generate)
+    response = _choose(client, started["game_state"]["game_id"], started["event"])
+
+    assert response.status_code == 200 and response.json()["game_state"]["day"] == 2
+    assert overlapped[0] is True  # the day commit (finish_turn commits again)
+
+
+def test_failed_generation_reverts_the_committed_day(no_speculation, client, new_game, db_engine, monkeypatch):
+    started = client.post("/game", json=new_game).json()
+    game_id = started["game_state"]["game_id"]
+    next_event_for = main.next_event_for
+
+    async def invalid(game_state, impact):
+        raise EventValidationError("no valid event")
+
+    monkeypatch.setattr(main, "next_event_for", invalid)
+    assert _choose(client, game_id, started["event"]).status_code == 502
+
+    session = sessionmaker(bind=db_engine)()
+    assert [day.number_of_day for day in session.query(init_db.Day)] == [1]
+    assert session.get(init_db.IssuedEvent, started["event"]["event_id"]).chosen_option is None
+    assert client.get(f"/game/{game_id}").json()["day"] == 1
+
+    monkeypatch.setattr(main, "next_event_for", next_event_for)
+    assert _choose(client, game_id, started["event"]).json()["game_state"]["day"] == 2
+
+
+def test_resubmitting_completes_a_turn_whose_event_was_never_issued(no_speculation, client, new_game, monkeypatch):
+    started = client.post("/game", json=new_game).json()
+    game_id = started["game_state"]["game_id"]
+    finish_turn = main.finish_turn
+
+    def crash(db, game_state, event):
+        raise RuntimeError("worker died")
+
+    monkeypatch.setattr(main, "finish_turn", crash)
+    with pytest.raises(RuntimeError):
+        _choose(client, game_id, started["event"])
+    assert client.get(f"/game/{game_id}").json()["day"] == 2
+
+    monkeypatch.setattr(main, "finish_turn", finish_turn)
+    resumed = _choose(client, game_id, started["event"])
+    assert resumed.status_code == 200 and resumed.json()["game_state"]["day"] == 2
+    assert _choose(client, game_id, started["event"]).json() == resumed.json()
+    assert _choose(client, game_id, resumed.json()["event"]).json()["game_state"]["day"] == 3
+
+
+def test_failed_first_event_deletes_the_created_game(no_speculation, client, new_game, db_engine, monkeypatch):
+    async def invalid(game_state):
+        raise EventValidationError("no valid event")
+
+    monkeypatch.setattr(main, "generate_or_degrade", invalid)
+    assert client.post("/game", json=new_game).status_code == 502
+
+    session = sessionmaker(bind=db_engine)()
+    assert session.query(init_db.Game).count() == 0 and session.query(init_db.User).count() == 0
+
+
+def test_upstream_errors_clean_up_and_answer_502(no_speculation, client, new_game, db_engine, monkeypatch):
+    monkeypatch.setattr(event_generator, "EVENT_POOL_ENABLED", False)
+    monkeypatch.setattr(event_generator, "LLM_CACHE_ENABLED", False)
+    started = client.post("/game", json=new_game).json()
+    game_id = started["game_state"]["game_id"]
+
+    async def forbidden(prompt):
+        raise FakeLLMError("API key not valid", code=403)
+
+    async def forbidden_stream(game_state):
+        raise FakeLLMError("API key not valid", code=403)
+        yield
+
+    # Not retryable, so the gateway passes it through unchanged.
+    monkeypatch.setattr(gemini_client, "_mock_backend", forbidden)
+    monkeypatch.setattr(main, "stream_event", forbidden_stream)
+    assert _choose(client, game_id, started["event"]).status_code == 502
+    assert client.post("/game", json=new_game).status_code == 502
+    streamed = client.post(f"/game/{game_id}/choice/stream", json={"impact": {}}).text
+    assert streamed.startswith("event: state") and "event: error" in streamed
+
+    with sessionmaker(bind=db_engine)() as session:
+        assert session.query(init_db.Game).count() == 1
+        assert session.query(init_db.IssuedEvent).count() == 1
+    assert client.get(f"/game/{game_id}").json()["day"] == 1
@@ -0,0 +1,69 @@
+import asyncio
+
+from app.llm.event_pool import EventPool, bucket_for, default_start_state
+from app.models import Stats
+
+
+def _event(n: int) -> dict:
+    return {
+        "event_id": n,
+        "description": f"Event number {n}",
+        "options": [{"description": "Ok", "impact": {"happiness": 1}}],
+    }
+
+
+def _state(game_id: str, **stats):
+    return default_start_state(False).model_copy(
+        update={"game_id": game_id, "stats": Stats(**stats)}
+    )
+
+
+def test_close_states_share_a_bucket():
+    assert bucket_for(_state("a", health=90)) == bucket_for(_state("b", health=80))
+    assert bucket_for(_state("a", health=90)) != bucket_for(_state("b", health=20))
+    assert bucket_for(_state("a", money=50)) != bucket_for(_state("a", money=-10))
+
+
+def test_draw_never_repeats_an_event_within_a_game():
+    pool = EventPool()
+    pool.add(_state("x"), _event(1))
+    pool.add(_state("x"), _event(2))
+
+    first = asyncio.run(pool.draw(_state("a")))
+    second = asyncio.run(pool.draw(_state("a")))
+    assert {first["description"], second["description"]} == {"Event number 1", "Event number 2"}
+    assert asyncio.run(pool.draw(_state("a"))) is None
+    assert asyncio.run(pool.draw(_state("b"))) is not None
+
+
+def test_unmarked_draws_leave_the_event_unseen_until_it_is_served():
+    pool = EventPool()
+    pool.add(_state("x"), _event(1))
+
+    async def scenario():
+        peeked = await pool.draw(_state("a"), mark=False)
+        assert await pool.draw(_state("a"), mark=False) == peeked
+        await pool.mark_served("a", peeked)
+        assert await pool.draw(_state("a"), mark=False) is None
+        assert await pool.draw(_state("a")) is None
+
+    asyncio.run(scenario())
+
+
+def test_invalid_events_are_rejected():
+    pool = EventPool()
+    assert not pool.add(_state("x"), {"description": "no options"})
+    assert pool.stats()["events"] == 0
+
+
+def test_fill_once_tops_buckets_up_to_low_water():
+    counter = iter(range(100))
+
+    async def generate(game_state):
+        return _event(next(counter))
+
+    pool = EventPool(generate=generate, low_water=3)
+    pool.seed(_state("a"))
+    assert asyncio.run(pool.fill_once()) == 3
+    assert asyncio.run(pool.fill_once()) == 0
+    assert pool.stats()["buckets_below_low_water"] == 0
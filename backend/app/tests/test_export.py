@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import export, history, init_db, main
+
+
+def _load(out_dir, kind: str) -> dict:
+    """Concatenates the columns of every `kind` chunk of a run."""
+    parts = [np.load(path) for path in sorted(out_dir.glob(f"{kind}-*.npz"))]
+    return {name: np.concatenate([part[name] for part in parts]) for name in parts[0].files}
+
+
+@pytest.mark.parametrize("mode", ["snapshot", "delta"])
+def test_export_writes_every_day_as_the_api_sees_it(play, db_engine, tmp_path, monkeypatch, mode):
+    monkeypatch.setattr(history, "DAY_STORAGE_MODE", mode)
+    monkeypatch.setattr(history, "DAY_CHECKPOINT_INTERVAL", 3)
+    game_ids = [play(turns)[0] for turns in (7, 0, 4)]
+    sessions = sessionmaker(bind=db_engine)
+
+    manifest = export.export(tmp_path, sessions=sessions, chunk_games=2)
+    assert manifest["games"] == 3 and manifest["days"] == 8 + 1 + 5
+    assert len(manifest["files"]) == 4
+
+    games, days = _load(tmp_path, "games"), _load(tmp_path, "days")
+    assert games["id"].tolist() == game_ids
+    assert games["character_name"].tolist() == ["Alice"] * 3
+    with sessions() as db:
+        for game_id in game_ids:
+            rows = days["game_id"] == game_id
+            timeline = history.get_stat_timeline(db, game_id)
+            assert {name: days[name][rows].tolist() for name in timeline} == timeline
+
+
+def test_incremental_export_writes_only_new_final_days(play, db_engine, tmp_path):
+    sessions = sessionmaker(bind=db_engine)
+    first, second = play(2), play(1)
+    export.export(tmp_path / "first", sessions=sessions)
+    since = export.load_watermark(tmp_path / "first" / "watermark.npz")
+    assert since == {first[0]: 3, second[0]: 2}
+
+    play(2, game=first)
+    third_id, _ = play(0)
+    with sessions() as db:
+        # Day 1 of the third game has no issued event yet, so it is not final.
+        db.query(init_db.IssuedEvent).filter_by(game_id=third_id).delete()
+        db.commit()
+
+    manifest = export.export(tmp_path / "second", since=since, sessions=sessions)
+    assert manifest["games"] == 1 and manifest["days"] == 2
+    assert _load(tmp_path / "second", "days")["day"].tolist() == [4, 5]
+    assert export.load_watermark(tmp_path / "second" / "watermark.npz") == {first[0]: 5, second[0]: 2}
+
+
+def test_admin_export_endpoint(client, play, tmp_path, monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_DIR", str(tmp_path))
+    play(1)
+    assert client.post("/admin/export").status_code == 404
+
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    assert client.post("/admin/export", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    first = client.post("/admin/export", headers={"X-Admin-Token": "secret"}).json()
+    assert first["since"] is None and first["days"] == 2
+    play(0)
+    second = client.post("/admin/export", headers={"X-Admin-Token": "secret"}).json()
+    assert second["since"] == first["run"] and second["days"] == 1
+    full = client.post("/admin/export", params={"full": True}, headers={"X-Admin-Token": "secret"}).json()
+    assert full["since"] is None and full["days"] == 3
@@ -0,0 +1,205 @@
+import asyncio
+
+import pytest
+from google import genai
+from google.genai import types
+
+from app import main
+from app.llm import event_generator
+from app.llm.fake_llm import FakeLLM, FakeLLMError, serve_fake_llm
+from app.llm.gateway import CircuitBreaker, LLMGateway, LLMUnavailableError, TokenBucket
+from app.llm.gemini_client import _get_mock_event, llm_gateway
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _gateway(**kwargs) -> LLMGateway:
+    kwargs.setdefault("backoff_base", 0.001)
+    return LLMGateway(limiter=lambda: asyncio.Semaphore(8), **kwargs)
+
+
+def _against_fake_server(upstream, scenario):
+    """Runs `scenario(call)` where `call()` asks the fake Gemini server through the real client."""
+    async def main():
+        server = await serve_fake_llm(upstream)
+        port = server.sockets[0].getsockname()[1]
+        client = genai.Client(api_key="test", http_options=types.HttpOptions(base_url=f"http://127.0.0.1:{port}"))
+
+        async def call():
+            response = await client.aio.models.generate_content(model="fake", contents="prompt")
+            return response.text
+
+        try:
+            return await scenario(call)
+        finally:
+            await client.aio.aclose()
+            server.close()
+            await server.wait_closed()
+    return asyncio.run(main())
+
+
+def test_throttled_and_failing_calls_are_retried_until_they_succeed():
+    replies = iter([FakeLLMError("quota", code=429), FakeLLMError("down", code=503), _get_mock_event()])
+
+    async def upstream(prompt):
+        reply = next(replies)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    gateway = _gateway(max_retries=2)
+    text = _against_fake_server(upstream, lambda call: gateway.call(call))
+
+    assert "description" in text
+    assert gateway.stats()["retries"] == 2 and gateway.breaker.state == "closed"
+
+
+def test_breaker_opens_sheds_and_recovers_through_a_probe():
+    fake = FakeLLM(latency_ms=1, error_rate=1.0)
+    clock = Clock()
+    gateway = _gateway(max_retries=0, breaker=CircuitBreaker(3, reset_timeout=10, clock=clock), clock=clock)
+
+    async def scenario(call):
+        for _ in range(3):
+            with pytest.raises(LLMUnavailableError):
+                await gateway.call(call)
+        with pytest.raises(LLMUnavailableError, match="circuit breaker"):
+            await gateway.call(call)
+        assert fake.calls == 3 and gateway.stats()["breaker_state"] == "open"
+
+        clock.now = 10
+        fake.error_rate = 0.0
+        await gateway.call(call)
+
+    _against_fake_server(fake, scenario)
+    assert gateway.stats()["breaker_state"] == "closed"
+    assert gateway.stats()["rejected"] == 1 and fake.calls == 4
+
+
+def test_failed_probe_reopens_the_breaker():
+    clock = Clock()
+    breaker = CircuitBreaker(1, reset_timeout=5, clock=clock)
+    breaker.record_failure()
+    clock.now = 5
+
+    assert breaker.allow() and not breaker.allow()  # a single probe
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+
+def test_slow_calls_are_cut_at_the_deadline():
+    gateway = _gateway(deadline=0.05, max_retries=5)
+
+    async def scenario():
+        never = asyncio.Event()
+
+        async def hanging():
+            await never.wait()
+
+        with pytest.raises(LLMUnavailableError):
+            await gateway.call(hanging)
+
+    asyncio.run(scenario())
+    # The attempt used the whole deadline, so no retry was left.
+    assert gateway.timeouts == 1 and gateway.retries == 0
+
+
+def test_client_errors_are_not_retried_or_counted_against_the_upstream():
+    gateway = _gateway(breaker=CircuitBreaker(1))
+
+    async def bad_request():
+        raise FakeLLMError("bad request", code=400)
+
+    with pytest.raises(FakeLLMError):
+        asyncio.run(gateway.call(bad_request))
+    assert gateway.retries == 0 and gateway.breaker.state == "closed"
+
+
+def test_rate_limit_sheds_calls_that_would_miss_their_deadline():
+    clock = Clock()
+    bucket = TokenBucket(rate=2, burst=1, clock=clock)
+
+    assert bucket.reserve(latest_start=1.0) == 0
+    assert bucket.reserve(latest_start=1.0) == pytest.approx(0.5)
+    with pytest.raises(LLMUnavailableError):
+        bucket.reserve(latest_start=0.9)
+
+    bucket.throttle()
+    assert bucket.rate == 1
+    bucket.relax()
+    assert 1 < bucket.rate <= 2
+
+
+def test_waiting_callers_beyond_the_queue_limit_are_shed():
+    semaphore = asyncio.Semaphore(1)
+    gateway = LLMGateway(limiter=lambda: semaphore, max_queue=1)
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def scenario():
+        return await asyncio.gather(*(gateway.call(slow) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert results[:2] == ["ok", "ok"] and isinstance(results[2], LLMUnavailableError)
+    assert gateway.stats()["shed"] == 1 and gateway.stats()["queue_depth"] == 0
+
+
+def test_callers_queued_past_their_deadline_are_shed_without_opening_the_breaker():
+    semaphore = asyncio.Semaphore(1)
+    gateway = LLMGateway(limiter=lambda: semaphore, deadline=0.1, breaker=CircuitBreaker(3))
+
+    async def healthy():
+        return "ok"
+
+    async def scenario():
+        await semaphore.acquire()  # A long call holds the only slot.
+        results = await asyncio.gather(*(gateway.call(healthy) for _ in range(8)), return_exceptions=True)
+        semaphore.release()
+        return results, await gateway.call(healthy)
+
+    results, after = asyncio.run(scenario())
+    assert all(isinstance(result, LLMUnavailableError) for result in results)
+    stats = gateway.stats()
+    assert stats["shed"] == 8 and stats["failures"] == 0 and stats["timeouts"] == 0
+    assert stats["breaker_state"] == "closed" and after == "ok"
+
+
+@pytest.fixture
+def open_breaker(monkeypatch):
+    # No pool filler: its calls would close the breaker again.
+    monkeypatch.setattr(main, "EVENT_POOL_ENABLED", False)
+    monkeypatch.setattr(event_generator, "EVENT_POOL_ENABLED", False)
+    monkeypatch.setattr(event_generator, "LLM_CACHE_ENABLED", False)
+    monkeypatch.setattr(main, "PREFETCH_ENABLED", False)
+    breaker = CircuitBreaker(1, reset_timeout=60)
+    breaker.record_failure()
+    monkeypatch.setattr(llm_gateway, "breaker", breaker)
+
+
+def test_unavailable_llm_degrades_to_a_fallback_event(open_breaker, client, new_game):
+    before = sum(llm_gateway.degraded.values())
+    response = client.post("/game", json=new_game)
+
+    assert response.status_code == 200 and response.json()["event"]["options"]
+    assert sum(llm_gateway.degraded.values()) == before + 1
+    assert client.get("/gateway/stats").json()["breaker_state"] == "open"
+
+
+def test_unavailable_llm_answers_503_without_degradation(open_breaker, client, new_game, monkeypatch):
+    started = client.post("/game", json=new_game).json()
+    monkeypatch.setattr(main, "LLM_DEGRADE_ENABLED", False)
+
+    response = client.post(
+        f"/game/{started['game_state']['game_id']}/choice",
+        json={"event_id": started["event"]["event_id"], "option_index": 0},
+    )
+    assert response.status_code == 503 and int(response.headers["retry-after"]) >= 1
+    assert client.get(f"/game/{started['game_state']['game_id']}").json()["day"] == 1
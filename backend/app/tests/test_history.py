@@ -0,0 +1,105 @@
+import json
+import random
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import history, init_db, main
+from app.main import apply_choice, create_game
+from app.models import Impact, StartGameRequest, Stats
+
+
+def _play_random_turns(session, turns: int, seed: int = 0):
+    rng = random.Random(seed)
+    game_id = create_game(
+        session,
+        StartGameRequest(age=16, gender="female", character_name="Alice", work=False),
+    ).game_id
+    states = []
+    for _ in range(turns):
+        impact = Impact(
+            health=rng.randint(-20, 20),
+            happiness=rng.randint(-20, 20),
+            stress=rng.randint(-20, 20),
+            money=round(rng.uniform(-30, 30), 2),
+            free_time=rng.uniform(-2, 2),
+        )
+        states.append(apply_choice(session, game_id, impact))
+    return int(game_id), states
+
+
+def test_impact_pack_roundtrip():
+    impact = Impact(health=-3, education=7, money=12.34, free_time=-0.5)
+    assert history.unpack_impact(history.pack_impact(impact)) == impact
+
+
+def test_impacts_beyond_int32_are_rejected_not_a_500(client, new_game, monkeypatch):
+    monkeypatch.setattr(history, "DAY_STORAGE_MODE", "delta")
+    game_id = client.post("/game", json=new_game).json()["game_state"]["game_id"]
+
+    response = client.post(f"/game/{game_id}/choice", json={"impact": {"health": 3_000_000_000}})
+    assert response.status_code == 422
+    assert client.post(f"/game/{game_id}/choice", json={"impact": {"health": -2**31}}).status_code == 200
+
+
+@pytest.mark.parametrize("mode", ["snapshot", "delta"])
+def test_timeline_reconstructs_every_day_exactly(db_engine, monkeypatch, mode):
+    monkeypatch.setattr(history, "DAY_STORAGE_MODE", mode)
+    monkeypatch.setattr(history, "DAY_CHECKPOINT_INTERVAL", 4)
+    session = sessionmaker(bind=db_engine)()
+    game_id, states = _play_random_turns(session, turns=10)
+
+    timeline = history.get_stat_timeline(session, game_id)
+    assert timeline["day"] == list(range(1, 12))
+    for state in states:
+        index = state.day - 1
+        assert {field: timeline[field][index] for field in history.STAT_FIELDS} == state.stats.model_dump()
+    assert history.stats_at(session, game_id, 7) == states[5].stats
+
+
+def test_delta_mode_only_writes_checkpoints_as_full_rows(db_engine, monkeypatch):
+    monkeypatch.setattr(history, "DAY_STORAGE_MODE", "delta")
+    monkeypatch.setattr(history, "DAY_CHECKPOINT_INTERVAL", 4)
+    session = sessionmaker(bind=db_engine)()
+    game_id, states = _play_random_turns(session, turns=10)
+
+    checkpoints = [day.number_of_day for day in session.query(init_db.Day).order_by(init_db.Day.number_of_day)]
+    assert checkpoints == [1, 5, 9]
+    assert session.query(init_db.DayDelta).count() == 8
+
+    db_game, stats = history.load_current_state(session, game_id)
+    assert db_game.current_day == 11
+    assert stats == states[-1].stats
+
+
+@pytest.mark.parametrize("mode", ["snapshot", "delta"])
+def test_history_endpoint_pages_through_the_timeline(client, db_engine, monkeypatch, mode):
+    monkeypatch.setattr(history, "DAY_STORAGE_MODE", mode)
+    monkeypatch.setattr(history, "DAY_CHECKPOINT_INTERVAL", 4)
+    game_id, _ = _play_random_turns(sessionmaker(bind=db_engine)(), turns=10)
+    expected = history.get_stat_timeline(sessionmaker(bind=db_engine)(), game_id)
+
+    days, after = [], 0
+    while after is not None:
+        page = client.get(f"/game/{game_id}/history", params={"after": after, "limit": 3}).json()
+        days.extend(page["days"])
+        after = page["next_after"]
+    assert history.timeline_columns((day.pop("day"), Stats(**day)) for day in days) == expected
+    assert len(days) == 11
+
+    columns = client.get(f"/game/{game_id}/history", params={"after": 4, "format": "columns"}).json()
+    assert columns["next_after"] is None
+    assert columns["columns"] == {field: values[4:] for field, values in expected.items()}
+
+
+def test_history_endpoint_streams_ndjson(client, db_engine, monkeypatch):
+    monkeypatch.setattr(main, "HISTORY_PAGE_MAX", 4)
+    game_id, states = _play_random_turns(sessionmaker(bind=db_engine)(), turns=10)
+
+    response = client.get(f"/game/{game_id}/history", params={"after": 2, "format": "ndjson"})
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["day"] for line in lines] == list(range(3, 12))
+    assert lines[-1] == {"day": 11, **states[-1].stats.model_dump()}
+
+    assert client.get("/game/999/history").status_code == 404
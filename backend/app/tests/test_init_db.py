@@ -0,0 +1,129 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app import init_db
+from app.main import apply_choice, create_game
+from app.models import Impact, StartGameRequest
+
+LEGACY_SCHEMA = [
+    "CREATE TABLE users (id INTEGER PRIMARY KEY)",
+    "CREATE TABLE games (id INTEGER PRIMARY KEY, age INTEGER NOT NULL, gender VARCHAR NOT NULL,"
+    " character_name VARCHAR NOT NULL, work BOOLEAN NOT NULL, user_id INTEGER NOT NULL)",
+    "CREATE TABLE days (id INTEGER PRIMARY KEY, game_id INTEGER NOT NULL, number_of_day INTEGER NOT NULL,"
+    " health INTEGER NOT NULL, happiness INTEGER NOT NULL, stress INTEGER NOT NULL,"
+    " reputation INTEGER NOT NULL, education INTEGER NOT NULL, money FLOAT NOT NULL,"
+    " weekly_income FLOAT NOT NULL, weekly_expense FLOAT NOT NULL, free_time FLOAT NOT NULL)",
+    "INSERT INTO users (id) VALUES (1)",
+    "INSERT INTO games VALUES (1, 16, 'f', 'Alice', 0, 1)",
+]
+
+
+def test_fresh_database_is_created_at_latest_version():
+    engine = create_engine("sqlite://")
+    init_db.init_db(engine)
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA user_version").scalar() == init_db.SCHEMA_VERSION
+        index_names = {index["name"] for index in inspect(conn).get_indexes("days")}
+    assert "ix_days_game_id_number_of_day" in index_names
+
+
+def test_legacy_database_is_migrated_and_backfilled(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.sqlite'}")
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.exec_driver_sql(statement)
+        for day in (1, 2, 3):
+            conn.exec_driver_sql(
+                f"INSERT INTO days VALUES (NULL, 1, {day}, 100, 50, 10, 0, 0, 50, 0, 0, 40)"
+            )
+
+    init_db.init_db(engine)
+    init_db.init_db(engine)  # Running twice is a no-op.
+
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT current_day FROM games").scalar() == 3
+        assert conn.exec_driver_sql("PRAGMA user_version").scalar() == init_db.SCHEMA_VERSION
+        # Aggregates are backfilled from the final days, including the current
+        # day of a game from before the ledger (it will never be issued).
+        assert conn.exec_driver_sql("SELECT number_of_day, players FROM day_cohorts").all() == [(1, 1), (2, 1), (3, 1)]
+        assert conn.exec_driver_sql("SELECT final_day, max_money FROM game_summaries").all() == [(3, 50.0)]
+
+
+def test_ensure_schema_only_migrates_outdated_databases(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.sqlite'}")
+    assert init_db.ensure_schema(engine)
+    assert not init_db.ensure_schema(engine)
+    assert init_db.schema_version(engine) == init_db.SCHEMA_VERSION
+
+
+def test_conflicting_day_insert_is_rejected(db_engine):
+    session = sessionmaker(bind=db_engine)()
+    game_id = create_game(
+        session,
+        StartGameRequest(age=16, gender="female", character_name="Alice", work=False),
+    ).game_id
+
+    # Another submit inserted day 2 after this one read the pointer.
+    with db_engine.begin() as conn:
+        conn.exec_driver_sql(
+            f"INSERT INTO days VALUES (NULL, {game_id}, 2, 100, 50, 10, 0, 0, 50, 0, 0, 40)"
+        )
+
+    with pytest.raises(HTTPException) as excinfo:
+        apply_choice(session, game_id, Impact())
+    assert excinfo.value.status_code == 409
+
+
+def test_production_profile_applies_pragmas(tmp_path):
+    engine = init_db.create_db_engine(f"sqlite:///{tmp_path / 'wal.sqlite'}", "production")
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == 5000
+
+
+def test_read_only_engine_refuses_writes(tmp_path):
+    url = f"sqlite:///{tmp_path / 'ro.sqlite'}"
+    init_db.init_db(init_db.create_db_engine(url))
+    read_engine = init_db.create_db_engine(url, read_only=True)
+    with read_engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT COUNT(*) FROM games").scalar() == 0
+        with pytest.raises(OperationalError):
+            conn.exec_driver_sql("INSERT INTO users (id) VALUES (1)")
+
+
+@pytest.mark.parametrize("url", ["sqlite://", "sqlite:///:memory:"])
+def test_in_memory_database_is_read_through_the_write_engine(url, monkeypatch):
+    monkeypatch.setattr(init_db, "DATABASE_URL", url)
+    monkeypatch.setattr(init_db, "DB_READ_POOL", True)
+    for name in init_db._ENGINE_ATTRIBUTES:
+        # Set first so the engines created below are dropped on undo.
+        monkeypatch.setattr(init_db, name, None, raising=False)
+        monkeypatch.delattr(init_db, name)
+
+    init_db._create_engines()
+    init_db.init_db(init_db.engine)
+
+    assert init_db.read_engine is init_db.engine
+    with init_db.ReadSessionLocal() as session:
+        assert session.query(init_db.Game).count() == 0
+
+
+def test_unknown_profile_is_rejected():
+    with pytest.raises(ValueError):
+        init_db.create_db_engine("sqlite://", "turbo")
+
+
+def test_read_game_returns_current_state(client, new_game):
+    body = client.post("/game", json=new_game).json()
+    game_id = body["game_state"]["game_id"]
+    client.post(f"/game/{game_id}/choice", json={"impact": {"money": 5}})
+
+    response = client.get(f"/game/{game_id}")
+    assert response.status_code == 200
+    assert response.json()["day"] == 2
+    assert response.json()["stats"]["money"] == 55.0
+    assert client.get("/game/999").status_code == 404
@@ -0,0 +1,72 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app import init_db, main
+
+
+@pytest.fixture(autouse=True)
+def no_speculation(monkeypatch):
+    monkeypatch.setattr(main, "PREFETCH_ENABLED", False)
+
+
+def test_served_events_get_ledger_ids_and_choices_use_them(client, new_game, db_engine):
+    started = client.post("/game", json=new_game).json()
+    game_id, first = started["game_state"]["game_id"], started["event"]
+
+    response = client.post(
+        f"/game/{game_id}/choice", json={"event_id": first["event_id"], "option_index": 0}
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["game_state"]["day"] == 2
+    # Option 0 of the mock event: health +5 (capped at 100), happiness +3.
+    assert body["game_state"]["stats"]["happiness"] == 53
+    assert body["event"]["event_id"] != first["event_id"]
+
+    session = sessionmaker(bind=db_engine)()
+    rows = session.query(init_db.IssuedEvent).order_by(init_db.IssuedEvent.number_of_day).all()
+    assert [(row.id, row.number_of_day, row.chosen_option) for row in rows] == [
+        (first["event_id"], 1, 0),
+        (body["event"]["event_id"], 2, None),
+    ]
+
+
+def test_duplicate_submission_is_idempotent(client, new_game, db_engine):
+    started = client.post("/game", json=new_game).json()
+    game_id = started["game_state"]["game_id"]
+    choice = {"event_id": started["event"]["event_id"], "option_index": 1}
+
+    first = client.post(f"/game/{game_id}/choice", json=choice).json()
+    statements = []
+    event.listen(db_engine, "before_cursor_execute",
+                 lambda conn, cursor, sql, *args: statements.append(sql.split()[0]))
+    again = client.post(f"/game/{game_id}/choice", json=choice)
+
+    assert again.status_code == 200
+    assert again.json() == first
+    assert "INSERT" not in statements and "UPDATE" not in statements
+    assert client.get(f"/game/{game_id}").json()["day"] == 2
+
+
+def test_conflicting_stale_and_unknown_choices_are_rejected(client, new_game):
+    started = client.post("/game", json=new_game).json()
+    game_id, event_id = started["game_state"]["game_id"], started["event"]["event_id"]
+    client.post(f"/game/{game_id}/choice", json={"event_id": event_id, "option_index": 0})
+
+    other = client.post("/game", json=new_game).json()["game_state"]["game_id"]
+    assert client.post(f"/game/{game_id}/choice", json={"event_id": event_id, "option_index": 2}).status_code == 409
+    assert client.post(f"/game/{other}/choice", json={"event_id": event_id, "option_index": 0}).status_code == 404
+    assert client.post(f"/game/{game_id}/choice", json={"event_id": 10**6, "option_index": 0}).status_code == 404
+    assert client.post(f"/game/{other}/choice", json={"event_id": event_id + 2, "option_index": 7}).status_code == 422
+    assert client.post(f"/game/{game_id}/choice", json={"option_index": 0}).status_code == 422
+
+
+def test_legacy_impact_still_plays_a_day(client, new_game):
+    game_id = client.post("/game", json=new_game).json()["game_state"]["game_id"]
+
+    response = client.post(f"/game/{game_id}/choice", json={"impact": {"money": 5}})
+
+    assert response.status_code == 200
+    assert response.json()["game_state"]["stats"]["money"] == 55
@@ -1,63 +1,54 @@
-"""
-Test script for LLM event generation with updated models.
-"""
+import asyncio
 
-import sys
-import os
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+from app.llm import gemini_client
+from app.llm.event_generator import generate_event
+from app.llm.event_pool import default_start_state, generate_live_event
+from app.llm.fake_llm import FakeLLM
+from app.llm.prompts import build_event_prompt
+from app.llm.validation import validate_event
 
-from app.llm.prompts import build_event_prompt, get_system_prompt, get_json_schema
-from app.llm.gemini_client import generate_response
-from app.models import Event
 
-def test_prompts():
-    """Test prompt generation."""
-    print("=== Testing Prompt Generation ===\n")
+def test_event_prompt_describes_the_game_state():
+    state = default_start_state(True).model_copy(update={"day": 5})
+    prompt = build_event_prompt(state)
 
-    # Test JSON schema
-    print("1. JSON Schema:")
-    schema = get_json_schema()
-    print(schema)
-    print("\n")
+    assert "Day: 5" in prompt
+    assert "has a job" in prompt
+    assert '"health":100' in prompt
 
-    # Test system prompt
-    print("2. System Prompt (first 500 chars):")
-    sys_prompt = get_system_prompt()
-    print(sys_prompt[:500] + "...\n")
 
-    # Test event prompt
-    print("3. Event Prompt for Day 5:")
-    event_prompt = build_event_prompt(5)
-    print(event_prompt[:500] + "...\n")
+def test_mock_generation_returns_a_valid_event():
+    event = validate_event(generate_event(default_start_state(False)))
 
-def test_event_generation():
-    """Test actual event generation."""
-    print("\n=== Testing Event Generation ===\n")
+    assert event.description
+    assert 2 <= len(event.options) <= 3
 
-    day = 5
-    prompt = build_event_prompt(day)
 
-    print(f"Generating event for day {day}...")
-    result = generate_response(prompt)
+def test_fake_llm_is_deterministic_and_injects_failures():
+    def outcomes(seed):
+        fake = FakeLLM(latency_ms=0, error_rate=0.2, invalid_rate=0.2, repair_rate=0.2, seed=seed)
+        results = []
+        for _ in range(50):
+            try:
+                reply = asyncio.run(fake("prompt"))
+                results.append("repair" if "choices" in reply else "ok")
+            except Exception as e:
+                results.append(type(e).__name__)
+        return results
 
-    print("\nRaw result:")
-    print(result)
+    first = outcomes(seed=1)
+    assert first == outcomes(seed=1)
+    assert {"ok", "repair", "FakeLLMError", "JSONDecodeError"} <= set(first)
 
-    # Try to parse as Event model
-    print("\n\nParsing as Event model:")
+
+def test_mock_backend_serves_async_generation():
+    fake = FakeLLM(latency_ms=0, repair_rate=1.0)
+    gemini_client.set_mock_backend(fake)
     try:
-        event = Event(**result)
-        print(f"✓ Successfully parsed as Event model")
-        print(f"Event ID: {event.event_id}")
-        print(f"Description: {event.description}")
-        print(f"Number of options: {len(event.options)}")
-        for i, option in enumerate(event.options):
-            print(f"\nOption {i+1}:")
-            print(f"  Description: {option.description}")
-            print(f"  Impact: {option.impact}")
-    except Exception as e:
-        print(f"✗ Failed to parse: {e}")
-
-if __name__ == "__main__":
-    test_prompts()
-    test_event_generation()
+        event = asyncio.run(generate_live_event(default_start_state(False)))
+    finally:
+        gemini_client.set_mock_backend(None)
+
+    assert fake.calls == 1
+    assert "(#1)" in event["description"]
+    assert len(event["options"]) == 3
@@ -0,0 +1,101 @@
+import threading
+import time
+
+import pytest
+
+from app import main, metrics
+from app.llm import event_generator
+
+
+def _value(text: str, sample: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(sample + " "):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{sample} not in /metrics")
+
+
+def test_turn_stages_llm_and_db_counts_are_exported(client, new_game, db_engine, monkeypatch):
+    monkeypatch.setattr(main, "PREFETCH_ENABLED", False)
+    monkeypatch.setattr(main, "EVENT_POOL_ENABLED", False)
+    metrics.count_queries(db_engine)
+    metrics.registry.reset()
+
+    started = client.post("/game", json=new_game).json()
+    client.post(
+        f"/game/{started['game_state']['game_id']}/choice",
+        json={"event_id": started["event"]["event_id"], "option_index": 0},
+    )
+    response = client.get("/metrics")
+
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    for stage in ("db.create", "db.stage", "db.commit", "llm.generate", "response"):
+        assert _value(text, f'app_stage_seconds_count{{stage="{stage}"}}') >= 1
+    assert _value(text, 'app_request_seconds_count{endpoint="make_choice"}') == 1
+    assert _value(text, 'app_request_db_queries_sum{endpoint="make_choice"}') >= 3
+    assert _value(text, "app_db_queries_total") >= 3
+    assert "app_cache_hits" in text and "app_validation_retries" in text
+
+
+@pytest.fixture
+def no_pool_filler(monkeypatch):
+    # Filler calls started before the registry reset would be counted half.
+    monkeypatch.setattr(main, "EVENT_POOL_ENABLED", False)
+
+
+def test_llm_calls_and_tokens_are_counted(no_pool_filler, client, new_game, monkeypatch):
+    monkeypatch.setattr(event_generator, "EVENT_POOL_ENABLED", False)
+    monkeypatch.setattr(event_generator, "LLM_CACHE_ENABLED", False)
+    metrics.registry.reset()
+    client.post("/game", json=new_game)
+    text = client.get("/metrics").text
+
+    # Prefetch may call the LLM too (some still in flight).
+    completed = _value(text, 'app_stage_seconds_count{stage="llm.call"}')
+    assert 1 <= completed <= _value(text, "app_llm_calls_total")
+    assert _value(text, "app_llm_prompt_tokens_total") > 0
+    assert _value(text, "app_llm_output_tokens_total") > 0
+
+
+def test_disabled_spans_are_a_shared_noop(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", False)
+    assert metrics.span("x") is metrics.span("y")
+
+    start = time.perf_counter()
+    for _ in range(100_000):
+        with metrics.span("x"):
+            pass
+    per_span = (time.perf_counter() - start) / 100_000
+    assert per_span < 5e-6
+
+
+def test_stage_histograms_stay_consistent_across_threads(monkeypatch):
+    registry = metrics.Registry()
+    monkeypatch.setattr(metrics, "registry", registry)
+
+    def observe():
+        for _ in range(20_000):
+            registry.observe("x", 1.0)
+
+    threads = [threading.Thread(target=observe) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    histogram = registry.stages["x"]
+    assert histogram.count == sum(histogram.counts) == 80_000
+    assert histogram.sum == 80_000.0
+    assert 'app_stage_seconds_count{stage="x"} 80000' in metrics.render()
+
+
+def test_sampled_requests_reach_the_profile_hook(client, monkeypatch):
+    profiled = []
+    monkeypatch.setattr(metrics, "PROFILE_SAMPLE_RATE", 1.0)
+    metrics.set_profile_hook(lambda endpoint, profile: profiled.append(endpoint))
+    try:
+        client.get("/")
+    finally:
+        metrics.set_profile_hook(None)
+
+    assert profiled == ["read_root"]
@@ -1,7 +1,7 @@
 
 import pytest
 from pydantic import ValidationError
-from backend.app.models import Game, StaticProperties, Stats, Finances, Income, Expense
+from app.models import Game, StaticProperties, Stats, Finances, Income, Expense
 
 def test_game_model_instantiation_and_validation():
     """
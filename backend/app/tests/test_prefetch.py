@@ -0,0 +1,86 @@
+import asyncio
+
+from app.llm import event_generator
+from app.llm.event_pool import EventPool
+from app.llm.prefetch import EventPrefetcher
+from app.rules import apply_impact
+from app.models import Impact
+
+EVENT = {
+    "event_id": 1,
+    "description": "A friend invites you to a concert.",
+    "options": [
+        {"description": "Go", "impact": {"happiness": 10, "money": -30}},
+        {"description": "Stay home", "impact": {"stress": -5}},
+    ],
+}
+
+
+def test_take_returns_branch_for_chosen_option_and_cancels_others(game_state):
+    seen = []
+
+    async def generate(game_state):
+        await asyncio.sleep(0.01)
+        seen.append(game_state)
+        return {"day": game_state.day, "money": game_state.stats.money}
+
+    async def scenario():
+        prefetcher = EventPrefetcher(generate=generate)
+        prefetcher.schedule(game_state, EVENT)
+        task = prefetcher.take("7", 3, Impact(happiness=10, money=-30))
+        return prefetcher, await task
+
+    prefetcher, result = asyncio.run(scenario())
+    assert result == {"day": 4, "money": 20.0}
+    assert [state.day for state in seen] == [4]
+    assert prefetcher.stats()["hit_rate"] == 1.0
+    assert prefetcher.cancelled == 1
+
+
+def test_take_misses_on_unknown_impact_or_stale_day(game_state):
+    async def generate(game_state):
+        return {}
+
+    async def scenario():
+        prefetcher = EventPrefetcher(generate=generate)
+        prefetcher.schedule(game_state, EVENT)
+        assert prefetcher.take("7", 3, Impact(health=1)) is None
+        prefetcher.schedule(game_state, EVENT)
+        assert prefetcher.take("7", 2, Impact(stress=-5)) is None
+        return prefetcher
+
+    prefetcher = asyncio.run(scenario())
+    assert prefetcher.stats()["misses"] == 2
+    assert prefetcher.stats()["games_in_flight"] == 0
+
+
+def test_cancelled_branches_leave_their_pooled_events_unseen(game_state, monkeypatch):
+    pool = EventPool()
+    monkeypatch.setattr(event_generator, "event_pool", pool)
+    monkeypatch.setattr(event_generator, "EVENT_POOL_ENABLED", True)
+    state = game_state
+    for option in EVENT["options"]:
+        next_state = state.model_copy(update={
+            "day": 4, "stats": apply_impact(state.stats, Impact(**option["impact"])),
+        })
+        pool.add(next_state, {**EVENT, "description": f"After {option['description']}"})
+
+    async def scenario():
+        prefetcher = EventPrefetcher()
+        prefetcher.schedule(state, EVENT)
+        await asyncio.sleep(0.01)
+        return await prefetcher.take("7", 3, Impact(stress=-5))
+
+    assert asyncio.run(scenario())["description"].startswith("After")
+    # No branch marked its event; serving the taken one is the caller's job.
+    assert pool._store.smembers("served:7") == set()
+
+
+def test_choice_endpoint_serves_prefetched_event(client, new_game):
+    body = client.post("/game", json=new_game).json()
+    game_id = body["game_state"]["game_id"]
+    impact = body["event"]["options"][1]["impact"]
+
+    response = client.post(f"/game/{game_id}/choice", json={"impact": impact})
+    assert response.status_code == 200
+    assert client.get("/prefetch/stats").json()["hits"] >= 1
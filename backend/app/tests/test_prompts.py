@@ -0,0 +1,37 @@
+import os
+
+from app.llm import prompts
+from app.llm.cache import prompt_fingerprint
+from app.llm.event_pool import default_start_state
+
+
+def test_static_prefix_is_rendered_once():
+    first = prompts.static_prefix()
+    assert prompts.static_prefix() is first
+
+
+def test_strategy_is_hot_reloaded_on_mtime_change(tmp_path, monkeypatch):
+    strategy = tmp_path / "strategy.md"
+    strategy.write_text("Rule A")
+    monkeypatch.setattr(prompts, "STRATEGY_PATH", str(strategy))
+    monkeypatch.setattr(prompts, "_prefix_cache", (None, ""))
+
+    assert "Rule A" in prompts.build_event_prompt(default_start_state(False))
+    strategy.write_text("Rule B")
+    stat = strategy.stat()
+    os.utime(strategy, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    prompt = prompts.build_event_prompt(default_start_state(False))
+    assert "Rule B" in prompt and "Rule A" not in prompt
+
+
+def test_dynamic_section_is_compact_and_cacheable(monkeypatch):
+    state = default_start_state(True).model_copy(update={"day": 4})
+    prompt = prompts.build_event_prompt(state)
+    assert prompt.startswith(prompts.static_prefix())
+    assert '"health":100,' in prompt
+    assert "has a job" in prompt and "Day: 4" in prompt
+
+    monkeypatch.setattr(prompts.time, "time", lambda: 1)
+    later = prompts.build_event_prompt(state)
+    assert prompt_fingerprint(later) == prompt_fingerprint(prompt)
+    assert prompts.prompt_stats.as_dict()["last_tokens_estimate"] == prompts.estimate_tokens(later)
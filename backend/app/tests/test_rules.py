@@ -0,0 +1,35 @@
+import random
+
+import numpy as np
+
+from app import rules
+from app.models import Impact, Stats
+
+
+def test_bounds_come_from_the_stats_schema():
+    bounds = {rules.STAT_FIELDS[i]: (lower, upper) for i, lower, upper in rules.BOUNDS}
+    assert bounds == {
+        "health": (0, 100),
+        "happiness": (0, 100),
+        "stress": (0, 100),
+        "reputation": (-100, 100),
+        "education": (0, None),
+    }
+
+
+def test_apply_impact_keeps_stats_valid():
+    stats = Stats(reputation=95, education=3)
+    result = rules.apply_impact(stats, Impact(health=20, stress=-50, reputation=10, education=-10, money=-80))
+    assert (result.health, result.stress, result.reputation, result.education) == (100, 0, 100, 0)
+    assert result.money == -30.0
+    assert Stats.model_validate(result.model_dump()) == result
+
+
+def test_step_batch_matches_scalar_step():
+    rng = random.Random(1)
+    stats = [rules.to_vector(Stats()) for _ in range(50)]
+    impacts = [[rng.randint(-60, 60) for _ in rules.STAT_FIELDS] for _ in range(50)]
+
+    batch = rules.step_batch(np.array(stats, dtype=float), np.array(impacts, dtype=float))
+    expected = [rules.step(s, d) for s, d in zip(stats, impacts)]
+    assert batch.tolist() == expected
@@ -0,0 +1,48 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from app.settings import Settings
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+
+def test_settings_are_parsed_from_their_upper_case_names():
+    settings = Settings.from_env({
+        "USE_MOCK_LLM": "False",
+        "LLM_MAX_CONCURRENCY": "4",
+        "LLM_RATE_LIMIT_RPM": "60.5",
+        "LLM_CACHE_PATH": "",
+        "DB_PROFILE": "default",
+    })
+
+    assert settings.use_mock_llm is False
+    assert settings.llm_max_concurrency == 4
+    assert settings.llm_rate_limit_rpm == 60.5
+    assert settings.llm_cache_path is None
+    assert settings.db_profile == "default"
+    assert settings.event_pool is True  # unset: default
+
+
+def test_default_paths_are_anchored_to_the_backend_directory():
+    settings = Settings.from_env({})
+    for path in (settings.export_dir, settings.state_path, settings.profile_dir):
+        assert Path(path).parent == BACKEND_DIR
+
+
+def test_importing_the_app_loads_no_llm_sdk_and_opens_no_database(tmp_path):
+    database = tmp_path / "untouched.sqlite"
+    code = (
+        "import json, sys; import app.main; from app import init_db; "
+        "print(json.dumps({'modules': sorted(m for m in ('google.genai', 'dotenv', 'httpx') if m in sys.modules),"
+        " 'engine': 'engine' in vars(init_db)}))"
+    )
+    env = dict(os.environ, USE_MOCK_LLM="false", GEMINI_API_KEY="test", DATABASE_URL=f"sqlite:///{database}")
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, check=True, capture_output=True, text=True
+    ).stdout
+
+    assert json.loads(out.splitlines()[-1]) == {"modules": [], "engine": False}
+    assert not database.exists()
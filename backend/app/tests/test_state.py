@@ -0,0 +1,132 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.llm.cache import GenerationCache
+from app.llm.event_pool import EventPool, default_start_state
+from app.llm.gemini_client import _get_mock_event
+from app.state import KVClientStore, KVCommandError, MemoryStore, SQLiteStore, serve_kv
+
+
+@pytest.fixture(scope="module")
+def kv_address():
+    """A KV server on an ephemeral port, running in its own thread."""
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(serve_kv("127.0.0.1", 0))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    host, port = server.sockets[0].getsockname()[:2]
+    yield f"{host}:{port}"
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    server.close()
+
+
+@pytest.fixture(params=["memory", "sqlite", "kv"])
+def store_pair(request, tmp_path, kv_address):
+    """Two handles on the same store, as two worker processes would hold."""
+    if request.param == "memory":
+        store = MemoryStore()
+        return store, store
+    if request.param == "sqlite":
+        path = str(tmp_path / "state.sqlite")
+        return SQLiteStore(path), SQLiteStore(path)
+    return KVClientStore(kv_address), KVClientStore(kv_address)
+
+
+def test_values_and_sets_are_visible_to_every_handle(store_pair):
+    first, second = store_pair
+    key = f"k{id(store_pair)}"
+
+    first.set(key, "v")
+    assert second.get(key) == "v"
+    second.delete(key)
+    assert first.get(key) is None
+
+    assert first.sadd(key + ":s", "a")
+    assert not second.sadd(key + ":s", "a")
+    assert second.sadd(key + ":s", "b")
+    assert first.smembers(key + ":s") == {"a", "b"}
+    assert second.sadd_first(key + ":s", ["a", "c", "d"]) == "c"
+    assert first.sadd_first(key + ":s", ["a", "b", "c"]) is None
+
+
+def test_expired_entries_are_gone(store_pair):
+    first, second = store_pair
+    first.set("short", "v", ttl=-1)
+    first.sadd("short:s", "a", ttl=-1)
+
+    assert second.get("short") is None
+    assert second.smembers("short:s") == set()
+    assert second.sadd("short:s", "a")
+
+
+def test_sqlite_store_purges_expired_rows_on_write(tmp_path):
+    store = SQLiteStore(str(tmp_path / "state.sqlite"), purge_interval=0)
+    store.set("old", "v", ttl=-1)
+    store.sadd("old:s", "a", ttl=-1)
+    store.set("new", "v")
+
+    rows = [store._conn.execute(f"SELECT key FROM {table}").fetchall() for table in ("kv", "kv_sets")]
+    assert rows == [[("new",)], []]
+
+
+def test_kv_server_answers_bad_commands_with_an_error(kv_address):
+    client = KVClientStore(kv_address)
+    for command in (("_put", "k", "v", None), ("__class__",), ("get",), ("set", "k", "v", "soon")):
+        with pytest.raises(KVCommandError):
+            client._call(*command)
+    # The connection survived every rejected command.
+    client.set("k", "v")
+    assert client.get("k") == "v"
+
+
+def test_no_repeat_holds_across_pools_sharing_a_store(tmp_path):
+    path = str(tmp_path / "state.sqlite")
+    workers = [EventPool(store=SQLiteStore(path)), EventPool(store=SQLiteStore(path))]
+    state = default_start_state(False).model_copy(update={"game_id": "7"})
+    for pool in workers:
+        pool.add(state, _get_mock_event())
+
+    assert asyncio.run(workers[0].draw(state)) is not None
+    assert asyncio.run(workers[1].draw(state)) is None
+
+
+def test_draw_checks_a_game_with_one_offloaded_store_call(tmp_path):
+    store = SQLiteStore(str(tmp_path / "state.sqlite"))
+    calls = []
+    sadd_first = store.sadd_first
+    store.sadd_first = lambda *args: calls.append(threading.get_ident()) or sadd_first(*args)
+    pool = EventPool(store=store)
+    state = default_start_state(False).model_copy(update={"game_id": "7"})
+    for n in range(5):
+        pool.add(state, {**_get_mock_event(), "description": f"Event {n}"})
+        if n < 4:
+            store.sadd("served:7", f"Event {n}")
+
+    assert asyncio.run(pool.draw(state))["description"] == "Event 4"
+    assert len(calls) == 1 and calls[0] != threading.get_ident()
+
+
+def test_cache_second_tier_is_shared(tmp_path):
+    path = str(tmp_path / "state.sqlite")
+    asyncio.run(GenerationCache(store=SQLiteStore(path)).put("k", {"description": "x"}))
+    assert asyncio.run(GenerationCache(store=SQLiteStore(path)).get("k")) == {"description": "x"}
+
+
+def test_pool_and_cache_create_their_store_on_first_use(tmp_path):
+    path = str(tmp_path / "state.sqlite")
+    created = []
+
+    def factory():
+        created.append(SQLiteStore(path))
+        return created[-1]
+
+    pool, cache = EventPool(store_factory=factory), GenerationCache(store_factory=factory)
+    assert created == []
+
+    asyncio.run(cache.put("k", {"description": "x"}))
+    asyncio.run(pool.mark_served("7", {"description": "seen"}))
+    assert len(created) == 2
+    assert SQLiteStore(path).smembers("served:7") == {"seen"}
@@ -0,0 +1,147 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from app import main
+from app.llm import streaming
+from app.llm.event_pool import default_start_state
+from app.llm.gemini_client import _get_mock_event
+from app.llm.streaming import EventStreamParser
+
+
+def _frames(body: str) -> list[tuple[str, dict]]:
+    frames = []
+    for block in body.strip().split("\n\n"):
+        name, data = block.split("\n")
+        frames.append((name.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return frames
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 10000])
+def test_parser_emits_description_and_options_incrementally(chunk_size):
+    raw = _get_mock_event()
+    raw["description"] = 'A "quoted" line\nwith é and \U0001F600'
+    text = json.dumps(raw)
+
+    parser = EventStreamParser()
+    frames = []
+    for i in range(0, len(text), chunk_size):
+        frames.extend(parser.feed(text[i:i + chunk_size]))
+
+    description = "".join(payload for name, payload in frames if name == "description")
+    options = [payload for name, payload in frames if name == "option"]
+    assert description == raw["description"]
+    assert options == raw["options"]
+    assert parser.result() == raw
+
+
+def test_option_is_emitted_before_the_reply_is_complete():
+    text = json.dumps(_get_mock_event())
+    cut = text.index("}}") + 2  # end of the first option
+
+    frames = EventStreamParser().feed(text[:cut])
+
+    assert [name for name, _ in frames] == ["description", "option"]
+
+
+def test_unparseable_stream_falls_back_to_a_validated_event(monkeypatch):
+    async def garbage(prompt):
+        yield '{"description": "half'
+
+    monkeypatch.setattr(streaming, "stream_response_async", garbage)
+
+    async def collect():
+        return [frame async for frame in streaming.stream_event(default_start_state(False))]
+
+    frames = asyncio.run(collect())
+    assert frames[0] == ("description", "half")
+    name, event = frames[-1]
+    assert name == "event"
+    assert len(event["options"]) == 3
+
+
+def test_choice_stream_sends_state_first_then_event(client, new_game, monkeypatch):
+    monkeypatch.setattr(main, "PREFETCH_ENABLED", False)
+    monkeypatch.setattr(main, "EVENT_POOL_ENABLED", False)
+    game_id = client.post("/game", json=new_game).json()["game_state"]["game_id"]
+
+    response = client.post(f"/game/{game_id}/choice/stream", json={"impact": {"money": 5}})
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    frames = _frames(response.text)
+    names = [name for name, _ in frames]
+    assert names[0] == "state" and names[-1] == "event"
+    assert names.count("option") == 3 and names.count("description") > 1
+    assert frames[0][1]["day"] == 2
+    event = frames[-1][1]
+    assert "".join(data["delta"] for name, data in frames if name == "description") == event["description"]
+    assert client.get(f"/game/{game_id}").json()["day"] == 2
+
+
+def test_choice_stream_rolls_back_when_no_valid_event(client, new_game, monkeypatch):
+    monkeypatch.setattr(main, "PREFETCH_ENABLED", False)
+    monkeypatch.setattr(main, "EVENT_POOL_ENABLED", False)
+    game_id = client.post("/game", json=new_game).json()["game_state"]["game_id"]
+
+    async def broken(game_state):
+        raise streaming.EventValidationError("nope")
+        yield
+
+    monkeypatch.setattr(main, "stream_event", broken)
+    frames = _frames(client.post(f"/game/{game_id}/choice/stream", json={"impact": {}}).text)
+
+    assert [name for name, _ in frames] == ["state", "error"]
+    assert client.get(f"/game/{game_id}").json()["day"] == 1
+
+
+def test_choice_stream_replays_a_duplicate_that_won_the_race(client, new_game, monkeypatch):
+    monkeypatch.setattr(main, "PREFETCH_ENABLED", False)
+    monkeypatch.setattr(main, "EVENT_POOL_ENABLED", False)
+    started = client.post("/game", json=new_game).json()
+    game_id = started["game_state"]["game_id"]
+    choice = {"event_id": started["event"]["event_id"], "option_index": 0}
+    played = client.post(f"/game/{game_id}/choice", json=choice).json()
+
+    def lost_race(db, game_id, choice, on_staged):
+        raise HTTPException(status_code=409, detail="This day has already been played.")
+
+    monkeypatch.setattr(main, "play_choice", lost_race)
+    frames = _frames(client.post(f"/game/{game_id}/choice/stream", json=choice).text)
+
+    assert frames == [("state", played["game_state"]), ("event", played["event"])]
+    assert client.post(f"/game/{game_id}/choice", json=choice).json() == played
+
+
+def test_choice_stream_holds_no_session_while_the_event_streams(client, new_game, monkeypatch):
+    monkeypatch.setattr(main, "PREFETCH_ENABLED", False)
+    monkeypatch.setattr(main, "EVENT_POOL_ENABLED", False)
+    game_id = client.post("/game", json=new_game).json()["game_state"]["game_id"]
+
+    override, open_sessions = main.app.dependency_overrides[main.get_db], []
+
+    def tracked():
+        open_sessions.append(1)
+        try:
+            yield from override()
+        finally:
+            open_sessions.pop()
+
+    monkeypatch.setitem(main.app.dependency_overrides, main.get_db, tracked)
+    during_stream = []
+
+    async def generate(game_state):
+        during_stream.append(len(open_sessions))
+        yield "event", _get_mock_event()
+
+    monkeypatch.setattr(main, "stream_event", generate)
+    frames = _frames(client.post(f"/game/{game_id}/choice/stream", json={"impact": {}}).text)
+
+    assert frames[-1][0] == "event"
+    assert during_stream == [0] and open_sessions == []
+    assert client.get(f"/game/{game_id}").json()["day"] == 2
+
+
+def test_choice_stream_unknown_game_is_404(client):
+    assert client.post("/game/999/choice/stream", json={"impact": {}}).status_code == 404
@@ -0,0 +1,99 @@
+import asyncio
+import json
+
+import pytest
+
+from app import main
+from app.llm import validation
+from app.llm.validation import EventValidationError, generate_valid_event, validate_event
+
+VALID = {
+    "event_id": 1,
+    "description": "Your phone screen cracks.",
+    "options": [
+        {"description": "Repair it", "impact": {"money": -80, "stress": -5}},
+        {"description": "Live with it", "impact": {"happiness": -3}},
+    ],
+}
+
+
+def test_valid_event_takes_the_fast_path():
+    before = validation.validation_stats.valid
+    assert validate_event(VALID).options[0].impact.money == -80
+    assert validation.validation_stats.valid == before + 1
+
+
+def test_legacy_choices_shape_is_repaired_and_unknown_keys_dropped():
+    legacy = {
+        "description": "You wake up refreshed.",
+        "choices": [
+            {"id": 1, "text": "Jog", "impact": {"health": 5, "energy": -2, "social": 0}},
+            {"id": 2, "text": "Sleep in", "impact": {"happiness": 4, "career": -3}},
+        ],
+    }
+    event = validate_event(legacy)
+    assert [option.description for option in event.options] == ["Jog", "Sleep in"]
+    assert event.options[0].impact.health == 5
+    assert isinstance(event.event_id, int)
+
+
+def test_out_of_range_impacts_are_clamped_and_extra_options_cut():
+    raw = {
+        "event_id": 2,
+        "description": "Lottery!",
+        "options": [
+            {"description": f"Option {i}", "impact": {"happiness": 250.6, "money": 1e9}}
+            for i in range(5)
+        ],
+    }
+    event = validate_event(raw)
+    assert len(event.options) == validation.MAX_OPTIONS
+    assert event.options[0].impact.happiness == 100
+    assert event.options[0].impact.money == validation.IMPACT_LIMITS["money"]
+
+
+@pytest.mark.parametrize("raw", [
+    [],
+    {"options": VALID["options"]},
+    {"description": "Only one way out", "options": VALID["options"][:1]},
+    {"description": "Bad impact", "options": [{"description": "x", "impact": {"money": "lots"}}] * 2},
+    {"description": "NaN impact", "options": [{"description": "x", "impact": {"money": float("nan")}}] * 2},
+    {"description": "Infinite impact", "options": [{"description": "x", "impact": {"stress": "-inf"}}] * 2},
+])
+def test_unrepairable_replies_are_rejected(raw):
+    with pytest.raises(EventValidationError):
+        validate_event(raw)
+
+
+def test_generation_is_retried_a_bounded_number_of_times():
+    replies = iter([{"nonsense": True}, json.JSONDecodeError("bad", "", 0), VALID])
+
+    async def generate():
+        reply = next(replies)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    assert asyncio.run(generate_valid_event(generate, attempts=3))["description"] == VALID["description"]
+
+    async def always_bad():
+        return {}
+
+    with pytest.raises(EventValidationError):
+        asyncio.run(generate_valid_event(always_bad, attempts=2))
+
+
+def test_failed_generation_writes_nothing(client, new_game, monkeypatch):
+    game_id = client.post("/game", json=new_game).json()["game_state"]["game_id"]
+
+    async def broken(game_state):
+        raise EventValidationError("no valid event")
+
+    monkeypatch.setattr(main, "generate_event_async", broken)
+    monkeypatch.setattr(main, "PREFETCH_ENABLED", False)
+
+    assert client.post(f"/game/{game_id}/choice", json={"impact": {"money": 5}}).status_code == 502
+    assert client.get(f"/game/{game_id}").json()["day"] == 1
+    assert client.post("/game", json=new_game).status_code == 502
+    assert client.get(f"/game/{int(game_id) + 1}").status_code == 404
+
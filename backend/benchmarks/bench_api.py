@@ -0,0 +1,240 @@
+"""
+End-to-end API benchmark through the real ASGI app with a fake LLM.
+
+Plays `--games` games of `--turns` choices each, `--concurrency` at a time,
+against `app.main:app` in-process (httpx ASGI transport) on a fresh SQLite
+file. The LLM is `app.llm.fake_llm.FakeLLM`, with configurable latency
+and failure distributions. The event pool, response cache and prefetch are
+off by default so every turn exercises the full generation path; enable
+them with the flags below.
+
+Reports throughput and p50/p95/p99 per stage:
+
+    request.start / request.choice   whole POST /game and POST /game/{id}/choice
+    db.create / db.stage / db.commit game creation, choice staging, turn commit
+    prompt                           build_event_prompt
+    llm                              fake LLM call (the configured latency)
+    validate                         validate_event (incl. repair)
+
+Results can be saved as a baseline (benchmarks/baseline.json) and later runs
+compared against it, so regressions in DB, validation or prompt building
+show up as p95 deltas. With `--check` the run fails if a stage's p95 exceeds
+the baseline by more than `--tolerance`.
+
+Usage (from backend/):
+    python -m benchmarks.bench_api [--concurrency 32] [--latency-ms 50 --latency-sigma 0.5]
+                                   [--error-rate 0.01 --throttle-rate 0.01 --invalid-rate 0.05 --repair-rate 0.1]
+                                   [--save-baseline | --check]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+NEW_GAME = {"age": 16, "gender": "female", "character_name": "Alice", "work": False}
+# Stages compared against the baseline; the LLM stage is the configured fake.
+COMPARED_STAGES = ("request.start", "request.choice", "db.create", "db.stage", "db.commit", "prompt", "validate")
+
+
+def _configure(args, tmp: str) -> None:
+    """Settings are read at import time, so this runs before importing the app."""
+    os.environ.update(
+        USE_MOCK_LLM="true",
+        DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.sqlite')}",
+        STATE_BACKEND="memory",
+        EVENT_POOL=str(args.pool).lower(),
+        LLM_CACHE=str(args.cache).lower(),
+        LLM_PREFETCH=str(args.prefetch).lower(),
+        LLM_BATCH=str(args.batch).lower(),
+        LLM_MAX_CONCURRENCY=str(args.concurrency * 4),
+    )
+
+
+def _instrument(samples: dict[str, list[float]]) -> None:
+    """Wraps the stage functions so every call records its duration."""
+    from app import main
+    from app.llm import batching, event_generator, prompts, streaming, validation
+
+    def timed(name, fn):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                samples[name].append(time.perf_counter() - start)
+        return wrapper
+
+    for module, attr, name in (
+        (main, "create_game", "db.create"),
+        (main, "stage_choice", "db.stage"),
+        (main, "finish_turn", "db.commit"),
+        (validation, "validate_event", "validate"),
+        (streaming, "validate_event", "validate"),
+        (batching, "validate_event", "validate"),
+    ):
+        setattr(module, attr, timed(name, getattr(module, attr)))
+    build = timed("prompt", prompts.build_event_prompt)
+    for module in (event_generator, batching, streaming):
+        module.build_event_prompt = build
+    batching.build_batch_prompt = timed("prompt", prompts.build_batch_prompt)
+
+
+async def _play(client, turns: int, samples, errors) -> None:
+    start = time.perf_counter()
+    response = await client.post("/game", json=NEW_GAME)
+    samples["request.start"].append(time.perf_counter() - start)
+    if response.status_code != 200:
+        errors[f"start {response.status_code}"] += 1
+        return
+    body = response.json()
+    game_id, event = body["game_state"]["game_id"], body["event"]
+
+    for _ in range(turns):
+        start = time.perf_counter()
+        response = await client.post(
+            f"/game/{game_id}/choice", json={"event_id": event["event_id"], "option_index": 0}
+        )
+        samples["request.choice"].append(time.perf_counter() - start)
+        if response.status_code != 200:
+            errors[f"choice {response.status_code}"] += 1
+            continue
+        event = response.json()["event"]
+
+
+async def _drive(app, games: int, turns: int, concurrency: int, samples, errors) -> float:
+    import httpx
+
+    limiter = asyncio.Semaphore(concurrency)
+
+    async def one(client):
+        async with limiter:
+            await _play(client, turns, samples, errors)
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(one(client) for _ in range(games)))
+        return time.perf_counter() - start
+
+
+def percentiles(values: list[float]) -> dict:
+    """p50/p95/p99 in milliseconds."""
+    if not values:
+        return {"count": 0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+    cuts = statistics.quantiles(values, n=100, method="inclusive") if len(values) > 1 else [values[0]] * 99
+    return {
+        "count": len(values),
+        "p50_ms": round(cuts[49] * 1000, 3),
+        "p95_ms": round(cuts[94] * 1000, 3),
+        "p99_ms": round(cuts[98] * 1000, 3),
+    }
+
+
+def run(args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        _configure(args, tmp)
+        from app import init_db, main
+        from app.llm.gemini_client import llm_gateway, set_mock_backend
+        from app.llm.fake_llm import FakeLLM
+
+        init_db.init_db()
+        fake = FakeLLM(
+            latency_ms=args.latency_ms,
+            latency_sigma=args.latency_sigma,
+            error_rate=args.error_rate,
+            throttle_rate=args.throttle_rate,
+            invalid_rate=args.invalid_rate,
+            repair_rate=args.repair_rate,
+            seed=args.seed,
+        )
+        set_mock_backend(fake)
+        samples: dict[str, list[float]] = defaultdict(list)
+        errors: dict[str, int] = defaultdict(int)
+        _instrument(samples)
+        try:
+            elapsed = asyncio.run(_drive(main.app, args.games, args.turns, args.concurrency, samples, errors))
+        finally:
+            set_mock_backend(None)
+            init_db.engine.dispose()
+            init_db.read_engine.dispose()
+        samples["llm"] = fake.seconds
+
+    requests = len(samples["request.start"]) + len(samples["request.choice"])
+    return {
+        "config": {
+            name: getattr(args, name)
+            for name in ("games", "turns", "concurrency", "latency_ms", "latency_sigma",
+                         "error_rate", "throttle_rate", "invalid_rate", "repair_rate", "seed", "pool", "cache", "prefetch", "batch")
+        },
+        "requests_per_s": round(requests / elapsed, 1),
+        "errors": dict(errors),
+        "gateway": {key: value for key, value in llm_gateway.stats().items() if key not in ("queue_depth", "in_flight")},
+        "stages": {name: percentiles(values) for name, values in sorted(samples.items())},
+    }
+
+
+def report(result: dict, baseline: dict = None) -> list[str]:
+    """Prints the results; returns the stages whose p95 regressed past the tolerance."""
+    print(f"{result['requests_per_s']} requests/s, errors: {result['errors'] or 'none'}")
+    if "gateway" in result:
+        print("gateway: " + ", ".join(f"{key}={value}" for key, value in result["gateway"].items()))
+    header = f"{'stage':<16} {'count':>7} {'p50 (ms)':>10} {'p95 (ms)':>10} {'p99 (ms)':>10}"
+    print(header + (f" {'p95 vs baseline':>16}" if baseline else ""))
+    regressions = []
+    for name, stage in result["stages"].items():
+        line = f"{name:<16} {stage['count']:>7} {stage['p50_ms']:>10.3f} {stage['p95_ms']:>10.3f} {stage['p99_ms']:>10.3f}"
+        base = baseline and baseline["stages"].get(name)
+        if base and base["p95_ms"]:
+            ratio = stage["p95_ms"] / base["p95_ms"] - 1
+            line += f" {ratio:>+15.0%}"
+            if name in COMPARED_STAGES and ratio > baseline["tolerance"]:
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--invalid-rate", type=float, default=0.0)
+    parser.add_argument("--repair-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pool", action="store_true", help="enable the event pool")
+    parser.add_argument("--cache", action="store_true", help="enable the response cache")
+    parser.add_argument("--prefetch", action="store_true", help="enable speculative prefetch")
+    parser.add_argument("--batch", action="store_true", help="enable micro-batched generation")
+    parser.add_argument("--save-baseline", action="store_true", help=f"write the results to {BASELINE_PATH.name}")
+    parser.add_argument("--check", action="store_true", help="exit 1 if a stage regressed against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed p95 increase, e.g. 0.5 = +50%%")
+    args = parser.parse_args()
+
+    result = run(args)
+    baseline = None
+    if BASELINE_PATH.exists() and not args.save_baseline:
+        baseline = json.loads(BASELINE_PATH.read_text())
+        if baseline["config"] != result["config"]:
+            print(f"note: {BASELINE_PATH.name} was recorded with a different configuration: {baseline['config']}")
+        baseline["tolerance"] = args.tolerance
+    regressions = report(result, baseline)
+
+    if args.save_baseline:
+        BASELINE_PATH.write_text(json.dumps(result, indent=2) + "\n")
+        print(f"saved {BASELINE_PATH}")
+    if args.check and regressions:
+        print(f"p95 regressions: {', '.join(regressions)}")
+        sys.exit(1)
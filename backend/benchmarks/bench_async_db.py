@@ -0,0 +1,144 @@
+"""
+Sync vs. async database path under concurrent players.
+
+For each player count, plays that many games at once (a start and `--turns`
+choices each), first through the sync endpoints (`Session` work in the
+threadpool), then through the `/async` ones (`AsyncSession` over aiosqlite,
+on the event loop). The app runs in-process (httpx ASGI transport) on a
+fresh SQLite file, with `app.llm.fake_llm.FakeLLM` as the LLM and the
+event pool, cache and prefetch off. Reports, per path:
+
+    turns/s        completed choices per second
+    p50/p95/p99    latency of POST .../choice
+    threads        peak number of threads in the process
+    errors         non-200 answers by status
+
+Usage (from backend/):
+    python -m benchmarks.bench_async_db [--players 50 200 1000] [--turns 3] [--latency-ms 50] [--paths sync async]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from benchmarks.bench_api import NEW_GAME, percentiles
+
+PATHS = {"sync": "", "async": "/async"}
+
+
+def _configure(args, tmp: str) -> None:
+    """Settings are read at import time, so this runs before importing the app."""
+    most = max(args.players)
+    os.environ.update(
+        USE_MOCK_LLM="true",
+        DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.sqlite')}",
+        STATE_BACKEND="memory",
+        EVENT_POOL="false",
+        LLM_CACHE="false",
+        LLM_PREFETCH="false",
+        LLM_BATCH="false",
+        LLM_MAX_CONCURRENCY=str(most),
+        LLM_MAX_QUEUE=str(most),
+    )
+
+
+async def _play(client, prefix: str, turns: int, latencies: list, errors: Counter) -> None:
+    response = await client.post(f"{prefix}/game", json=NEW_GAME)
+    if response.status_code != 200:
+        errors[f"start {response.status_code}"] += 1
+        return
+    body = response.json()
+    game_id, event = body["game_state"]["game_id"], body["event"]
+    for _ in range(turns):
+        start = time.perf_counter()
+        response = await client.post(
+            f"{prefix}/game/{game_id}/choice", json={"event_id": event["event_id"], "option_index": 0}
+        )
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            errors[f"choice {response.status_code}"] += 1
+            return
+        event = response.json()["event"]
+
+
+async def _round(app, prefix: str, players: int, turns: int) -> dict:
+    import httpx
+
+    latencies: list[float] = []
+    errors: Counter = Counter()
+    peak_threads = threading.active_count()
+    done = asyncio.Event()
+
+    async def sample_threads():
+        nonlocal peak_threads
+        while not done.is_set():
+            peak_threads = max(peak_threads, threading.active_count())
+            await asyncio.sleep(0.01)
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        sampler = asyncio.create_task(sample_threads())
+        start = time.perf_counter()
+        await asyncio.gather(*(_play(client, prefix, turns, latencies, errors) for _ in range(players)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await sampler
+
+    played = len(latencies) - sum(count for status, count in errors.items() if status.startswith("choice"))
+    return {
+        "turns_per_s": round(played / elapsed, 1),
+        **percentiles(latencies),
+        "threads": peak_threads,
+        "errors": dict(errors),
+    }
+
+
+def run(args) -> dict:
+    """{players: {"sync": result, "async": result}}"""
+    with tempfile.TemporaryDirectory() as tmp:
+        _configure(args, tmp)
+        from app import init_db, main
+        from app.llm.gemini_client import set_mock_backend
+        from app.llm.fake_llm import FakeLLM
+
+        init_db.init_db()
+        set_mock_backend(FakeLLM(latency_ms=args.latency_ms, seed=args.seed))
+
+        async def rounds():
+            results = {}
+            for players in args.players:
+                results[players] = {
+                    path: await _round(main.app, PATHS[path], players, args.turns) for path in args.paths
+                }
+            await init_db.async_engine.dispose()
+            await init_db.async_read_engine.dispose()
+            return results
+
+        try:
+            return asyncio.run(rounds())
+        finally:
+            set_mock_backend(None)
+            init_db.engine.dispose()
+            init_db.read_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--paths", nargs="+", choices=list(PATHS), default=list(PATHS))
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'players':>7} {'path':<6} {'turns/s':>8} {'p50 (ms)':>10} {'p95 (ms)':>10} {'p99 (ms)':>10} {'threads':>8}  errors")
+    for players, paths in run(args).items():
+        for path, result in paths.items():
+            print(
+                f"{players:>7} {path:<6} {result['turns_per_s']:>8} {result['p50_ms']:>10.1f} {result['p95_ms']:>10.1f}"
+                f" {result['p99_ms']:>10.1f} {result['threads']:>8}  {result['errors'] or 'none'}"
+            )
@@ -0,0 +1,141 @@
+"""
+Export throughput, and how much an export stalls live writes.
+
+Seeds a fresh SQLite file with `--games` games of `--days` days each, then,
+for every profile and chunk size, runs `app.export.export` on a read-only
+engine while a writer thread keeps committing turns (a new `Day` row plus
+the `current_day` update, as `make_choice` does) on the read-write engine.
+Reports:
+
+    days/s          exported days per second
+    longest read    longest chunk read (one read transaction)
+    commit p50/p99/max
+                    writer commit latency during the export (idle in
+                    parentheses)
+    errors          writer commits that failed ("database is locked")
+
+With the "default" profile (rollback journal) a read transaction blocks
+commits, so the stall grows with the chunk size; with "production" (WAL)
+readers never block the writer.
+
+Usage (from backend/):
+    python -m benchmarks.bench_export [--games 2000] [--days 100] [--chunk-games 100 2000] [--profiles production default]
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from benchmarks.bench_api import percentiles
+
+
+def _seed(engine, games: int, days: int) -> None:
+    from sqlalchemy import insert
+
+    from app import init_db
+    from app.models import Stats
+
+    init_db.init_db(engine)
+    stats = Stats().model_dump()
+    with engine.begin() as conn:
+        conn.execute(insert(init_db.User), [{"id": i} for i in range(1, games + 2)])
+        conn.execute(insert(init_db.Game), [
+            dict(id=i, user_id=i, age=16, gender="female", character_name="Alice", work=False, current_day=days)
+            for i in range(1, games + 2)
+        ])
+        for game_id in range(1, games + 2):
+            conn.execute(insert(init_db.Day), [
+                dict(game_id=game_id, number_of_day=day, **stats) for day in range(1, days + 1)
+            ])
+        conn.execute(insert(init_db.IssuedEvent), [
+            dict(game_id=i, number_of_day=days, payload="{}") for i in range(1, games + 2)
+        ])
+
+
+def _writer(engine, game_id: int, first_day: int, stop: threading.Event, latencies: list, errors: list) -> None:
+    """Commits one turn of `game_id` after another until `stop` is set."""
+    from sqlalchemy import insert, update
+    from sqlalchemy.exc import OperationalError
+
+    from app import init_db
+    from app.models import Stats
+
+    stats, day = Stats().model_dump(), first_day
+    while not stop.is_set():
+        day += 1
+        start = time.perf_counter()
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(init_db.Day).values(game_id=game_id, number_of_day=day, **stats))
+                conn.execute(update(init_db.Game).where(init_db.Game.id == game_id).values(current_day=day))
+        except OperationalError:
+            errors.append(day)
+        latencies.append(time.perf_counter() - start)
+        time.sleep(0.002)
+
+
+def _measure(engine, seconds: float, first_day: int, work=None) -> tuple[dict, list, int]:
+    """Writer latencies while `work()` runs (or for `seconds` if None)."""
+    stop, latencies, errors = threading.Event(), [], []
+    writer = threading.Thread(target=_writer, args=(engine, 1, first_day, stop, latencies, errors))
+    writer.start()
+    result = work() if work else time.sleep(seconds)
+    stop.set()
+    writer.join()
+    return result, latencies, len(errors)
+
+
+def run(args) -> list[dict]:
+    from sqlalchemy.orm import sessionmaker
+
+    from app import export, init_db
+
+    results = []
+    for profile in args.profiles:
+        with tempfile.TemporaryDirectory() as tmp:
+            url = f"sqlite:///{os.path.join(tmp, 'export.sqlite')}"
+            engine = init_db.create_db_engine(url, profile)
+            read_engine = init_db.create_db_engine(url, profile, read_only=True)
+            _seed(engine, args.games, args.days)
+            day = args.days + 1_000_000  # writer days never collide with seeded ones
+            _, idle, _ = _measure(engine, 1.0, day)
+            for chunk_games in args.chunk_games:
+                day += 1_000_000
+                manifest, busy, errors = _measure(engine, 0, day, lambda: export.export(
+                    os.path.join(tmp, f"out-{chunk_games}"),
+                    sessions=sessionmaker(bind=read_engine),
+                    chunk_games=chunk_games,
+                ))
+                results.append({
+                    "profile": profile,
+                    "chunk_games": chunk_games,
+                    "days_per_s": round(manifest["days"] / manifest["seconds"]),
+                    "longest_read_ms": manifest["longest_read_ms"],
+                    "busy": {**percentiles(busy), "max_ms": round(max(busy, default=0) * 1000, 1)},
+                    "idle": {**percentiles(idle), "max_ms": round(max(idle, default=0) * 1000, 1)},
+                    "errors": errors,
+                })
+            engine.dispose()
+            read_engine.dispose()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=100)
+    parser.add_argument("--chunk-games", type=int, nargs="+", default=[100, 2000])
+    parser.add_argument("--profiles", nargs="+", choices=["production", "default"], default=["production", "default"])
+    args = parser.parse_args()
+
+    print(f"{'profile':<10} {'chunk':>6} {'days/s':>8} {'longest read':>13}  commit p50 / p99 / max (idle)")
+    for r in run(args):
+        busy, idle = r["busy"], r["idle"]
+        print(
+            f"{r['profile']:<10} {r['chunk_games']:>6} {r['days_per_s']:>8} {r['longest_read_ms']:>10.1f} ms"
+            f"  {busy['p50_ms']:.1f} / {busy['p99_ms']:.1f} / {busy['max_ms']:.1f} ms"
+            f" ({idle['p50_ms']:.1f} / {idle['p99_ms']:.1f} / {idle['max_ms']:.1f})"
+            f"  errors: {r['errors']}"
+        )
@@ -0,0 +1,94 @@
+"""
+Benchmark for the latest-state lookup done on every turn.
+
+Builds games with 10 to 10,000 days and times the joined Game/current-Day
+read used by `apply_choice`. With the (game_id, number_of_day) index and the
+`games.current_day` pointer the latency should stay flat as games get longer.
+`--legacy` also times the old `ORDER BY number_of_day DESC` query on a table
+without the composite index, for comparison.
+
+Usage (from backend/):
+    python -m benchmarks.bench_latest_day [--legacy]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import init_db
+from app.models import Stats
+
+DAY_COUNTS = (10, 100, 1_000, 10_000)
+LOOKUPS = 2_000
+
+
+def _build(engine, days: int) -> int:
+    """Insert one game with `days` days (plus noise games) and return its id."""
+    stats = Stats().model_dump()
+    with engine.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO users (id) VALUES (NULL)")
+        for game in range(5):
+            conn.exec_driver_sql(
+                "INSERT INTO games (age, gender, character_name, work, user_id, current_day) "
+                "VALUES (16, 'f', 'Alice', 0, 1, ?)", (days,)
+            )
+            game_id = conn.exec_driver_sql("SELECT last_insert_rowid()").scalar()
+            conn.execute(
+                init_db.Day.__table__.insert(),
+                [{"game_id": game_id, "number_of_day": n, **stats} for n in range(1, days + 1)],
+            )
+    return game_id
+
+
+def _time(fn) -> float:
+    """Mean latency of `fn` in microseconds."""
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(LOOKUPS):
+        fn()
+    return (time.perf_counter() - start) / LOOKUPS * 1e6
+
+
+def run(legacy: bool) -> None:
+    print(f"{'days':>8} {'current (us)':>14}" + (f" {'legacy (us)':>14}" if legacy else ""))
+    for days in DAY_COUNTS:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.sqlite')}")
+            init_db.init_db(engine)
+            game_id = _build(engine, days)
+            db = sessionmaker(bind=engine)()
+
+            def current():
+                db.query(init_db.Game, init_db.Day).outerjoin(
+                    init_db.Day, (init_db.Day.game_id == init_db.Game.id)
+                    & (init_db.Day.number_of_day == init_db.Game.current_day)
+                ).filter(init_db.Game.id == game_id).first()
+                db.rollback()
+
+            line = f"{days:>8} {_time(current):>14.1f}"
+
+            if legacy:
+                with engine.begin() as conn:
+                    conn.exec_driver_sql("DROP INDEX ix_days_game_id_number_of_day")
+
+                def old():
+                    db.query(init_db.Day).filter(init_db.Day.game_id == game_id).order_by(
+                        init_db.Day.number_of_day.desc()
+                    ).first()
+                    db.rollback()
+
+                line += f" {_time(old):>14.1f}"
+
+            print(line)
+            db.close()
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--legacy", action="store_true", help="also time the unindexed query")
+    run(parser.parse_args().legacy)
@@ -0,0 +1,123 @@
+"""
+Cold-start benchmark: how long a fresh process takes to import and start the app.
+
+Each run is a new interpreter, as a worker boot or an autoscaled replica
+would be. It reports, in milliseconds:
+
+    interpreter   `python -c pass`, for reference
+    import        `import app.main`
+    lifespan      the app's startup hook (schema check on a fresh SQLite file)
+    ready         import + lifespan: time from the first app import to serving
+
+The run fails (exit 1) if the median `ready` time is above the budget
+(`--budget-ms`, default 1500 ms). `--real` measures production mode (USE_MOCK_LLM=false with a
+dummy key; no request is sent, the SDK loads in the background after
+startup). `--top N` lists the N slowest imports from `python -X importtime`.
+
+Usage (from backend/):
+    python -m benchmarks.bench_startup [--runs 7] [--real] [--budget-ms 1500] [--top 15]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+# Median time to ready a worker may take (about 1.2 s on the reference machine).
+BUDGET_MS = 1500.0
+
+CHILD = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+async def start_app():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+
+ready = asyncio.run(start_app())
+print(json.dumps({
+    "import": (imported - start) * 1000,
+    "lifespan": (ready - imported) * 1000,
+    "ready": (ready - start) * 1000,
+    "genai_loaded_at_ready": "google.genai" in sys.modules,
+}))
+"""
+
+
+def _env(tmp: str, real: bool) -> dict:
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'startup.sqlite')}", LLM_WARMUP="false")
+    if real:
+        env.update(USE_MOCK_LLM="false", GEMINI_API_KEY=env.get("GEMINI_API_KEY", "bench"))
+    else:
+        env["USE_MOCK_LLM"] = "true"
+    return env
+
+
+def run_once(real: bool) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        interpreter = (time.perf_counter() - start) * 1000
+        out = subprocess.run(
+            [sys.executable, "-c", CHILD], cwd=BACKEND_DIR, env=_env(tmp, real),
+            check=True, capture_output=True, text=True,
+        ).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    result["interpreter"] = interpreter
+    return result
+
+
+def slowest_imports(real: bool, top: int) -> list[tuple[int, str]]:
+    """(cumulative microseconds, module) of the slowest top-level imports."""
+    with tempfile.TemporaryDirectory() as tmp:
+        err = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import app.main"],
+            cwd=BACKEND_DIR, env=_env(tmp, real), check=True, capture_output=True, text=True,
+        ).stderr
+    rows = []
+    # Interpreter startup (`site` and what it pulls in) comes first; skip it.
+    lines = err.splitlines()
+    site = next(i for i, line in enumerate(lines) if line.endswith("| site"))
+    for line in lines[site + 1:]:
+        _, cumulative, name = line.split("|")
+        # The top-level import and the modules it imports directly.
+        if len(name) - len(name.lstrip()) <= 3:
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--real", action="store_true", help="production mode (real LLM client, no calls)")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS, help="fail if the median ready time exceeds this")
+    parser.add_argument("--top", type=int, default=0, help="list the N slowest imports")
+    args = parser.parse_args()
+
+    runs = [run_once(args.real) for _ in range(args.runs)]
+    print(f"{args.runs} cold starts ({'real' if args.real else 'mock'} LLM mode)")
+    print(f"{'stage':<12} {'median (ms)':>12} {'max (ms)':>10}")
+    for stage in ("interpreter", "import", "lifespan", "ready"):
+        values = [run[stage] for run in runs]
+        print(f"{stage:<12} {statistics.median(values):>12.1f} {max(values):>10.1f}")
+    if any(run["genai_loaded_at_ready"] for run in runs):
+        print("note: google.genai was imported before the app was ready")
+
+    if args.top:
+        print("\nslowest imports (cumulative):")
+        for micros, name in slowest_imports(args.real, args.top):
+            print(f"{micros / 1000:>10.1f} ms  {name}")
+
+    ready = statistics.median(run["ready"] for run in runs)
+    if ready > args.budget_ms:
+        print(f"\nready {ready:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+        sys.exit(1)
+    print(f"\nready {ready:.0f} ms is within the {args.budget_ms:.0f} ms budget")
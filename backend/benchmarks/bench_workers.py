@@ -0,0 +1,157 @@
+"""
+Multi-worker load test with the mock LLM.
+
+Starts the real app under `uvicorn --workers N` for each N, on a fresh SQLite
+file and the chosen shared state backend, and drives it with concurrent
+players (start a game, then keep choosing option 0 by event_id). Reports
+turns per second and latency percentiles per worker count, then checks that
+every game's day on the server matches the turns its player completed,
+whichever workers served them.
+
+Throughput can only scale with workers while there are free CPU cores;
+run it on a machine with at least as many cores as the largest N.
+
+Usage (from backend/):
+    python -m benchmarks.bench_workers [--workers 1 2 4] [--backend sqlite|kv|memory]
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+NEW_GAME = {"age": 16, "gender": "female", "character_name": "Alice", "work": False}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_up(url: str, timeout: float = 30.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server at {url} did not start")
+
+
+async def _player(client: httpx.AsyncClient, deadline: float, latencies: list, played: dict) -> int:
+    errors = 0
+    started = await client.post("/game", json=NEW_GAME)
+    if started.status_code != 200:
+        return 1
+    body = started.json()
+    game_id, event = body["game_state"]["game_id"], body["event"]
+    played[game_id] = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.post(
+            f"/game/{game_id}/choice", json={"event_id": event["event_id"], "option_index": 0}
+        )
+        if response.status_code != 200:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+        played[game_id] += 1
+        event = response.json()["event"]
+    return errors
+
+
+async def _load(base_url: str, concurrency: int, duration: float) -> dict:
+    latencies: list[float] = []
+    played: dict[str, int] = {}
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        start = time.perf_counter()
+        errors = await asyncio.gather(
+            *(_player(client, start + duration, latencies, played) for _ in range(concurrency))
+        )
+        elapsed = time.perf_counter() - start
+
+        # Consistency: the server's day must match the turns each player saw.
+        days = await asyncio.gather(*(client.get(f"/game/{game_id}") for game_id in played))
+        mismatched = sum(
+            response.json()["day"] != played[game_id] + 1
+            for game_id, response in zip(played, days)
+        )
+
+    cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+    return {
+        "turns_per_s": len(latencies) / elapsed,
+        "p50_ms": cuts[49] * 1000,
+        "p95_ms": cuts[94] * 1000,
+        "errors": sum(errors),
+        "games": len(played),
+        "inconsistent_games": mismatched,
+    }
+
+
+def run(workers: list[int], backend: str, concurrency: int, duration: float, latency_ms: float) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            USE_MOCK_LLM="true",
+            MOCK_LLM_LATENCY_MS=str(latency_ms),
+            LLM_PREFETCH="false",
+            STATE_BACKEND=backend,
+            STATE_PATH=os.path.join(tmp, "state.sqlite"),
+        )
+        kv_server = None
+        if backend == "kv":
+            env["STATE_KV_ADDRESS"] = f"127.0.0.1:{_free_port()}"
+            kv_server = subprocess.Popen(
+                [sys.executable, "-m", "app.state", "--port", env["STATE_KV_ADDRESS"].rsplit(":", 1)[1]],
+                env=env, stdout=subprocess.DEVNULL,
+            )
+
+        print(f"backend={backend} concurrency={concurrency} duration={duration}s mock latency={latency_ms}ms")
+        print(f"{'workers':>8} {'turns/s':>10} {'p50 (ms)':>10} {'p95 (ms)':>10} {'errors':>8} {'inconsistent':>13}")
+        try:
+            for n in workers:
+                env["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, f'bench_{n}.sqlite')}"
+                subprocess.run([sys.executable, "-m", "app.init_db"], env=env, check=True, stdout=subprocess.DEVNULL)
+                port = _free_port()
+                server = subprocess.Popen(
+                    [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+                     "--workers", str(n), "--log-level", "warning"],
+                    env=env,
+                )
+                try:
+                    base_url = f"http://127.0.0.1:{port}"
+                    _wait_until_up(base_url + "/")
+                    result = asyncio.run(_load(base_url, concurrency, duration))
+                finally:
+                    server.terminate()
+                    server.wait()
+                print(
+                    f"{n:>8} {result['turns_per_s']:>10.1f} {result['p50_ms']:>10.1f} "
+                    f"{result['p95_ms']:>10.1f} {result['errors']:>8} {result['inconsistent_games']:>13}"
+                )
+        finally:
+            if kv_server is not None:
+                kv_server.terminate()
+                kv_server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--backend", choices=["memory", "sqlite", "kv"], default="sqlite")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+    run(args.workers, args.backend, args.concurrency, args.duration, args.latency_ms)
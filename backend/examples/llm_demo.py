@@ -1,13 +1,17 @@
 """
 Simple test script for LLM module.
+
+Run from backend/ with USE_MOCK_LLM=true:
+    python examples/llm_demo.py
 """
 
 import sys
 import os
 
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from llm.event_generator import generate_event
+from app.llm.event_generator import generate_event
+from app.llm.event_pool import default_start_state
 import json
 
 
@@ -18,7 +22,8 @@ def test_mock_mode():
 
     for day in [1, 2, 3, 4]:
         print(f"\nDay {day}:")
-        event = generate_event(day)
+        game_state = default_start_state(work=False).model_copy(update={"day": day})
+        event = generate_event(game_state)
         print(json.dumps(event, indent=2, ensure_ascii=False))
         print("-" * 50)
 
@@ -1,13 +1,18 @@
 """
 Test Gemini API mode.
+
+Run from backend/ with USE_MOCK_LLM=false and GEMINI_API_KEY set:
+    python examples/test_gemini.py
 """
 
 import sys
 import os
 
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from llm.event_generator import generate_event
+from app.llm.event_generator import generate_event
+from app.llm.event_pool import default_start_state
+from app.llm.validation import validate_event
 import json
 
 
@@ -18,8 +23,10 @@ def test_gemini_mode():
 
     # Test day 4 (will use Gemini API)
     print("\nDay 4 (Generated by Gemini API):")
-    event = generate_event(4)
+    game_state = default_start_state(work=True).model_copy(update={"day": 4})
+    event = generate_event(game_state)
     print(json.dumps(event, indent=2, ensure_ascii=False))
+    print("Valid event:", validate_event(event).description[:60])
     print("-" * 50)
 
 